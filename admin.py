@@ -1,11 +1,15 @@
 from django.contrib import admin
-from task_manager.models import Category, Task, SubTask
+from task_manager.models import Category, Task, SubTask, OutboxEmail
 
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ('name',)
 
+    def delete_queryset(self, request, queryset):
+        # Same soft delete as Category.delete(), in one UPDATE.
+        queryset.soft_delete()
+
 
 @admin.register(SubTask)
 class SubTaskAdmin(admin.ModelAdmin):
@@ -37,3 +41,9 @@ class TaskAdmin(admin.ModelAdmin):
     short_title.short_description = 'Title (short)'
 
 
+
+
+@admin.register(OutboxEmail)
+class OutboxEmailAdmin(admin.ModelAdmin):
+    list_display = ('subject', 'to', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('sent_at',)
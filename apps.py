@@ -6,4 +6,6 @@ class TaskManagerConfig(AppConfig):
     name = 'task_manager'
 
     def ready(self):
-        import task_manager.signals
\ No newline at end of file
+        import task_manager.search  # system checks
+        import task_manager.signals
+        import task_manager.instrumentation
\ No newline at end of file
@@ -0,0 +1,214 @@
+import inspect
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import aprefetch_related_objects
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import exceptions
+from rest_framework.permissions import IsAdminUser
+from rest_framework.relations import ManyRelatedField
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from . import counters
+from .views import (
+    MySubTasksAPIView, MyTasksAPIView, SubTaskListCreateAPIView, SubTaskRetrieveUpdateDestroyAPIView,
+    TaskListCreateAPIView, TaskRetrieveUpdateDestroyAPIView, get_statistics_owner,
+)
+
+
+class AsyncAPIViewMixin:
+    '''
+    Runs a DRF view's GET on the event loop: authentication goes through
+    the authenticators' aauthenticate() when they have one, the handlers
+    use the async ORM and the response is rendered before it is returned,
+    so a request holds no worker thread while it waits on the database.
+    Permission and throttle checks are the sync view's own (they don't
+    query). Writes stay on the sync views, see split_by_method().
+    '''
+    http_method_names = ['get', 'head', 'options']
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            await self.ainitial(request, *args, **kwargs)
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+            response = handler(request, *args, **kwargs)
+            if inspect.isawaitable(response):
+                response = await response
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+    async def ainitial(self, request, *args, **kwargs):
+        self.format_kwarg = self.get_format_suffix(**kwargs)
+        request.accepted_renderer, request.accepted_media_type = self.perform_content_negotiation(request)
+        request.version, request.versioning_scheme = self.determine_version(request, *args, **kwargs)
+
+        await self.aperform_authentication(request)
+        self.check_permissions(request)
+        self.check_throttles(request)
+
+    async def aperform_authentication(self, request):
+        for authenticator in request.authenticators:
+            authenticate = getattr(authenticator, 'aauthenticate', None) or sync_to_async(authenticator.authenticate)
+            try:
+                user_auth_tuple = await authenticate(request)
+            except exceptions.APIException:
+                request._not_authenticated()
+                raise
+            if user_auth_tuple is not None:
+                request._authenticator = authenticator
+                request.user, request.auth = user_auth_tuple
+                return
+        request._not_authenticated()
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        # The browsable API renders forms from querysets, it needs a thread.
+        if not isinstance(response, Response) or isinstance(response.accepted_renderer, BrowsableAPIRenderer):
+            return response
+        # Django renders a TemplateResponse in a thread, a plain one is sent as is.
+        response.render()
+        rendered = HttpResponse(response.content, status=response.status_code)
+        for header, value in response.items():
+            rendered[header] = value
+        rendered.data = response.data
+        return rendered
+
+
+class AsyncGenericMixin(AsyncAPIViewMixin):
+    '''
+    Async counterparts of the generic views' object and page loading.
+    '''
+    async def aget_object(self):
+        queryset = self.filter_queryset(self.get_queryset())
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            obj = await queryset.aget(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+        except queryset.model.DoesNotExist:
+            # Same message as the sync views' get_object_or_404().
+            raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+        except (TypeError, ValueError, DjangoValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, obj)
+        return obj
+
+    async def apaginate_queryset(self, queryset):
+        if self.paginator is None:
+            return None
+        paginate = getattr(self.paginator, 'apaginate_queryset', None)
+        if paginate is None:
+            return await sync_to_async(self.paginator.paginate_queryset)(queryset, self.request, view=self)
+        return await paginate(queryset, self.request, view=self)
+
+    async def aprefetch_many(self, objs):
+        '''
+        Load the many-to-many fields the serializer reads, serializing
+        can't query from the event loop. Relations already prefetched by
+        ?expand= are skipped.
+        '''
+        serializer = self.get_serializer()
+        lookups = [field.source for field in serializer.fields.values()
+                   if isinstance(field, ManyRelatedField) and not field.write_only]
+        if objs and lookups:
+            await aprefetch_related_objects(objs, *lookups)
+
+
+class AsyncListMixin(AsyncGenericMixin):
+    async def get(self, request, *args, **kwargs):
+        return await self.aconditional_response(self.alist, request, *args, cache=self.cache_list, **kwargs)
+
+    async def alist(self, request, *args, **kwargs):
+        plan = self.get_row_plan()
+        if plan is not None:
+            page = await self.apaginate_queryset(self.get_row_queryset(plan))
+            if page is None:
+                page = [row async for row in self.get_row_queryset(plan)]
+            data = await plan.arender(page)
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.apaginate_queryset(queryset)
+            if page is None:
+                page = [obj async for obj in queryset.aiterator()]
+            await self.aprefetch_many(page)
+            data = self.get_serializer(page, many=True).data
+
+        if self.paginator is not None:
+            return self.get_paginated_response(data)
+        return Response(data)
+
+
+class AsyncRetrieveMixin(AsyncGenericMixin):
+    async def get(self, request, *args, **kwargs):
+        return await self.aconditional_response(self.aretrieve, request, *args, **kwargs)
+
+    async def aretrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await self.aprefetch_many([instance])
+        return Response(self.get_serializer(instance).data)
+
+
+class AsyncTaskListAPIView(AsyncListMixin, TaskListCreateAPIView):
+    pass
+
+
+class AsyncTaskRetrieveAPIView(AsyncRetrieveMixin, TaskRetrieveUpdateDestroyAPIView):
+    pass
+
+
+class AsyncSubTaskListAPIView(AsyncListMixin, SubTaskListCreateAPIView):
+    pass
+
+
+class AsyncSubTaskRetrieveAPIView(AsyncRetrieveMixin, SubTaskRetrieveUpdateDestroyAPIView):
+    pass
+
+
+class AsyncMyTasksAPIView(AsyncListMixin, MyTasksAPIView):
+    pass
+
+
+class AsyncMySubTasksAPIView(AsyncListMixin, MySubTasksAPIView):
+    pass
+
+
+class AsyncTaskStatisticsAPIView(AsyncAPIViewMixin, APIView):
+    """
+    get:
+    Task counts by status and overdue tasks, see views.task_statistics.
+    """
+    permission_classes = (IsAdminUser,)
+
+    async def get(self, request, *args, **kwargs):
+        return Response(await counters.aget_statistics(owner_id=get_statistics_owner(request)))
+
+
+def split_by_method(sync_view, async_view):
+    '''
+    One URL served by two views: GET and HEAD by ``async_view``, every
+    other method by ``sync_view`` in a thread. The schema generator sees
+    the sync view.
+    '''
+    sync_handler = sync_to_async(sync_view)
+
+    async def view(request, *args, **kwargs):
+        if request.method in ('GET', 'HEAD'):
+            return await async_view(request, *args, **kwargs)
+        return await sync_handler(request, *args, **kwargs)
+
+    view.cls = getattr(sync_view, 'cls', None)
+    view.initkwargs = getattr(sync_view, 'initkwargs', {})
+    return csrf_exempt(view)
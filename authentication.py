@@ -0,0 +1,146 @@
+from collections import OrderedDict
+from copy import copy
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication, JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+class UserCache:
+    '''
+    Process-local LRU of users by id whose entries expire after ``ttl``
+    seconds. Saves in this process invalidate their entry right away (see
+    signals.py), the TTL bounds how long other workers may see the old row.
+    '''
+    def __init__(self, max_size, ttl):
+        self.max_size, self.ttl = max_size, ttl
+        self._users = OrderedDict()
+        self._lock = Lock()
+
+    # Token claims may carry the id as a string, model instances as an int.
+    def get(self, user_id):
+        user_id = str(user_id)
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return None
+            user, expires_at = entry
+            if expires_at <= monotonic():
+                del self._users[user_id]
+                return None
+            self._users.move_to_end(user_id)
+            return user
+
+    def set(self, user_id, user):
+        user_id = str(user_id)
+        with self._lock:
+            self._users[user_id] = (user, monotonic() + self.ttl)
+            self._users.move_to_end(user_id)
+            while len(self._users) > self.max_size:
+                self._users.popitem(last=False)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._users.pop(str(user_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._users.clear()
+
+
+user_cache = UserCache(**{key.lower(): value for key, value in settings.JWT_USER_CACHE.items()})
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    '''
+    JWTAuthentication that resolves the token's user through ``user_cache``
+    instead of a query on every request. The active and revoked-token checks
+    still run on every request against the cached row.
+    '''
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = self.user_model.objects.get(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            user_cache.set(user_id, user)
+        return self.check_user(user, validated_token)
+
+    async def aauthenticate(self, request):
+        '''
+        authenticate() for the async views, the user is loaded with aget().
+        '''
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        user = user_cache.get(user_id)
+        if user is None:
+            try:
+                user = await self.user_model.objects.aget(**{api_settings.USER_ID_FIELD: user_id})
+            except self.user_model.DoesNotExist as e:
+                raise AuthenticationFailed(_('User not found'), code='user_not_found') from e
+            user_cache.set(user_id, user)
+        return self.check_user(user, validated_token)
+
+    def get_user_id(self, validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_('Token contained no recognizable user identification')) from e
+
+    def check_user(self, user, validated_token):
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+
+        # Each request gets its own copy, the cached one is shared between threads.
+        return copy(user)
+
+
+class ClaimsUser(TokenUser):
+    '''
+    User built from the token claims alone (see set_user_claims()).
+    '''
+    @cached_property
+    def is_active(self):
+        return self.token.get('is_active', True)
+
+
+class ClaimsJWTAuthentication(JWTStatelessUserAuthentication):
+    '''
+    Opt-in, no database access at all: request.user is a ClaimsUser with id,
+    username, is_active, is_staff and is_superuser read from the token. Only
+    for endpoints that need nothing else from the user. The claims are as old
+    as the token, so don't base admin-only access on them; those views keep
+    the default CachedJWTAuthentication.
+    '''
+    def get_user(self, validated_token):
+        user = super().get_user(validated_token)
+        user = ClaimsUser(user.token)
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        return user
+
+    async def aauthenticate(self, request):
+        # Nothing to wait for, the user comes from the token.
+        return self.authenticate(request)
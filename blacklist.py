@@ -0,0 +1,105 @@
+import hashlib
+import math
+from datetime import timedelta
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.utils.timezone import now
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class BloomFilter:
+    '''
+    Fixed-size Bloom filter of strings: no false negatives, about
+    ``error_rate`` false positives while it holds at most ``capacity`` items.
+    '''
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        positions = self._positions(item)
+        if all(self.bits[p >> 3] & (1 << (p & 7)) for p in positions):
+            return
+        for p in positions:
+            self.bits[p >> 3] |= 1 << (p & 7)
+        self.count += 1
+
+    def __contains__(self, item):
+        return all(self.bits[p >> 3] & (1 << (p & 7)) for p in self._positions(item))
+
+
+class BlacklistFilter:
+    '''
+    Bloom filter of blacklisted refresh token JTIs. "Not in the filter" means
+    the token is definitely not blacklisted and the database check is
+    skipped; a hit falls back to the query.
+
+    Built on first use in each process. Blacklist writes of this process are
+    added right away (see signals.py), the ones of other processes are read
+    incrementally at most every ``sync_interval`` seconds.
+    '''
+    # Rows younger than this are read again on the next sync, so an insert
+    # committed after a higher id has been read is not skipped.
+    settle_time = timedelta(seconds=5)
+
+    def __init__(self, capacity, error_rate, sync_interval):
+        self.capacity, self.error_rate, self.sync_interval = capacity, error_rate, sync_interval
+        self._bloom = None
+        self._last_id = 0
+        self._synced_at = 0.0
+        self._lock = Lock()
+
+    def rebuild(self):
+        count = BlacklistedToken.objects.count()
+        with self._lock:
+            self._bloom = BloomFilter(max(self.capacity, count * 2), self.error_rate)
+            self._last_id = 0
+        self.sync()
+
+    def sync(self):
+        rows = (BlacklistedToken.objects.filter(id__gt=self._last_id).order_by('id')
+                .values_list('id', 'token__jti', 'blacklisted_at'))
+        settled_before, settled = now() - self.settle_time, True
+        with self._lock:
+            for pk, jti, blacklisted_at in rows.iterator(chunk_size=5000):
+                self._bloom.add(jti)
+                settled = settled and blacklisted_at < settled_before
+                if settled:
+                    self._last_id = pk
+            self._synced_at = monotonic()
+        if self._bloom.count > self._bloom.capacity:
+            self.rebuild()
+
+    def add(self, jti):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def might_contain(self, jti):
+        if self._bloom is None:
+            self.rebuild()
+        elif monotonic() - self._synced_at >= self.sync_interval:
+            self.sync()
+        return jti in self._bloom
+
+
+blacklist_filter = BlacklistFilter(**{key.lower(): value for key, value in settings.TOKEN_BLACKLIST_FILTER.items()})
+
+
+class FilteredRefreshToken(RefreshToken):
+    def check_blacklist(self):
+        if blacklist_filter.might_contain(self.payload[api_settings.JTI_CLAIM]):
+            super().check_blacklist()
@@ -0,0 +1,88 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+HIT, MISS = 'hits', 'misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def record(scope, outcome):
+    # Kept in the cache itself, so a shared backend aggregates every worker.
+    cache, key = get_cache(), f'response-cache:stats:{scope}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def arecord(scope, outcome):
+    cache, key = get_cache(), f'response-cache:stats:{scope}:{outcome}'
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def get_statistics(scopes):
+    cache = get_cache()
+    statistics = {}
+    for scope in scopes:
+        hits = cache.get(f'response-cache:stats:{scope}:{HIT}', 0)
+        misses = cache.get(f'response-cache:stats:{scope}:{MISS}', 0)
+        statistics[scope] = {
+            HIT: hits,
+            MISS: misses,
+            'hit_ratio': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return statistics
+
+
+def cached_response(scope, key, timeout, handler, request, *args, **kwargs):
+    '''
+    Return the serialized data cached under ``key`` or call ``handler`` and
+    cache its data. ``key`` has to change whenever the data may change, the
+    caller builds it from the resource versions, so entries are never
+    invalidated in place, outdated ones just expire.
+    '''
+    cache = get_cache()
+    key = f'response-cache:{scope}:{key}'
+    data = cache.get(key)
+    if data is not None:
+        record(scope, HIT)
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    record(scope, MISS)
+    response = handler(request, *args, **kwargs)
+    if response.status_code == 200:
+        cache.set(key, response.data, timeout)
+    response['X-Cache'] = 'MISS'
+    return response
+
+
+async def acached_response(scope, key, timeout, handler, request, *args, **kwargs):
+    '''
+    cached_response() with an async ``handler``.
+    '''
+    cache = get_cache()
+    key = f'response-cache:{scope}:{key}'
+    data = await cache.aget(key)
+    if data is not None:
+        await arecord(scope, HIT)
+        response = Response(data)
+        response['X-Cache'] = 'HIT'
+        return response
+
+    await arecord(scope, MISS)
+    response = await handler(request, *args, **kwargs)
+    if response.status_code == 200:
+        await cache.aset(key, response.data, timeout)
+    response['X-Cache'] = 'MISS'
+    return response
@@ -0,0 +1,166 @@
+import hashlib
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponseNotModified
+from django.utils.http import http_date, parse_etags, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from . import caching, versions
+
+
+class ConditionalGetMixin:
+    '''
+    ETag and Last-Modified for list/retrieve derived from resource versions
+    (see versions.py) instead of the response body, so a request carrying a
+    matching If-None-Match or If-Modified-Since gets a 304 before the queryset
+    and the serializer run. Details of models with an ``updated_at`` column
+    use that row's value instead of a collection version, so writes to other
+    rows leave them alone. Updates sent with If-Match are rejected with 412
+    when the resource changed since the client read it.
+
+    With ``cache_list`` set, list data is also cached (see caching.py) under
+    the ETag, which changes with every write to the collection.
+    '''
+    version_scope = None  # 'tasks', 'subtasks' or 'categories'
+    related_version_keys = ()  # keys of other resources the output depends on
+    owner_scoped = False  # the view only lists the requesting user's rows
+    cache_list = False
+
+    def get_state(self, for_update=False):
+        '''
+        (validator values, last modified) the response depends on, or None to
+        skip conditional handling (e.g. a detail lookup that will 404 anyway).
+        With ``for_update`` the detail row or the version rows are locked.
+        '''
+        detail = self.get_detail_queryset()
+        if detail is None:
+            return versions.get_state(self.version_keys_for(detail=False), for_update=for_update)
+        updated_at = (detail.select_for_update() if for_update else detail).first()
+        if updated_at is None:
+            return None
+        return self.add_row_state(versions.get_state(self.version_keys_for(detail=True)), updated_at)
+
+    async def aget_state(self):
+        detail = self.get_detail_queryset()
+        if detail is None:
+            return await versions.aget_state(self.version_keys_for(detail=False))
+        updated_at = await detail.afirst()
+        if updated_at is None:
+            return None
+        return self.add_row_state(await versions.aget_state(self.version_keys_for(detail=True)), updated_at)
+
+    @staticmethod
+    def add_row_state(state, updated_at):
+        version_values, last_modified = state
+        return (*version_values, updated_at.isoformat()), max(filter(None, (last_modified, updated_at)))
+
+    def get_detail_queryset(self):
+        '''
+        The updated_at of the detail object as a values_list() queryset when
+        this is a lookup on a model that has one, else None.
+        '''
+        if self.owner_scoped:
+            return None
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.get_queryset()
+        if lookup_url_kwarg in self.kwargs and any(f.name == 'updated_at' for f in queryset.model._meta.fields):
+            return (queryset.filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+                    .values_list('updated_at', flat=True))
+        return None
+
+    def version_keys_for(self, detail):
+        '''
+        Version keys the response depends on, besides the detail row itself.
+        '''
+        related = list(self.related_version_keys)
+        if detail:
+            return related
+        if self.owner_scoped:
+            return [versions.owner_key(self.version_scope, self.request.user.pk)] + related
+        return [self.version_scope] + related
+
+    def get_etag(self, request, version_values):
+        params = sorted((key, value) for key, values in request.query_params.lists() for value in values)
+        renderer = getattr(request, 'accepted_renderer', None)
+        scope = request.user.pk if self.owner_scoped else None
+        # The absolute URL, pagination links in the body contain the host.
+        raw = repr((request.build_absolute_uri(request.path), params, scope, renderer and renderer.format, version_values))
+        return quote_etag(hashlib.sha1(raw.encode()).hexdigest())
+
+    def is_not_modified(self, request, etag, last_modified):
+        if_none_match = request.headers.get('If-None-Match')
+        if if_none_match:
+            # Weak comparison, If-Modified-Since is ignored when present.
+            tags = [tag.removeprefix('W/') for tag in parse_etags(if_none_match)]
+            return '*' in tags or etag in tags
+        if_modified_since = parse_http_date_safe(request.headers.get('If-Modified-Since', ''))
+        return bool(last_modified and if_modified_since and int(last_modified.timestamp()) <= if_modified_since)
+
+    def conditional_response(self, handler, request, *args, cache=False, **kwargs):
+        state = self.get_state()
+        if state is None:
+            return handler(request, *args, **kwargs)
+
+        version_values, last_modified = state
+        etag = self.get_etag(request, version_values)
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        elif cache and settings.RESPONSE_CACHE_TIMEOUT:
+            response = caching.cached_response(self.version_scope, etag.strip('"'), settings.RESPONSE_CACHE_TIMEOUT,
+                                               handler, request, *args, **kwargs)
+        else:
+            response = handler(request, *args, **kwargs)
+
+        return self.set_validators(response, etag, last_modified)
+
+    async def aconditional_response(self, handler, request, *args, cache=False, **kwargs):
+        '''
+        conditional_response() for the async views (see async_views.py).
+        '''
+        state = await self.aget_state()
+        if state is None:
+            return await handler(request, *args, **kwargs)
+
+        version_values, last_modified = state
+        etag = self.get_etag(request, version_values)
+        if self.is_not_modified(request, etag, last_modified):
+            response = HttpResponseNotModified()
+        elif cache and settings.RESPONSE_CACHE_TIMEOUT:
+            response = await caching.acached_response(self.version_scope, etag.strip('"'),
+                                                      settings.RESPONSE_CACHE_TIMEOUT, handler, request, *args, **kwargs)
+        else:
+            response = await handler(request, *args, **kwargs)
+        return self.set_validators(response, etag, last_modified)
+
+    def set_validators(self, response, etag, last_modified):
+        if response.status_code in (status.HTTP_200_OK, status.HTTP_304_NOT_MODIFIED):
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request, *args, cache=self.cache_list, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        if_match = request.headers.get('If-Match')
+        with transaction.atomic():
+            if if_match:
+                # The row lock holds concurrent writers until this update commits.
+                state = self.get_state(for_update=True)
+                tags = parse_etags(if_match)
+                if state is not None and '*' not in tags and self.get_etag(request, state[0]) not in tags:
+                    return Response({'detail': 'The resource has been modified.'},
+                                    status=status.HTTP_412_PRECONDITION_FAILED)
+            response = super().update(request, *args, **kwargs)
+
+        if response.status_code == status.HTTP_200_OK:
+            state = self.get_state()
+            if state is not None:
+                response['ETag'] = self.get_etag(request, state[0])
+        return response
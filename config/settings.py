@@ -14,11 +14,6 @@ from pathlib import Path
 import os
 import environ
 
-from task_manager.paginations import (
-    StandardCursorPagination,
-    StandardPageNumberPagination,
-    StandardLimitOffsetPagination,
-)
 from datetime import timedelta
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -56,6 +51,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'task_manager.instrumentation.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -98,6 +94,10 @@ WSGI_APPLICATION = 'config.wsgi.application'
 
 USE_MYSQL = False
 
+# Connection tuning for production load, DB_TUNING=False restores Django's
+# defaults (benchmark_db_writes compares both).
+DB_TUNING = env.bool('DB_TUNING', default=True)
+
 if USE_MYSQL:
     DATABASES = {'default': {
             'ENGINE': 'django.db.backends.mysql',
@@ -108,11 +108,80 @@ if USE_MYSQL:
             'PORT': env('DB_PORT', default='3306'),
             'OPTIONS': {'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
     }}}
+    if DB_TUNING:
+        # Persistent connections, checked before reuse so a server-side
+        # timeout doesn't surface as an error in the next request.
+        DATABASES['default']['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=300)
+        DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+        # With DB_POOL_SIZE set connections come from a shared pool
+        # (pip install django-db-connection-pool[mysql]) instead.
+        if env.int('DB_POOL_SIZE', default=0):
+            DATABASES['default'].update({
+                'ENGINE': 'dj_db_conn_pool.backends.mysql',
+                'CONN_MAX_AGE': 0,
+                'POOL_OPTIONS': {
+                    'POOL_SIZE': env.int('DB_POOL_SIZE'),
+                    'MAX_OVERFLOW': env.int('DB_POOL_MAX_OVERFLOW', default=10),
+                    'RECYCLE': env.int('DB_POOL_RECYCLE', default=3600),
+                    'PRE_PING': True,
+                },
+            })
 else:
     DATABASES = {'default': {
             'ENGINE': 'django.db.backends.sqlite3',
-            'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+            'NAME': env('SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')),
             }}
+    if DB_TUNING:
+        DATABASES['default'].update({
+            'CONN_MAX_AGE': env.int('DB_CONN_MAX_AGE', default=300),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Take the write lock when the transaction starts, a deferred
+                # one that upgrades later fails at once with "database is locked".
+                'transaction_mode': 'IMMEDIATE',
+                # Seconds to wait for the lock (SQLite's busy_timeout).
+                'timeout': env.int('SQLITE_BUSY_TIMEOUT', default=20),
+                # WAL lets readers run alongside the writer, NORMAL syncs at
+                # checkpoints only (still safe in WAL mode).
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    f"PRAGMA mmap_size={env.int('SQLITE_MMAP_SIZE', default=256 * 1024 * 1024)};"
+                    f"PRAGMA cache_size=-{env.int('SQLITE_CACHE_KB', default=64 * 1024)};"
+                    'PRAGMA temp_store=MEMORY;'
+                ),
+            },
+        })
+
+# Full-text backend behind ?search= on tasks and subtasks (see task_manager/search.py)
+if USE_MYSQL:
+    TASK_SEARCH_BACKEND = 'task_manager.search.MySQLFulltextBackend'
+else:
+    TASK_SEARCH_BACKEND = 'task_manager.search.SQLiteFTSBackend'
+
+# Keep Category.task_count up to date on every task/category link change instead of
+# counting in ?with_counts=1. Run reconcile_task_statistics after turning it on.
+CATEGORY_TASK_COUNTS_DENORMALIZED = env.bool('CATEGORY_TASK_COUNTS_DENORMALIZED', default=False)
+
+# Set CACHE_URL (e.g. redis://127.0.0.1:6379/1) to share the cache between workers.
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://task-manager')}
+
+# Per-request query count, database/serializer/total time in a Server-Timing
+# header and per-route histograms at /metrics/ (task_manager/instrumentation.py).
+REQUEST_METRICS = env.bool('REQUEST_METRICS', default=True)
+
+# Serve GET on the task and subtask endpoints from the async views in
+# task_manager/async_views.py. config/asgi.py turns this on, under WSGI
+# every async view would run through async_to_sync.
+ASYNC_VIEWS = env.bool('ASYNC_VIEWS', default=False)
+
+# Lifetime in seconds of cached list responses (see task_manager/caching.py), 0 disables them.
+RESPONSE_CACHE_TIMEOUT = env.int('RESPONSE_CACHE_TIMEOUT', default=300)
+
+# MySQL has no partial indexes or conditional unique constraints, live category
+# names are then only checked by the serializers (see Category.Meta).
+if USE_MYSQL:
+    SILENCED_SYSTEM_CHECKS = ['models.W036', 'models.W037']
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -156,9 +225,11 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': ('rest_framework_simplejwt.authentication.JWTAuthentication',),
+    'DEFAULT_AUTHENTICATION_CLASSES': ('task_manager.authentication.CachedJWTAuthentication',),
     'DEFAULT_PERMISSION_CLASSES': ['rest_framework.permissions.IsAuthenticated'],
-    'DEFAULT_PAGINATION_CLASS': StandardCursorPagination,
+    # Dotted path, importing the class here would make DRF read its settings
+    # before this module has finished loading and silently use the defaults.
+    'DEFAULT_PAGINATION_CLASS': 'task_manager.paginations.StandardCursorPagination',
     'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
 }
 
@@ -166,13 +237,40 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(days=3),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'AUTH_HEADER_TYPES': ('Bearer',),
+    'TOKEN_OBTAIN_SERIALIZER': 'task_manager.serializers.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'task_manager.serializers.FilteredTokenRefreshSerializer',
     'BLACKLIST_AFTER_ROTATION': True,
     'ROTATE_REFRESH_TOKENS': True,
 }
 
+# Per-process cache of users resolved from JWTs (task_manager/authentication.py).
+# Saves invalidate it in the same process, other workers pick them up after TTL seconds.
+JWT_USER_CACHE = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+}
+
+# Per-process Bloom filter of blacklisted refresh tokens (task_manager/blacklist.py).
+# Blacklist writes of other workers are picked up every SYNC_INTERVAL seconds.
+TOKEN_BLACKLIST_FILTER = {
+    'CAPACITY': 100000,
+    'ERROR_RATE': 0.001,
+    'SYNC_INTERVAL': 2,
+}
+
 LOG_DIR = BASE_DIR / 'logs'
 LOG_DIR.mkdir(exist_ok=True)
 
+# Log files are written from a background thread (task_manager/log_handlers.py)
+# and rotated at midnight or at LOG_MAX_BYTES, keeping LOG_BACKUP_COUNT old files.
+LOG_MAX_BYTES = env.int('LOG_MAX_BYTES', default=50 * 1024 * 1024)
+LOG_BACKUP_COUNT = env.int('LOG_BACKUP_COUNT', default=7)
+
+# Fraction of SQL statements written to db_logs.log, statements taking at least
+# DB_LOG_SLOW_SECONDS are always written.
+DB_LOG_SAMPLE_RATE = env.float('DB_LOG_SAMPLE_RATE', default=0.01)
+DB_LOG_SLOW_SECONDS = env.float('DB_LOG_SLOW_SECONDS', default=0.5)
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -187,24 +285,44 @@ LOGGING = {
             'style': '%',
         },
     },
+    'filters': {
+        'sample_queries': {
+            '()': 'task_manager.log_handlers.SampledQueryFilter',
+            'rate': DB_LOG_SAMPLE_RATE,
+            'slow_seconds': DB_LOG_SLOW_SECONDS,
+        },
+    },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'simple',
         },
         'http_file': {
-            'class': 'logging.FileHandler',
-            'filename': LOG_DIR / 'http_logs.log',
+            '()': 'task_manager.log_handlers.BackgroundHandler',
+            'handler': {
+                'class': 'task_manager.log_handlers.SizedTimedRotatingFileHandler',
+                'filename': LOG_DIR / 'http_logs.log',
+                'when': 'midnight',
+                'maxBytes': LOG_MAX_BYTES,
+                'backupCount': LOG_BACKUP_COUNT,
+                'encoding': 'utf-8',
+            },
             'formatter': 'verbose',
             'level': 'INFO',
-            'encoding': 'utf-8',
         },
         'db_file': {
-            'class': 'logging.FileHandler',
-            'filename': LOG_DIR / 'db_logs.log',
+            '()': 'task_manager.log_handlers.BackgroundHandler',
+            'handler': {
+                'class': 'task_manager.log_handlers.SizedTimedRotatingFileHandler',
+                'filename': LOG_DIR / 'db_logs.log',
+                'when': 'midnight',
+                'maxBytes': LOG_MAX_BYTES,
+                'backupCount': LOG_BACKUP_COUNT,
+                'encoding': 'utf-8',
+            },
             'formatter': 'verbose',
             'level': 'DEBUG',
-            'encoding': 'utf-8',
+            'filters': ['sample_queries'],
         },
 
     },
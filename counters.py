@@ -0,0 +1,195 @@
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+from django.utils.timezone import now
+
+from .models import Task, Category, TaskStatusCounter, TaskOwnerCounter, TaskDeadlineCounter, STATUS_CHOICES
+
+
+DONE = 'D'
+KEY_FIELDS = ('owner_id', 'status', 'deadline')
+
+
+def make_key(owner_id, status, deadline):
+    return owner_id, status, Task._meta.get_field('deadline').to_python(deadline)
+
+
+def task_key(task):
+    return make_key(task.owner_id, task.status, task.deadline)
+
+
+def _bump(model, delta, **lookup):
+    if not delta:
+        return
+    if model.objects.filter(**lookup).update(count=F('count') + delta):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(count=delta, **lookup)
+    except IntegrityError:
+        # Another writer created the row between our update and insert.
+        model.objects.filter(**lookup).update(count=F('count') + delta)
+
+
+def apply_changes(changes):
+    '''
+    Apply an iterable of ((owner_id, status, deadline), delta) pairs to the
+    rollup tables, merging deltas so each counter row is touched once.
+    '''
+    by_status, by_owner, by_deadline = Counter(), Counter(), Counter()
+    for (owner_id, status, deadline), delta in changes:
+        by_status[status] += delta
+        by_owner[owner_id, status] += delta
+        if status != DONE:
+            by_deadline[owner_id, deadline] += delta
+
+    for status, delta in by_status.items():
+        _bump(TaskStatusCounter, delta, status=status)
+    for (owner_id, status), delta in by_owner.items():
+        _bump(TaskOwnerCounter, delta, owner_id=owner_id, status=status)
+    for (owner_id, deadline), delta in by_deadline.items():
+        _bump(TaskDeadlineCounter, delta, owner_id=owner_id, deadline=deadline)
+
+
+def task_saved(task, created, old_key=None):
+    new_key = task_key(task)
+    if created or old_key is None:
+        apply_changes([(new_key, 1)])
+    elif old_key != new_key:
+        apply_changes([(old_key, -1), (new_key, 1)])
+
+
+def task_deleted(task):
+    apply_changes([(task_key(task), -1)])
+
+
+def _grouped(queryset):
+    rows = queryset.order_by().values(*KEY_FIELDS).annotate(n=Count('pk'))
+    return [(tuple(row[f] for f in KEY_FIELDS), row['n']) for row in rows]
+
+
+def _new_values(values):
+    new = {}
+    if 'owner' in values:
+        new['owner_id'] = getattr(values['owner'], 'pk', values['owner'])
+    for field in KEY_FIELDS:
+        if field in values:
+            new[field] = values[field]
+    return new
+
+
+def track_update(queryset, values, update):
+    '''
+    Run ``update(**values)`` for a Task queryset and move the affected rows
+    between counters. Plain values are applied to the grouped "before" keys,
+    expressions force a re-read of the updated rows.
+    '''
+    new = _new_values(values)
+    if any(hasattr(v, 'resolve_expression') for v in new.values()):
+        tasks = Task.objects.filter(pk__in=list(queryset.values_list('pk', flat=True)))
+        before = _grouped(tasks)
+        rows = update(**values)
+        after = _grouped(tasks)
+    else:
+        before = _grouped(queryset)
+        rows = update(**values)
+        after = [(make_key(**dict(zip(KEY_FIELDS, key), **new)), n) for key, n in before]
+
+    apply_changes([(key, -n) for key, n in before] + after)
+    return rows
+
+
+def track_bulk_create(tasks):
+    apply_changes((task_key(task), 1) for task in tasks)
+
+
+def rebuild():
+    '''
+    Recompute every counter from task_manager_task in one transaction.
+    '''
+    with transaction.atomic():
+        for model in (TaskStatusCounter, TaskOwnerCounter, TaskDeadlineCounter):
+            model.objects.all().delete()
+
+        tasks = Task.objects.order_by()
+        TaskStatusCounter.objects.bulk_create(
+            TaskStatusCounter(status=row['status'], count=row['n'])
+            for row in tasks.values('status').annotate(n=Count('pk'))
+        )
+        TaskOwnerCounter.objects.bulk_create(
+            (TaskOwnerCounter(owner_id=row['owner_id'], status=row['status'], count=row['n'])
+             for row in tasks.values('owner_id', 'status').annotate(n=Count('pk'))),
+            batch_size=1000,
+        )
+        TaskDeadlineCounter.objects.bulk_create(
+            (TaskDeadlineCounter(owner_id=row['owner_id'], deadline=row['deadline'], count=row['n'])
+             for row in tasks.exclude(status=DONE).values('owner_id', 'deadline').annotate(n=Count('pk'))),
+            batch_size=1000,
+        )
+
+
+def get_statistics(owner_id=None):
+    statuses, deadlines = _statistics_querysets(owner_id)
+    return _statistics(statuses, deadlines.aggregate(total=Sum('count'))['total'])
+
+
+async def aget_statistics(owner_id=None):
+    statuses, deadlines = _statistics_querysets(owner_id)
+    statuses = [row async for row in statuses]
+    return _statistics(statuses, (await deadlines.aaggregate(total=Sum('count')))['total'])
+
+
+def _statistics_querysets(owner_id):
+    statuses = TaskStatusCounter.objects.all()
+    deadlines = TaskDeadlineCounter.objects.filter(deadline__lt=now().date())
+    if owner_id is not None:
+        statuses = TaskOwnerCounter.objects.filter(owner_id=owner_id)
+        deadlines = deadlines.filter(owner_id=owner_id)
+    return statuses.filter(count__gt=0).values_list('status', 'count'), deadlines
+
+
+def _statistics(statuses, overdue):
+    status_labels = dict(STATUS_CHOICES)
+    by_status = {status_labels.get(status, status): count for status, count in statuses}
+    return {
+        'total_tasks': sum(by_status.values()),
+        'by_status': by_status,
+        'overdue': overdue or 0,
+    }
+
+
+def adjust_category_counts(deltas):
+    '''
+    Apply {category_id: delta} to Category.task_count. A no-op unless
+    settings.CATEGORY_TASK_COUNTS_DENORMALIZED is on.
+    '''
+    if not settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+        return
+    by_delta = defaultdict(list)
+    for category_id, delta in deltas.items():
+        if delta:
+            by_delta[delta].append(category_id)
+    for delta, category_ids in by_delta.items():
+        Category.all_objects.filter(pk__in=category_ids).update(task_count=F('task_count') + delta)
+
+
+def count_category_links(links):
+    '''
+    Counter of category ids in a queryset of Task.categories through rows,
+    empty (without a query) unless the counts are denormalized.
+    '''
+    if not settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+        return Counter()
+    return Counter(links.values_list('category_id', flat=True))
+
+
+def rebuild_category_counts():
+    '''
+    Recompute Category.task_count from the Task.categories through table.
+    '''
+    links = (Task.categories.through.objects.filter(category_id=OuterRef('pk'))
+             .order_by().values('category_id').annotate(n=Count('pk')).values('n'))
+    Category.all_objects.update(task_count=Coalesce(Subquery(links), 0))
@@ -0,0 +1,43 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+class _Echo:
+    '''
+    File-like object for csv.writer that hands back the line instead of
+    buffering it.
+    '''
+    def write(self, value):
+        return value
+
+
+def encode_ndjson(columns, rows, batch_size=500):
+    encode = DjangoJSONEncoder(ensure_ascii=False).encode
+    lines = []
+    for row in rows:
+        lines.append(encode(dict(zip(columns, row))) + '\n')
+        if len(lines) >= batch_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def encode_csv(columns, rows, batch_size=500):
+    writer = csv.writer(_Echo())
+    lines = [writer.writerow(columns)]
+    for row in rows:
+        lines.append(writer.writerow(row))
+        if len(lines) >= batch_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+# ?output=<name> -> (content type, file extension, encoder)
+EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'ndjson', encode_ndjson),
+    'csv': ('text/csv', 'csv', encode_csv),
+}
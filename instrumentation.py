@@ -0,0 +1,225 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+
+# Metrics of the request being handled, copied into sync_to_async threads with the context.
+current = ContextVar('request_metrics', default=None)
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+
+class RequestMetrics:
+    __slots__ = ('queries', 'db_time', 'statements', 'serializer_time')
+
+    def __init__(self):
+        self.queries, self.db_time, self.statements, self.serializer_time = 0, 0.0, set(), 0.0
+
+    @property
+    def duplicates(self):
+        # Statements run again with the same SQL, usually one query per row of a loop.
+        return self.queries - len(self.statements)
+
+    def server_timing(self, duration):
+        return (f'view;dur={duration * 1000:.1f}, '
+                f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+                f'dup;desc="{self.duplicates} duplicate queries", '
+                f'serializer;dur={self.serializer_time * 1000:.1f}')
+
+
+def record_query(execute, sql, params, many, context):
+    metrics = current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += perf_counter() - started
+        metrics.queries += 1
+        metrics.statements.add(sql)
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    # Fires again when a persistent connection reconnects.
+    if settings.REQUEST_METRICS and record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def time_serializer(function):
+    '''
+    Count the time spent in ``function`` as serializer time of the request.
+    '''
+    def timed(*args, **kwargs):
+        metrics = current.get()
+        if metrics is None:
+            return function(*args, **kwargs)
+        started = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            metrics.serializer_time += perf_counter() - started
+    return timed
+
+
+class SerializerTimingMixin:
+    '''
+    For generic views: times the serializer's to_representation(), which
+    is where .data spends its time (lazy relations' queries included).
+    '''
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        serializer.to_representation = time_serializer(serializer.to_representation)
+        return serializer
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets, self.counts, self.sum, self.count = buckets, [0] * (len(buckets) + 1), 0, 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        '''
+        Estimate like Prometheus' histogram_quantile(): linear within the
+        bucket holding the rank, the highest finite bound above the last one.
+        '''
+        rank, seen = q * self.count, 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0
+                return lower + (self.buckets[index] - lower) * (rank - seen) / count
+            seen += count
+        return 0
+
+
+class MetricsRegistry:
+    '''
+    Per-process histograms by (route, method). Each worker exposes its own,
+    Prometheus sums them across scrape targets.
+    '''
+    prefix = 'task_manager_'
+    quantiles = (0.5, 0.95, 0.99)
+    metrics = (
+        ('request_duration_seconds', 'Time spent handling the request below the metrics middleware.',
+         DURATION_BUCKETS, lambda duration, m: duration),
+        ('db_duration_seconds', 'Time spent executing database queries.',
+         DURATION_BUCKETS, lambda duration, m: m.db_time),
+        ('serializer_duration_seconds', 'Time spent serializing response data.',
+         DURATION_BUCKETS, lambda duration, m: m.serializer_time),
+        ('db_queries', 'Database queries per request.',
+         QUERY_BUCKETS, lambda duration, m: m.queries),
+        ('db_duplicate_queries', 'Queries per request that repeat an earlier statement (N+1 pattern).',
+         QUERY_BUCKETS, lambda duration, m: m.duplicates),
+    )
+
+    def __init__(self):
+        self._routes = {}
+        self._lock = Lock()
+
+    def observe(self, route, method, duration, metrics):
+        with self._lock:
+            histograms = self._routes.get((route, method))
+            if histograms is None:
+                histograms = self._routes[route, method] = [Histogram(buckets) for _, _, buckets, _ in self.metrics]
+            for histogram, (_, _, _, value) in zip(histograms, self.metrics):
+                histogram.observe(value(duration, metrics))
+
+    def clear(self):
+        with self._lock:
+            self._routes.clear()
+
+    def render(self):
+        '''
+        The histograms in the Prometheus text format, plus the p50/p95/p99
+        estimates as ``<name>_quantile`` gauges.
+        '''
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines = []
+            for index, (name, help_text, buckets, _) in enumerate(self.metrics):
+                name = self.prefix + name
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (route, method), histograms in routes:
+                    histogram, labels = histograms[index], self.labels(route, method)
+                    cumulative = 0
+                    for bound, count in zip((*buckets, '+Inf'), histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{{labels}}} {histogram.sum}')
+                    lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+
+                lines += [f'# HELP {name}_quantile {help_text} Estimated from the histogram.',
+                          f'# TYPE {name}_quantile gauge']
+                for (route, method), histograms in routes:
+                    labels = self.labels(route, method)
+                    for q in self.quantiles:
+                        lines.append(f'{name}_quantile{{{labels},quantile="{q}"}} {histograms[index].quantile(q):g}')
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def labels(route, method):
+        route = route.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        return f'route="{route}",method="{method}"'
+
+
+registry = MetricsRegistry()
+
+
+class ServerTimingMiddleware:
+    '''
+    Records query count, database time, duplicate queries, serializer
+    time and total time of every request. They are sent back in a
+    Server-Timing header and added to ``registry`` under the URL route.
+    Enabled by REQUEST_METRICS, place it first to time the whole stack.
+    '''
+    sync_capable = async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, started = RequestMetrics(), perf_counter()
+        token = current.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, perf_counter() - started)
+
+    async def __acall__(self, request):
+        metrics, started = RequestMetrics(), perf_counter()
+        token = current.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current.reset(token)
+        return self.finish(request, response, metrics, perf_counter() - started)
+
+    def finish(self, request, response, metrics, duration):
+        response['Server-Timing'] = metrics.server_timing(duration)
+        match = request.resolver_match
+        registry.observe(match.route if match else '<unmatched>', request.method, duration, metrics)
+        return response
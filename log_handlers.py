@@ -0,0 +1,90 @@
+import os
+import queue
+from logging import Filter
+from logging.handlers import QueueHandler, QueueListener, TimedRotatingFileHandler
+from random import random
+
+from django.utils.module_loading import import_string
+
+
+class BackgroundHandler(QueueHandler):
+    '''
+    Puts records on a bounded queue and lets a QueueListener thread format
+    and write them through ``handler``, a dict with the handler's ``class``
+    and its arguments. The formatter configured for this handler is used by
+    that one. Level and filters still run in the logging thread, so
+    records dropped by them never reach the queue. When the queue is full
+    records are dropped (and counted) rather than blocking the caller.
+    '''
+    def __init__(self, handler, queue_size=10000):
+        handler = dict(handler)
+        self.target = import_string(handler.pop('class'))(**handler)
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        self.listener = QueueListener(self.queue, self.target, respect_handler_level=True)
+        self.listener.start()
+
+    def setFormatter(self, fmt):
+        self.target.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Formatting is left to the listener thread, the queue never leaves the process.
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        # logging.shutdown() at exit lands here: write what is queued, then close the file.
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.target.close()
+        super().close()
+
+
+class SizedTimedRotatingFileHandler(TimedRotatingFileHandler):
+    '''
+    TimedRotatingFileHandler that also rotates once the file reaches
+    ``maxBytes``. Files rotated more than once in a period get a numeric
+    suffix, and count towards ``backupCount`` like the others.
+    '''
+    def __init__(self, filename, maxBytes=0, **kwargs):
+        self.maxBytes = maxBytes
+        super().__init__(filename, **kwargs)
+
+    def shouldRollover(self, record):
+        if super().shouldRollover(record):
+            return True
+        if not self.maxBytes:
+            return False
+        if self.stream is None:
+            self.stream = self._open()
+        return self.stream.tell() >= self.maxBytes
+
+    def rotation_filename(self, default_name):
+        name = candidate = super().rotation_filename(default_name)
+        number = 1
+        while os.path.exists(candidate):
+            candidate = f'{name}.{number}'
+            number += 1
+        return candidate
+
+
+class SampledQueryFilter(Filter):
+    '''
+    For django.db.backends: passes a ``rate`` fraction of the statements
+    and every statement that took ``slow_seconds`` or longer.
+    '''
+    def __init__(self, rate=1.0, slow_seconds=None):
+        super().__init__()
+        self.rate, self.slow_seconds = rate, slow_seconds
+
+    def filter(self, record):
+        duration = getattr(record, 'duration', None)
+        if self.slow_seconds is not None and duration is not None and duration >= self.slow_seconds:
+            return True
+        return random() < self.rate
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from statistics import quantiles
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare requests/s and latency of the sync views under WSGI with the async views (ASYNC_VIEWS) '
+        'under ASGI at a given concurrency. Requests are sent straight to the Django handlers in a '
+        'subprocess per mode, so the numbers leave out the server and the network. Read-only, runs '
+        'against the configured database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000, help='Requests per mode and path')
+        parser.add_argument('--concurrency', type=int, default=100,
+                            help='Requests in flight, threads for WSGI and tasks for ASGI')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='GET path to request, repeatable (default /tasks/ and /subtasks/)')
+        parser.add_argument('--cache', action='store_true', help='Keep the list response cache on')
+        parser.add_argument('--mode', choices=['wsgi', 'asgi'], help='Run one mode in this process (internal)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/tasks/', '/subtasks/']
+        if options['mode']:
+            run = self.run_wsgi if options['mode'] == 'wsgi' else self.run_asgi
+            for path in paths:
+                self.stdout.write(json.dumps({'path': path, **run(path, options['requests'], options['concurrency'])}))
+            return
+
+        self.stdout.write(f"{options['requests']} requests per path, {options['concurrency']} concurrent")
+        for mode, async_views in (('wsgi', '0'), ('asgi', '1')):
+            for result in self.run_mode(mode, async_views, paths, options):
+                self.stdout.write(
+                    f"{mode.upper():<5} {result['path']:<30} {result['requests'] / result['seconds']:>9,.0f} req/s"
+                    f"  p50 {result['p50'] * 1000:>7.1f} ms  p99 {result['p99'] * 1000:>7.1f} ms"
+                    f"  errors {result['errors']}"
+                )
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def run_mode(self, mode, async_views, paths, options):
+        env = {**os.environ, 'ASYNC_VIEWS': async_views}
+        if not options['cache']:
+            env['RESPONSE_CACHE_TIMEOUT'] = '0'
+        command = [sys.executable, sys.argv[0], 'benchmark_async_views', '--mode', mode,
+                   '--requests', str(options['requests']), '--concurrency', str(options['concurrency'])]
+        for path in paths:
+            command += ['--path', path]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'{mode} run failed:\n{completed.stderr}')
+        return [json.loads(line) for line in completed.stdout.splitlines() if line.startswith('{')]
+
+    def run_wsgi(self, path, count, concurrency):
+        from django.core.handlers.wsgi import WSGIHandler
+
+        handler = WSGIHandler()
+        url = urlsplit(path)
+
+        def request():
+            environ = {
+                'REQUEST_METHOD': 'GET', 'PATH_INFO': url.path, 'QUERY_STRING': url.query,
+                'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+                'SERVER_PROTOCOL': 'HTTP/1.1', 'wsgi.url_scheme': 'http', 'wsgi.input': BytesIO(),
+                'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+            }
+            statuses = []
+            started = time.perf_counter()
+            body = handler(environ, lambda status, headers: statuses.append(int(status.split()[0])))
+            b''.join(body)
+            body.close()
+            return time.perf_counter() - started, statuses[0]
+
+        request()  # warm up
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            started = time.perf_counter()
+            results = list(executor.map(lambda _: request(), range(count)))
+            seconds = time.perf_counter() - started
+        return self.summarize(results, seconds)
+
+    def run_asgi(self, path, count, concurrency):
+        from django.core.asgi import get_asgi_application
+
+        application = get_asgi_application()
+        url = urlsplit(path)
+
+        async def request():
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET',
+                'scheme': 'http', 'path': url.path, 'raw_path': url.path.encode(),
+                'query_string': url.query.encode(), 'headers': [(b'host', b'localhost')],
+                'server': ('localhost', 80), 'client': ('127.0.0.1', 0),
+            }
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            statuses = []
+
+            async def receive():
+                if messages:
+                    return messages.pop()
+                # The client never disconnects, Django cancels this once it responded.
+                await asyncio.Event().wait()
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            started = time.perf_counter()
+            await application(scope, receive, send)
+            return time.perf_counter() - started, statuses[0]
+
+        async def run():
+            await request()  # warm up
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def limited():
+                async with semaphore:
+                    return await request()
+
+            started = time.perf_counter()
+            results = await asyncio.gather(*(limited() for _ in range(count)))
+            return results, time.perf_counter() - started
+
+        return self.summarize(*asyncio.run(run()))
+
+    def summarize(self, results, seconds):
+        latencies = sorted(latency for latency, _ in results)
+        percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'requests': len(results),
+            'seconds': seconds,
+            'errors': sum(1 for _, status in results if status >= 400),
+            'p50': percentiles[49],
+            'p99': percentiles[98],
+        }
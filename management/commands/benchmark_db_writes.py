@@ -0,0 +1,118 @@
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from statistics import quantiles
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare write throughput and "database is locked" errors with the DB_TUNING connection settings '
+        'off and on: --concurrency threads create --writes tasks through POST /tasks/. Under SQLite each '
+        'profile writes to its own copy of the database; otherwise the rows are deleted afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writes', type=int, default=1000)
+        parser.add_argument('--concurrency', type=int, default=16)
+        parser.add_argument('--profile', choices=['default', 'tuned'], help='Run one profile in this process (internal)')
+
+    def handle(self, *args, **options):
+        if options['profile']:
+            self.stdout.write(json.dumps(self.run(options['writes'], options['concurrency'])))
+            return
+
+        self.stdout.write(f"{options['writes']} task creations, {options['concurrency']} concurrent writers")
+        with tempfile.TemporaryDirectory() as directory:
+            for profile, tuning in (('default', '0'), ('tuned', '1')):
+                env = {**os.environ, 'DB_TUNING': tuning}
+                if connection.vendor == 'sqlite':
+                    env['SQLITE_PATH'] = self.copy_database(os.path.join(directory, f'{profile}.sqlite3'))
+                result = self.run_profile(profile, env, options)
+                self.stdout.write(
+                    f"{profile:<8} {result['writes'] / result['seconds']:>8,.0f} writes/s"
+                    f"  p50 {result['p50'] * 1000:>7.1f} ms  p99 {result['p99'] * 1000:>7.1f} ms"
+                    f"  locked {result['locked']}  other errors {result['errors']}"
+                )
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def copy_database(self, path):
+        # The backup API also copies what is still in the WAL file.
+        source, target = sqlite3.connect(settings.DATABASES['default']['NAME']), sqlite3.connect(path)
+        with target:
+            source.backup(target)
+        source.close()
+        target.close()
+        return path
+
+    def run_profile(self, profile, env, options):
+        command = [sys.executable, sys.argv[0], 'benchmark_db_writes', '--profile', profile,
+                   '--writes', str(options['writes']), '--concurrency', str(options['concurrency'])]
+        completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'{profile} run failed:\n{completed.stderr}')
+        return json.loads(completed.stdout.splitlines()[-1])
+
+    def run(self, count, concurrency):
+        from django.contrib.auth.models import User
+        from django.test import Client
+        from django.utils.timezone import now
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        from task_manager.models import Category
+
+        if connection.vendor == 'sqlite' and not settings.DB_TUNING:
+            # WAL is a property of the file, the copy may have inherited it.
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=DELETE')
+
+        name = f'benchmark-db-writes-{uuid4().hex[:8]}'
+        user = User.objects.create_user(name)
+        category = Category.objects.create(name=name)
+        token = str(AccessToken.for_user(user))
+        deadline = (now().date() + timedelta(days=30)).isoformat()
+        local = threading.local()
+
+        def write(i):
+            if not hasattr(local, 'client'):
+                local.client = Client(HTTP_HOST='localhost', headers={'Authorization': f'Bearer {token}'})
+            data = {'title': f'{name} {i}', 'description': 'Benchmark', 'deadline': deadline,
+                    'categories': [category.pk]}
+            started = time.perf_counter()
+            try:
+                status = local.client.post('/tasks/', data, content_type='application/json').status_code
+            except OperationalError as e:
+                status = 'locked' if 'locked' in str(e) else 'error'
+            return time.perf_counter() - started, status
+
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                started = time.perf_counter()
+                results = list(executor.map(write, range(count)))
+                seconds = time.perf_counter() - started
+        finally:
+            if connection.vendor != 'sqlite':
+                user.delete()
+                category.delete()
+
+        latencies = sorted(latency for latency, _ in results)
+        percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+        return {
+            'writes': sum(1 for _, status in results if status == 201),
+            'seconds': seconds,
+            'locked': sum(1 for _, status in results if status == 'locked'),
+            'errors': sum(1 for _, status in results if status not in (201, 'locked')),
+            'p50': percentiles[49],
+            'p99': percentiles[98],
+        }
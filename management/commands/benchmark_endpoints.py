@@ -0,0 +1,278 @@
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import timedelta
+from http.client import HTTPConnection
+from io import StringIO
+from statistics import mean, quantiles
+from typing import Callable, Optional
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from task_manager.management.commands.seed import WORDS
+
+
+STATUSES = ['N', 'IP', 'D', 'P', 'B']
+SAMPLE = 10000
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+
+@dataclass(frozen=True)
+class Scenario:
+    weight: int
+    method: str
+    path: Callable  # (rng, data) -> path
+    body: Optional[Callable] = None  # (rng, data) -> JSON body
+    token: Optional[str] = None  # 'user' or 'admin'
+
+
+def task_body(rng, data):
+    return {'title': f'{rng.choice(WORDS)} {rng.getrandbits(48):x}', 'description': 'Benchmark',
+            'deadline': data['deadline'], 'status': rng.choice(STATUSES), 'categories': [rng.choice(data['categories'])]}
+
+
+def update_body(rng, data):
+    task = data['tasks'][data['own_task']]
+    return {'title': task['title'], 'deadline': task['deadline'], 'status': rng.choice(STATUSES)}
+
+
+# Every route in task_manager/urls.py that serves the API; weights are the default mix.
+SCENARIOS = {
+    'task_list': Scenario(10, 'GET', lambda rng, data: '/tasks/'),
+    'task_list_filtered': Scenario(5, 'GET', lambda rng, data: f'/tasks/?status={rng.choice(STATUSES)}&ordering=created_at'),
+    'task_search': Scenario(5, 'GET', lambda rng, data: f'/tasks/?search={rng.choice(WORDS)}'),
+    'task_weekday': Scenario(3, 'GET', lambda rng, data: f'/tasks/?weekday={rng.choice(WEEKDAYS)}'),
+    'task_expand': Scenario(3, 'GET', lambda rng, data: '/tasks/?expand=subtasks,categories,owner'),
+    'task_detail': Scenario(10, 'GET', lambda rng, data: f"/tasks/{rng.choice(data['tasks'])['id']}/"),
+    'task_create': Scenario(3, 'POST', lambda rng, data: '/tasks/', task_body, token='user'),
+    'task_update': Scenario(3, 'PATCH', lambda rng, data: f"/tasks/{data['tasks'][data['own_task']]['id']}/",
+                            update_body, token='user'),
+    'task_statistics': Scenario(2, 'GET', lambda rng, data: '/tasks/statistics/', token='admin'),
+    'my_tasks': Scenario(3, 'GET', lambda rng, data: '/tasks/my/', token='user'),
+    'subtask_list': Scenario(5, 'GET', lambda rng, data: '/subtasks/'),
+    'subtask_detail': Scenario(5, 'GET', lambda rng, data: f"/subtasks/{rng.choice(data['subtasks'])}/"),
+    'category_list': Scenario(3, 'GET', lambda rng, data: '/categories/'),
+    'category_counts': Scenario(2, 'GET', lambda rng, data: '/categories/?with_counts=1'),
+    'category_count_tasks': Scenario(2, 'GET',
+                                     lambda rng, data: f"/categories/{rng.choice(data['categories'])}/count_tasks/"),
+}
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    help = (
+        'Serve the API over HTTP from a seeded SQLite database and drive every endpoint with a weighted '
+        'mix of requests from --concurrency clients. Reports throughput, latency percentiles and queries '
+        'per request for each scenario, writes them as JSON (--output) and compares them with a saved '
+        'baseline (--baseline), failing on regressions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=3000, help='Requests in the measured run')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--mix', default='',
+                            help='Scenario weights overriding the defaults, e.g. task_list=20,task_create=0. '
+                                 f"Scenarios: {', '.join(SCENARIOS)}")
+        parser.add_argument('--seed', type=int, default=1, help='Seed of the dataset and the request sequence')
+        parser.add_argument('--tasks', type=int, default=2000, help='Tasks in the generated dataset')
+        parser.add_argument('--database', help='Use this SQLite file instead of a fresh seeded copy (it is written to)')
+        parser.add_argument('--no-cache', action='store_true', help='Turn the list response cache off')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--baseline', help='Results file of an earlier run to compare with')
+        parser.add_argument('--tolerance', type=float, default=0.25,
+                            help='Allowed relative p95 latency increase over the baseline')
+        parser.add_argument('--run', action='store_true', help='Serve and measure in this process (internal)')
+
+    def handle(self, *args, **options):
+        weights = self.parse_mix(options['mix'])
+        if options['run']:
+            self.stdout.write(json.dumps(self.run(weights, options)))
+            return
+
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, 'SQLITE_PATH': options['database'] or os.path.join(directory, 'benchmark.sqlite3'),
+                   'REQUEST_METRICS': 'True'}
+            if options['no_cache']:
+                env['RESPONSE_CACHE_TIMEOUT'] = '0'
+            command = [sys.executable, sys.argv[0], 'benchmark_endpoints', '--run', '--mix', options['mix'],
+                       '--requests', str(options['requests']), '--concurrency', str(options['concurrency']),
+                       '--seed', str(options['seed']), '--tasks', str(options['tasks'])]
+            if options['database']:
+                command += ['--database', options['database']]
+            completed = subprocess.run(command, env=env, capture_output=True, text=True)
+        if completed.returncode:
+            raise CommandError(f'Benchmark run failed:\n{completed.stderr}')
+        results = json.loads(completed.stdout.splitlines()[-1])
+
+        self.report(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            self.stdout.write(f"Results written to {options['output']}")
+        if options['baseline']:
+            self.compare(results, options['baseline'], options['tolerance'])
+
+    def parse_mix(self, mix):
+        weights = {name: scenario.weight for name, scenario in SCENARIOS.items()}
+        for item in filter(None, mix.split(',')):
+            name, _, weight = item.partition('=')
+            if name not in SCENARIOS or not weight.isdigit():
+                raise CommandError(f'Invalid --mix item: {item}')
+            weights[name] = int(weight)
+        return {name: weight for name, weight in weights.items() if weight}
+
+    def run(self, weights, options):
+        from django.core.servers.basehttp import ThreadedWSGIServer
+        from django.core.wsgi import get_wsgi_application
+        from django.test.testcases import QuietWSGIRequestHandler
+
+        if not options['database']:
+            call_command('migrate', verbosity=0)
+        data = self.prepare_data(options['seed'], options['tasks'])
+
+        # Without TCP_NODELAY every keep-alive response waits out the client's delayed ACK (~40 ms).
+        handler = type('RequestHandler', (QuietWSGIRequestHandler,), {'disable_nagle_algorithm': True})
+        server = ThreadedWSGIServer(('127.0.0.1', 0), handler, allow_reuse_address=False)
+        server.set_app(get_wsgi_application())
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            self.drive(server.server_address[1], weights, data, options['seed'], options['concurrency'], 50)
+            started = time.perf_counter()
+            samples = self.drive(server.server_address[1], weights, data, options['seed'] + 1,
+                                 options['concurrency'], options['requests'])
+            seconds = time.perf_counter() - started
+        finally:
+            server.shutdown()
+            server.server_close()
+        return self.summarize(samples, seconds, options)
+
+    def prepare_data(self, seed, count):
+        from django.contrib.auth.models import User
+        from django.utils.timezone import now
+
+        from task_manager.models import Category, SubTask, Task
+        from task_manager.serializers import ClaimsTokenObtainPairSerializer
+
+        rng = random.Random(seed)
+        deadline = now().date() + timedelta(days=30)
+        if not Task.objects.exists():
+            call_command('seed', seed=seed, tasks=count, users=max(count // 50, 20), categories=50, stdout=StringIO())
+
+        user, _ = User.objects.get_or_create(username='benchmark-user')
+        admin, _ = User.objects.get_or_create(username='benchmark-admin', defaults={'is_staff': True})
+        own = Task.objects.create(title=f'Benchmark own {rng.getrandbits(32):x}', description='Benchmark',
+                                  owner=user, deadline=deadline)
+        own.categories.add(Category.objects.first())
+
+        # A sample of the most recent rows is enough to spread the requests.
+        tasks = list(Task.objects.order_by('-id').values('id', 'title', 'deadline')[:SAMPLE])
+        for task in tasks:
+            task['deadline'] = task['deadline'].isoformat()
+        return {
+            'tasks': tasks,
+            'own_task': next(i for i, task in enumerate(tasks) if task['id'] == own.pk),
+            'subtasks': list(SubTask.objects.order_by('-id').values_list('id', flat=True)[:SAMPLE]),
+            'categories': list(Category.objects.values_list('id', flat=True)),
+            'deadline': deadline.isoformat(),
+            'tokens': {
+                'user': str(ClaimsTokenObtainPairSerializer.get_token(user).access_token),
+                'admin': str(ClaimsTokenObtainPairSerializer.get_token(admin).access_token),
+            },
+        }
+
+    def drive(self, port, weights, data, seed, concurrency, count):
+        '''
+        Send ``count`` requests from ``concurrency`` keep-alive connections.
+        The scenario sequence depends only on ``seed``.
+        '''
+        rng = random.Random(seed)
+        names = rng.choices(list(weights), weights=list(weights.values()), k=count)
+        requests = []
+        for name in names:
+            scenario = SCENARIOS[name]
+            body = scenario.body(rng, data) if scenario.body else None
+            headers = {'Content-Type': 'application/json'}
+            if scenario.token:
+                headers['Authorization'] = f"Bearer {data['tokens'][scenario.token]}"
+            requests.append((name, scenario.method, scenario.path(rng, data), body and json.dumps(body), headers))
+
+        local = threading.local()
+
+        def send(request):
+            name, method, path, body, headers = request
+            if not hasattr(local, 'connection'):
+                local.connection = HTTPConnection('127.0.0.1', port, timeout=60)
+            started = time.perf_counter()
+            local.connection.request(method, path, body=body, headers=headers)
+            response = local.connection.getresponse()
+            response.read()
+            latency = time.perf_counter() - started
+            if response.getheader('Connection', '').lower() == 'close':
+                local.connection.close()
+                del local.connection
+            queries = QUERIES.search(response.getheader('Server-Timing', ''))
+            return name, latency, response.status, int(queries.group(1)) if queries else None
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            return list(executor.map(send, requests))
+
+    def summarize(self, samples, seconds, options):
+        scenarios = {}
+        for name in sorted({name for name, *_ in samples}):
+            latencies = sorted(latency for sample, latency, _, _ in samples if sample == name)
+            queries = [count for sample, _, _, count in samples if sample == name and count is not None]
+            percentiles = quantiles(latencies, n=100) if len(latencies) > 1 else latencies * 99
+            scenarios[name] = {
+                'requests': len(latencies),
+                'errors': sum(1 for sample, _, status, _ in samples if sample == name and status >= 400),
+                'requests_per_second': round(len(latencies) / seconds, 2),
+                'p50_ms': round(percentiles[49] * 1000, 2),
+                'p95_ms': round(percentiles[94] * 1000, 2),
+                'p99_ms': round(percentiles[98] * 1000, 2),
+                'queries_mean': round(mean(queries), 2) if queries else None,
+                'queries_max': max(queries) if queries else None,
+            }
+        return {
+            'settings': {key: options[key] for key in ('requests', 'concurrency', 'mix', 'seed', 'tasks', 'no_cache')},
+            'requests_per_second': round(len(samples) / seconds, 2),
+            'scenarios': scenarios,
+        }
+
+    def report(self, results):
+        self.stdout.write(f"{'scenario':<22} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} "
+                          f"{'p95 ms':>8} {'p99 ms':>8} {'queries':>8}")
+        for name, result in results['scenarios'].items():
+            self.stdout.write(
+                f"{name:<22} {result['requests']:>8} {result['errors']:>6} {result['requests_per_second']:>8.1f} "
+                f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {result['p99_ms']:>8.1f} "
+                f"{result['queries_mean'] if result['queries_mean'] is not None else '-':>8}"
+            )
+        self.stdout.write(f"Total: {results['requests_per_second']:.1f} requests/s")
+
+    def compare(self, results, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results['scenarios'].items():
+            before = baseline['scenarios'].get(name)
+            if before is None:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+                regressions.append(f"{name}: p95 {before['p95_ms']} ms -> {result['p95_ms']} ms")
+            if (result['queries_max'] or 0) > (before['queries_max'] or 0):
+                regressions.append(f"{name}: queries per request {before['queries_max']} -> {result['queries_max']}")
+            if result['errors'] > before['errors']:
+                regressions.append(f"{name}: errors {before['errors']} -> {result['errors']}")
+        if regressions:
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {path}.'))
@@ -0,0 +1,74 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from task_manager.models import Task, Category
+from task_manager.serializers import TaskSerializer, TaskCreateSerializer
+from task_manager.sparse import RowPlan
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare rows/s of the task serializers with the values() fast path used by list views. '
+        'Runs on --rows generated tasks inside a transaction that is rolled back.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=5000)
+        parser.add_argument('--repeat', type=int, default=3, help='Best of this many runs is reported')
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self.create_rows(options['rows'])
+            queryset = Task.objects.order_by('-created_at', '-id')
+            results = [
+                ('TaskSerializer', lambda: TaskSerializer(list(queryset), many=True).data),
+                ('TaskSerializer fast path', self.fast(TaskSerializer, queryset)),
+                ('TaskSerializer fast path, ?fields=id,title,status',
+                 self.fast(TaskSerializer, queryset, ['id', 'title', 'status'])),
+                ('TaskCreateSerializer', lambda: TaskCreateSerializer(
+                    list(queryset.prefetch_related('categories')), many=True).data),
+                ('TaskCreateSerializer fast path', self.fast(TaskCreateSerializer, queryset)),
+            ]
+
+            baseline = {}
+            for name, run in results:
+                rate = self.measure(run, options['repeat'])
+                base = baseline.setdefault(name.split(' ')[0], rate)
+                self.stdout.write(f'{name:<55} {rate:>12,.0f} rows/s  x{rate / base:.1f}')
+            transaction.set_rollback(True)
+
+    def create_rows(self, count):
+        owner = User.objects.create_user('benchmark-serialization')
+        categories = Category.objects.bulk_create(
+            [Category(name=f'benchmark-serialization-{i}') for i in range(5)])
+        deadline = now().date() + timedelta(days=30)
+        tasks = Task.objects.without_counters().bulk_create(
+            [Task(title=f'Benchmark task {i}', description='x' * 500, owner=owner, deadline=deadline)
+             for i in range(count)],
+            batch_size=1000,
+        )
+        through = Task.categories.through
+        through.objects.bulk_create(
+            [through(task_id=task.pk, category_id=categories[i % 5].pk) for i, task in enumerate(tasks)],
+            batch_size=1000,
+        )
+        self.count = Task.objects.count()
+
+    def fast(self, serializer_class, queryset, fields=None):
+        serializer = serializer_class()
+        names = fields or [name for name, field in serializer.fields.items() if not field.write_only]
+        plan = RowPlan.build(serializer, Task, names)
+        return lambda: plan.render(list(queryset.values('id', *plan.attnames)))
+
+    def measure(self, run, repeat):
+        best = float('inf')
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            best = min(best, time.perf_counter() - started)
+        return self.count / best
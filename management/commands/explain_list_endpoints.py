@@ -0,0 +1,58 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.timezone import now
+
+from task_manager import urls
+from task_manager.queryplans import explain, list_endpoints, list_queryset
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the queryset of every list endpoint and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=50,
+                            help='LIMIT applied to each queryset, like one page of results')
+        parser.add_argument('--show-plan', action='store_true', help='Print the raw plan for each query')
+        parser.add_argument('--fail-on-scan', action='store_true',
+                            help='Exit with an error if any endpoint does a full table scan')
+
+    def handle(self, *args, **options):
+        today = now().date().isoformat()
+        scenarios = [
+            {},
+            {'status': 'N'},
+            {'deadline': today},
+            {'status': 'N', 'deadline': today},
+            {'weekday': 'Monday'},
+            {'weekday': 'Monday', 'status': 'N'},
+            {'ordering': 'created_at'},
+        ]
+        user = User.objects.order_by('pk').first() or User(pk=1, username='explain')
+
+        scans = 0
+        for route, cls, actions in list_endpoints(urls):
+            seen_sql = set()
+            for params in scenarios:
+                queryset = list_queryset(route, cls, actions, params, user)[:options['page_size']]
+                plan = explain(queryset)
+                # Skip filters the endpoint ignores, they would repeat the same query.
+                if plan.sql in seen_sql:
+                    continue
+                seen_sql.add(plan.sql)
+                query = '&'.join(f'{k}={v}' for k, v in params.items())
+                label = f"/{route}{'?' + query if query else ''}"
+                if plan.full_scans:
+                    scans += 1
+                    self.stdout.write(self.style.ERROR(
+                        f"{label}: FULL SCAN of {', '.join(plan.full_scans)}"
+                    ))
+                else:
+                    self.stdout.write(self.style.SUCCESS(
+                        f"{label}: uses {', '.join(plan.indexes) or 'no index'}"
+                    ))
+                if options['show_plan'] or plan.full_scans:
+                    self.stdout.write(f'    {plan.sql}')
+                    self.stdout.write('    ' + plan.plan.replace('\n', '\n    '))
+
+        if scans and options['fail_on_scan']:
+            raise CommandError(f'{scans} list queries do a full table scan')
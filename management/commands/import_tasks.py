@@ -0,0 +1,245 @@
+import csv
+import json
+import os
+import time
+from collections import Counter
+from datetime import date
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from task_manager import counters, versions
+from task_manager.models import Task, SubTask, Category, STATUS_CHOICES
+from task_manager.search import get_backend
+
+
+STATUSES = {value for value, _ in STATUS_CHOICES}
+
+
+class RowError(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        'Import tasks (with their category links) or subtasks from a CSV or JSONL file. '
+        'Task rows: title, description, status, deadline, owner (username), categories '
+        '("|"-separated names in CSV, a list in JSONL). Subtask rows: title, description, status, '
+        'deadline, owner, task_title, task_deadline. Rows whose key already exists are skipped, '
+        'so an interrupted import can be resumed from its checkpoint file.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--model', choices=['task', 'subtask'], default='task')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Input format, guessed from the file extension by default')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--checkpoint', help='Checkpoint file, defaults to <path>.checkpoint')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint')
+        parser.add_argument('--defer-indexes', action='store_true',
+                            help='Drop secondary and full-text indexes during the import and rebuild them at the end')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError(f'No such file: {path}')
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        model = Task if options['model'] == 'task' else SubTask
+        checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+
+        checkpoint = {'rows': 0, 'deferred': False}
+        if os.path.exists(checkpoint_path) and not options['restart']:
+            with open(checkpoint_path) as f:
+                checkpoint = json.load(f)
+            self.stdout.write(f"Resuming after row {checkpoint['rows']}")
+
+        if options['defer_indexes'] and not checkpoint['deferred']:
+            self.set_indexes(model, enabled=False)
+            checkpoint['deferred'] = True
+            self.save_checkpoint(checkpoint_path, checkpoint)
+
+        self.owners = dict(User.objects.values_list('username', 'id'))
+        self.categories = dict(Category.objects.values_list('name', 'id'))
+        import_batch = self.import_tasks if model is Task else self.import_subtasks
+
+        started = time.monotonic()
+        read = imported = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            records = islice(self.read_records(f, fmt), checkpoint['rows'], None)
+            while batch := list(islice(records, options['batch_size'])):
+                first_row = checkpoint['rows'] + 1
+                imported += import_batch(batch, first_row)
+                read += len(batch)
+                checkpoint['rows'] += len(batch)
+                self.save_checkpoint(checkpoint_path, checkpoint)
+
+                rate = read / max(time.monotonic() - started, 1e-9)
+                self.stdout.write(f"{checkpoint['rows']} rows read, {imported} imported, {rate:.0f} rows/s")
+
+        if model is Task:
+            counters.rebuild()
+        if checkpoint['deferred']:
+            self.stdout.write('Rebuilding indexes...')
+            self.set_indexes(model, enabled=True)
+        os.remove(checkpoint_path)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} of {read} rows in {elapsed:.1f}s ({read / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
+
+    def read_records(self, f, fmt):
+        if fmt == 'csv':
+            yield from csv.DictReader(f)
+            return
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                # Keep the row count aligned with the checkpoint, the row is reported as invalid.
+                yield None
+
+    def save_checkpoint(self, path, checkpoint):
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp, path)
+
+    def set_indexes(self, model, enabled):
+        backend = get_backend(connection)
+        with connection.schema_editor() as editor:
+            for index in model._meta.indexes:
+                if enabled:
+                    editor.add_index(model, index)
+                else:
+                    editor.remove_index(model, index)
+            if backend is not None:
+                if enabled:
+                    backend.install(editor, model._meta.db_table)
+                else:
+                    backend.uninstall(editor, model._meta.db_table)
+
+    def parse_common(self, record):
+        if not isinstance(record, dict):
+            raise RowError('invalid JSON')
+        title = (record.get('title') or '').strip()
+        if not title or len(title) > 50:
+            raise RowError('title must be 1-50 characters')
+        status = record.get('status') or 'N'
+        if status not in STATUSES:
+            raise RowError(f'invalid status {status!r}')
+        owner_id = self.owners.get(record.get('owner'))
+        if owner_id is None:
+            raise RowError(f"unknown owner {record.get('owner')!r}")
+        try:
+            deadline = date.fromisoformat(record.get('deadline') or '')
+        except ValueError:
+            raise RowError(f"invalid deadline {record.get('deadline')!r}")
+        return {
+            'title': title,
+            'description': record.get('description') or '',
+            'status': status,
+            'deadline': deadline,
+            'owner_id': owner_id,
+        }
+
+    def parse_rows(self, batch, first_row, parse):
+        rows = []
+        for number, record in enumerate(batch, start=first_row):
+            try:
+                rows.append(parse(record))
+            except RowError as e:
+                self.stderr.write(f'Row {number}: {e}')
+        return rows
+
+    def parse_task(self, record):
+        row = self.parse_common(record)
+        names = record.get('categories') or []
+        if isinstance(names, str):
+            names = [name for name in names.split('|') if name]
+        row['categories'] = [name.strip() for name in names]
+        return row
+
+    def resolve_categories(self, rows):
+        missing = {name for row in rows for name in row['categories']} - self.categories.keys()
+        if missing:
+            Category.objects.bulk_create([Category(name=name) for name in missing], ignore_conflicts=True)
+            self.categories.update(Category.objects.filter(name__in=missing).values_list('name', 'id'))
+            # bulk_create sends no post_save, invalidate cached category pages here.
+            versions.bump(['categories'])
+
+    def import_tasks(self, batch, first_row):
+        rows = self.parse_rows(batch, first_row, self.parse_task)
+        self.resolve_categories(rows)
+
+        existing = set(
+            Task.objects.filter(title__in={r['title'] for r in rows}, deadline__in={r['deadline'] for r in rows})
+            .values_list('title', 'deadline')
+        )
+        tasks, links = [], []
+        for row in rows:
+            key = (row['title'], row['deadline'])
+            if key in existing:
+                continue
+            existing.add(key)
+            categories = row.pop('categories')
+            tasks.append(Task(**row))
+            links.append([self.categories[name] for name in categories if name in self.categories])
+
+        with transaction.atomic():
+            Task.objects.without_counters().bulk_create(tasks)
+            if any(task.pk is None for task in tasks):
+                ids = dict(
+                    ((title, deadline), pk) for title, deadline, pk in
+                    Task.objects.filter(title__in={t.title for t in tasks}, deadline__in={t.deadline for t in tasks})
+                    .values_list('title', 'deadline', 'pk')
+                )
+                for task in tasks:
+                    task.pk = ids[task.title, task.deadline]
+            through = Task.categories.through
+            links = through.objects.bulk_create([
+                through(task_id=task.pk, category_id=category_id)
+                for task, category_ids in zip(tasks, links) for category_id in set(category_ids)
+            ])
+            # Direct through table writes send no m2m_changed.
+            counters.adjust_category_counts(Counter(link.category_id for link in links))
+            if tasks:
+                versions.bump(['categories'] + versions.owner_keys('tasks', {task.owner_id for task in tasks}))
+        return len(tasks)
+
+    def parse_subtask(self, record):
+        row = self.parse_common(record)
+        try:
+            row['task_key'] = (record['task_title'], date.fromisoformat(record['task_deadline']))
+        except (KeyError, TypeError, ValueError):
+            raise RowError('task_title and task_deadline are required')
+        return row
+
+    def import_subtasks(self, batch, first_row):
+        rows = self.parse_rows(batch, first_row, self.parse_subtask)
+        task_ids = {
+            (title, deadline): pk for title, deadline, pk in
+            Task.objects.filter(title__in={r['task_key'][0] for r in rows},
+                                deadline__in={r['task_key'][1] for r in rows})
+            .values_list('title', 'deadline', 'pk')
+        }
+        existing = set(SubTask.objects.filter(title__in={r['title'] for r in rows}).values_list('title', flat=True))
+
+        subtasks = []
+        for row in rows:
+            task_key = row.pop('task_key')
+            if task_key not in task_ids:
+                self.stderr.write(f'Subtask {row["title"]!r}: unknown task {task_key[0]!r} ({task_key[1]})')
+                continue
+            if row['title'] in existing:
+                continue
+            existing.add(row['title'])
+            subtasks.append(SubTask(task_id=task_ids[task_key], **row))
+
+        SubTask.objects.bulk_create(subtasks)
+        return len(subtasks)
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from task_manager.search import INDEXED_MODELS, get_backend
+
+
+class Command(BaseCommand):
+    help = ('Create the missing full-text index objects (SQLite FTS tables and sync triggers, MySQL FULLTEXT '
+            'indexes) of the task and subtask tables and rebuild the index from the rows')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        backend = get_backend(connection)
+        if backend is None:
+            raise CommandError(f'No full-text search backend is configured for {connection.vendor}')
+
+        with connection.schema_editor() as schema_editor:
+            for model in INDEXED_MODELS:
+                table = model._meta.db_table
+                missing = backend.missing(connection, table)
+                if missing:
+                    backend.install(schema_editor, table)
+                    self.stdout.write(f"{table}: created {', '.join(missing)}")
+                else:
+                    backend.rebuild(schema_editor, table)
+                    self.stdout.write(f'{table}: rebuilt')
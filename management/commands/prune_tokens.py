@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = 'Delete expired outstanding and blacklisted refresh tokens in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to let other writers through')
+
+    def handle(self, *args, **options):
+        cutoff, last_id, deleted = now(), 0, 0
+        while True:
+            # Walks the primary key, expires_at has no index.
+            ids = list(OutstandingToken.objects.filter(id__gt=last_id, expires_at__lt=cutoff)
+                       .order_by('id').values_list('id', flat=True)[:options['batch_size']])
+            if not ids:
+                break
+            with transaction.atomic():
+                BlacklistedToken.objects.filter(token_id__in=ids).delete()
+                OutstandingToken.objects.filter(id__in=ids).delete()
+            last_id, deleted = ids[-1], deleted + len(ids)
+            self.stdout.write(f'Deleted {deleted} expired tokens')
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done, deleted {deleted} expired tokens'))
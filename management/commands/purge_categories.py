@@ -0,0 +1,56 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils.timezone import now
+
+from task_manager import versions
+from task_manager.models import Category, Task
+
+
+class Command(BaseCommand):
+    help = 'Hard-delete categories soft-deleted more than --days ago, with their task links, in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help='Rows deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0,
+                            help='Seconds to pause between batches to let other writers through')
+
+    def handle(self, *args, **options):
+        cutoff = now() - timedelta(days=options['days'])
+        batch_size, through = options['batch_size'], Task.categories.through
+        purged = unlinked = 0
+
+        while True:
+            category_ids = list(Category.all_objects.filter(is_deleted=True, deleted_at__lt=cutoff)
+                                .order_by('deleted_at').values_list('pk', flat=True)[:batch_size])
+            if not category_ids:
+                break
+
+            # Links first, each batch in its own short transaction.
+            while True:
+                links = list(through.objects.filter(category_id__in=category_ids)
+                             .values_list('pk', 'task__owner_id')[:batch_size])
+                if not links:
+                    break
+                with transaction.atomic():
+                    through.objects.filter(pk__in=[pk for pk, _ in links]).delete()
+                    versions.bump_owners('tasks', {owner_id for _, owner_id in links})
+                unlinked += len(links)
+                self.pause(options['sleep'])
+
+            with transaction.atomic():
+                Category.all_objects.filter(pk__in=category_ids).delete()
+                versions.bump(['categories'])
+            purged += len(category_ids)
+            self.stdout.write(f'Purged {purged} categories, {unlinked} task links')
+            self.pause(options['sleep'])
+
+        self.stdout.write(self.style.SUCCESS(f'Done, purged {purged} categories and {unlinked} task links'))
+
+    def pause(self, seconds):
+        if seconds:
+            time.sleep(seconds)
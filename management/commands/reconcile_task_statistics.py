@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from task_manager import counters
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the task statistics counters (and denormalized category task counts) from scratch'
+
+    def handle(self, *args, **options):
+        counters.rebuild()
+        if settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+            counters.rebuild_category_counts()
+        stats = counters.get_statistics()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt task counters: {stats['total_tasks']} tasks, {stats['overdue']} overdue"
+        ))
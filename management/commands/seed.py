@@ -0,0 +1,166 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.timezone import now
+
+from task_manager import counters, versions
+from task_manager.models import Task, SubTask, Category
+
+
+WORDS = ['report', 'invoice', 'meeting', 'deploy', 'review', 'backup', 'release', 'audit',
+         'budget', 'hiring', 'migration', 'roadmap', 'support', 'security', 'design', 'training']
+
+# Most tasks are done or new, few are blocked.
+STATUS_WEIGHTS = {'D': 45, 'N': 22, 'IP': 15, 'P': 11, 'B': 7}
+STATUSES, WEIGHTS = list(STATUS_WEIGHTS), list(STATUS_WEIGHTS.values())
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill the database with a large synthetic dataset: users, categories, tasks with skewed owner, '
+        'status and deadline distributions, a long-tailed number of subtasks per task and heavily '
+        'overlapping categories. The same --seed generates the same rows on an empty database '
+        '(deadlines are relative to today). Every user gets the --password.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--users', type=int, default=20000)
+        parser.add_argument('--tasks', type=int, default=1000000)
+        parser.add_argument('--categories', type=int, default=200)
+        parser.add_argument('--max-subtasks', type=int, default=200, help='Cap of the subtasks of one task')
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Tasks per transaction')
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['categories'], options['batch_size']) < 1:
+            raise CommandError('--users, --categories and --batch-size must be at least 1')
+        self.rng = random.Random(options['seed'])
+        self.today = now().date()
+        self.max_subtasks = options['max_subtasks']
+        started = time.monotonic()
+
+        user_ids = self.create_users(options['users'], options['password'])
+        category_ids = self.create_categories(options['categories'])
+        self.stdout.write(f'{len(user_ids)} users, {len(category_ids)} categories')
+
+        next_task_id = (Task.objects.aggregate(n=Max('pk'))['n'] or 0) + 1
+        next_subtask_id = (SubTask.objects.aggregate(n=Max('pk'))['n'] or 0) + 1
+        created = subtasks = links = 0
+        while created < options['tasks']:
+            count = min(options['batch_size'], options['tasks'] - created)
+            with transaction.atomic():
+                batch = self.create_tasks(next_task_id, count, user_ids)
+                links += self.link_categories(batch, category_ids)
+                subtasks += self.create_subtasks(next_subtask_id + subtasks, batch)
+            next_task_id += count
+            created += count
+            rate = created / max(time.monotonic() - started, 1e-9)
+            self.stdout.write(f'{created} tasks, {subtasks} subtasks, {links} category links, {rate:.0f} tasks/s')
+
+        self.reset_sequences()
+        counters.rebuild()
+        counters.rebuild_category_counts()
+        versions.bump(['categories'])
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f'Seeded {created} tasks in {elapsed:.1f}s'))
+
+    def create_users(self, count, password):
+        # One hash for everybody, PBKDF2 per user would take longer than the rest.
+        password = make_password(password)
+        first = (User.objects.aggregate(n=Max('pk'))['n'] or 0) + 1
+        users = [User(pk=pk, username=f'seed-user-{pk}', email=f'seed-user-{pk}@example.com', password=password)
+                 for pk in range(first, first + count)]
+        User.objects.bulk_create(users, batch_size=5000)
+        return [user.pk for user in users]
+
+    def create_categories(self, count):
+        existing = set(Category.objects.values_list('name', flat=True))
+        categories = []
+        for i in range(count):
+            name = f'{WORDS[i % len(WORDS)].title()} {i // len(WORDS) + 1}'
+            if name not in existing:
+                categories.append(Category(name=name))
+        Category.objects.bulk_create(categories)
+        names = [f'{WORDS[i % len(WORDS)].title()} {i // len(WORDS) + 1}' for i in range(count)]
+        by_name = dict(Category.objects.filter(name__in=names).values_list('name', 'pk'))
+        return [by_name[name] for name in names]
+
+    def skewed_index(self, count, power):
+        # Low indexes are picked far more often: a few owners hold most of
+        # the tasks and a few categories appear on most of them.
+        return int(count * self.rng.random() ** power)
+
+    def deadline(self, status):
+        # Open tasks cluster in the coming weeks, done ones in the past few
+        # weeks, both with a tail of up to a year; some open ones are overdue.
+        days = min(int(self.rng.expovariate(1 / 20)), 365)
+        past = self.rng.random() < (0.85 if status == 'D' else 0.2)
+        return self.today + timedelta(days=-days if past else days)
+
+    def create_tasks(self, first_id, count, user_ids):
+        rng = self.rng
+        tasks = []
+        for pk, status in zip(range(first_id, first_id + count), rng.choices(STATUSES, WEIGHTS, k=count)):
+            words = rng.sample(WORDS, 3)
+            tasks.append(Task(
+                pk=pk, title=f'{words[0].title()} {words[1]} #{pk}', description=f'{" ".join(words)} task {pk}',
+                status=status, deadline=self.deadline(status),
+                owner_id=user_ids[self.skewed_index(len(user_ids), 3)],
+            ))
+        # Counters are rebuilt once at the end.
+        Task.objects.without_counters().bulk_create(tasks)
+        return tasks
+
+    def link_categories(self, tasks, category_ids):
+        rows = []
+        for task in tasks:
+            count = min(1 + int(self.rng.expovariate(0.8)), len(category_ids))
+            picked = set()
+            while len(picked) < count:
+                picked.add(category_ids[self.skewed_index(len(category_ids), 2)])
+            rows += [(task.pk, category_id) for category_id in sorted(picked)]
+
+        # Straight into the through table, its model instances would only slow this down.
+        through = Task.categories.through._meta
+        task_column = through.get_field('task').column
+        category_column = through.get_field('category').column
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {connection.ops.quote_name(through.db_table)} '
+                f'({connection.ops.quote_name(task_column)}, {connection.ops.quote_name(category_column)}) '
+                f'VALUES (%s, %s)',
+                rows,
+            )
+        return len(rows)
+
+    def create_subtasks(self, first_id, tasks):
+        subtasks = []
+        for task in tasks:
+            # Pareto tail: three quarters of the tasks have none, a few have dozens.
+            count = min(int(self.rng.paretovariate(2)) - 1, self.max_subtasks)
+            for n in range(count):
+                pk = first_id + len(subtasks)
+                subtasks.append(SubTask(
+                    pk=pk, title=f'Subtask #{pk}', description=f'Step {n + 1} of {task.title}', task_id=task.pk,
+                    owner_id=task.owner_id, status=self.rng.choices(STATUSES, WEIGHTS)[0],
+                    deadline=task.deadline,
+                ))
+        SubTask.objects.bulk_create(subtasks, batch_size=5000)
+        return len(subtasks)
+
+    def reset_sequences(self):
+        # Rows were inserted with explicit ids, move the sequences past them
+        # where the backend has any (PostgreSQL, Oracle).
+        statements = connection.ops.sequence_reset_sql(no_style(), [User, Task, SubTask])
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
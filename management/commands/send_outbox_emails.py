@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from task_manager.outbox import send_batch
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbox emails in batches, retrying failures with backoff'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5,
+                            help='Give up on an email after this many failed attempts')
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help='Seconds to sleep when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the due emails and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                sent, failed = send_batch(options['batch_size'], options['max_attempts'])
+            except Exception as e:
+                # Mail server or database unavailable, the batch is retried
+                # later; keep the worker alive.
+                self.stderr.write(f'Sending failed: {e}')
+                if options['once']:
+                    break
+                time.sleep(options['interval'])
+                continue
+            if sent or failed:
+                self.stdout.write(f'Sent {sent}, failed {failed}')
+                continue
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,84 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def build_counters(apps, schema_editor):
+    Task = apps.get_model('task_manager', 'Task')
+    TaskStatusCounter = apps.get_model('task_manager', 'TaskStatusCounter')
+    TaskOwnerCounter = apps.get_model('task_manager', 'TaskOwnerCounter')
+    TaskDeadlineCounter = apps.get_model('task_manager', 'TaskDeadlineCounter')
+
+    tasks = Task.objects.order_by()
+    TaskStatusCounter.objects.bulk_create(
+        TaskStatusCounter(status=row['status'], count=row['n'])
+        for row in tasks.values('status').annotate(n=Count('pk'))
+    )
+    TaskOwnerCounter.objects.bulk_create(
+        (TaskOwnerCounter(owner_id=row['owner_id'], status=row['status'], count=row['n'])
+         for row in tasks.values('owner_id', 'status').annotate(n=Count('pk'))),
+        batch_size=1000,
+    )
+    TaskDeadlineCounter.objects.bulk_create(
+        (TaskDeadlineCounter(owner_id=row['owner_id'], deadline=row['deadline'], count=row['n'])
+         for row in tasks.exclude(status='D').values('owner_id', 'deadline').annotate(n=Count('pk'))),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0004_subtask_owner_task_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskStatusCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=15, unique=True, verbose_name='Status')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+            ],
+            options={
+                'verbose_name': 'Task status counter',
+                'verbose_name_plural': 'Task status counters',
+                'db_table': 'task_manager_task_status_counter',
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskDeadlineCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('deadline', models.DateField(db_index=True, verbose_name='Deadline')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'verbose_name': 'Task deadline counter',
+                'verbose_name_plural': 'Task deadline counters',
+                'db_table': 'task_manager_task_deadline_counter',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'deadline'), name='task_deadline_counter_unique')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TaskOwnerCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(max_length=15, verbose_name='Status')),
+                ('count', models.BigIntegerField(default=0, verbose_name='Count')),
+                ('owner', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'verbose_name': 'Task owner counter',
+                'verbose_name_plural': 'Task owner counters',
+                'db_table': 'task_manager_task_owner_counter',
+                'constraints': [models.UniqueConstraint(fields=('owner', 'status'), name='task_owner_counter_unique')],
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+from django.db import migrations
+
+from task_manager.search import get_backend
+
+
+TABLES = ('task_manager_task', 'task_manager_subtask')
+
+
+def install_search_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for table in TABLES:
+        backend.install(schema_editor, table)
+
+
+def uninstall_search_index(apps, schema_editor):
+    backend = get_backend(schema_editor.connection)
+    if backend is None:
+        return
+    for table in TABLES:
+        backend.uninstall(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0005_task_statistics_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:15
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models.functions import ExtractWeekDay
+
+from task_manager.search import get_backend
+
+
+def backfill_deadline_weekday(apps, schema_editor):
+    Task = apps.get_model('task_manager', 'Task')
+    Task.objects.update(deadline_weekday=ExtractWeekDay('deadline'))
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # SQLite rebuilds task_manager_task to add a NOT NULL column, which drops
+    # the triggers that keep the full-text index in sync.
+    backend = get_backend(schema_editor.connection)
+    if backend is not None and backend.vendor == 'sqlite':
+        backend.install(schema_editor, 'task_manager_task')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0008_outbox_email'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='deadline_weekday',
+            field=models.PositiveSmallIntegerField(default=1, editable=False, verbose_name='Deadline weekday'),
+        ),
+        migrations.RunPython(backfill_deadline_weekday, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['deadline_weekday', 'status'], name='task_weekday_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['owner', 'deadline_weekday'], name='task_owner_weekday_idx'),
+        ),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:19
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0009_task_deadline_weekday'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResourceVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Key')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Version')),
+                ('updated_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Updated at')),
+            ],
+            options={
+                'verbose_name': 'Resource version',
+                'verbose_name_plural': 'Resource versions',
+                'db_table': 'task_manager_resource_version',
+            },
+        ),
+    ]
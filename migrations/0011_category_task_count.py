@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_category_tasks(apps, schema_editor):
+    Task = apps.get_model('task_manager', 'Task')
+    Category = apps.get_model('task_manager', 'Category')
+
+    links = (Task.categories.through.objects.filter(category_id=OuterRef('pk'))
+             .order_by().values('category_id').annotate(n=Count('pk')).values('n'))
+    Category.objects.update(task_count=Coalesce(Subquery(links), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0010_resource_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='task_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Task count'),
+        ),
+        migrations.RunPython(count_category_tasks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0011_category_task_count'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='category',
+            name='name',
+            field=models.CharField(max_length=50, verbose_name='Name'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_deleted', False)), fields=['id'], name='category_live_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='category',
+            index=models.Index(condition=models.Q(('is_deleted', True)), fields=['deleted_at'], name='category_deleted_at_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='category',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_deleted', False)), fields=('name',), name='category_live_name_uniq'),
+        ),
+    ]
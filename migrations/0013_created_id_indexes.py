@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 20:49
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0012_category_live_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='subtask',
+            name='subtask_created_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='task_created_idx',
+        ),
+        migrations.AddIndex(
+            model_name='subtask',
+            index=models.Index(fields=['-created_at', '-id'], name='subtask_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+        ),
+    ]
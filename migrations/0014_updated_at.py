@@ -0,0 +1,43 @@
+# Generated by Django 5.2.4 on 2026-10-18 21:00
+
+from django.db import migrations, models
+from django.db.models import F
+
+from task_manager.search import get_backend
+
+
+def copy_created_at(apps, schema_editor):
+    # Until their next write, rows count as last updated when they were created.
+    for name in ('Task', 'SubTask'):
+        apps.get_model('task_manager', name).objects.update(updated_at=F('created_at'))
+
+
+def reinstall_search_triggers(apps, schema_editor):
+    # Adding the columns makes SQLite rebuild both tables, which drops the
+    # triggers that keep the full-text index in sync (see 0009).
+    backend = get_backend(schema_editor.connection)
+    if backend is not None and backend.vendor == 'sqlite':
+        for table in ('task_manager_task', 'task_manager_subtask'):
+            backend.install(schema_editor, table)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('task_manager', '0013_created_id_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='subtask',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated at'),
+        ),
+        migrations.AddField(
+            model_name='task',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Updated at'),
+        ),
+        migrations.RunPython(copy_created_at, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_triggers, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,5 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models.functions import Cast, ExtractWeekDay
 from django.utils.timezone import now
 from django.contrib.auth import get_user_model
 
@@ -13,14 +14,192 @@ STATUS_CHOICES = [
 
 User = get_user_model()
 
-class Task(models.Model):
+COUNTED_FIELDS = {'owner', 'owner_id', 'status', 'deadline'}
+
+
+def weekday_number(deadline):
+    '''
+    Day of week numbered like ExtractWeekDay: 1 = Sunday ... 7 = Saturday.
+    '''
+    return models.DateField().to_python(deadline).isoweekday() % 7 + 1
+
+
+class VersionedQuerySet(models.QuerySet):
+    '''
+    Bumps the resource versions (see versions.py) of the owners whose rows
+    update() or bulk_create() touch, since those skip the model signals.
+    '''
+    version_scope = None
+
+    def version_keys(self, owner_ids, fields):
+        from .versions import owner_keys
+        return owner_keys(self.version_scope, owner_ids)
+
+    def update(self, **kwargs):
+        from .versions import bump
+        # Detail ETags are derived from it, see conditional.py.
+        kwargs.setdefault('updated_at', now())
+        with transaction.atomic(using=self.db):
+            owner_ids = set(self.order_by().values_list('owner_id', flat=True).distinct())
+            rows = super().update(**kwargs)
+            new_owner = kwargs.get('owner_id', kwargs.get('owner'))
+            if new_owner is not None and not hasattr(new_owner, 'resolve_expression'):
+                owner_ids.add(getattr(new_owner, 'pk', new_owner))
+            if rows:
+                bump(self.version_keys(owner_ids, kwargs))
+        return rows
+
+    def touch(self):
+        '''
+        Set updated_at only, for callers that bump the versions themselves.
+        '''
+        return super().update(updated_at=now())
+
+    def bulk_create(self, objs, **kwargs):
+        from .versions import bump_owners
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, **kwargs)
+            if objs:
+                bump_owners(self.version_scope, {obj.owner_id for obj in objs})
+        return objs
+
+
+class TaskQuerySet(VersionedQuerySet):
+    version_scope = 'tasks'
+    track_counters = True
+
+    def version_keys(self, owner_ids, fields):
+        keys = super().version_keys(owner_ids, fields)
+        if 'status' in fields:
+            keys.append('categories')  # per-status task counts of categories
+        return keys
+
+    def without_counters(self):
+        '''
+        Skip the statistics counters in update()/bulk_create(), for bulk
+        loads that call counters.rebuild() once they are done.
+        '''
+        clone = self._chain()
+        clone.track_counters = False
+        return clone
+
+    def _clone(self):
+        clone = super()._clone()
+        clone.track_counters = self.track_counters
+        return clone
+
+    def update(self, **kwargs):
+        if 'deadline' in kwargs and 'deadline_weekday' not in kwargs:
+            deadline = kwargs['deadline']
+            if hasattr(deadline, 'resolve_expression'):
+                kwargs['deadline_weekday'] = ExtractWeekDay(Cast(deadline, models.DateField()))
+            else:
+                kwargs['deadline_weekday'] = weekday_number(deadline)
+
+        if not self.track_counters or not COUNTED_FIELDS.intersection(kwargs):
+            return super().update(**kwargs)
+
+        from .counters import track_update
+        with transaction.atomic(using=self.db):
+            return track_update(self, kwargs, super().update)
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        from .counters import track_bulk_create
+        objs = list(objs)
+        for obj in objs:
+            obj.deadline_weekday = weekday_number(obj.deadline)
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, batch_size=batch_size, ignore_conflicts=ignore_conflicts,
+                                       update_conflicts=update_conflicts, update_fields=update_fields,
+                                       unique_fields=unique_fields)
+            # Conflicting rows can't be told apart from inserted ones here,
+            # callers using conflict handling rebuild the counters themselves.
+            if self.track_counters and not (ignore_conflicts or update_conflicts):
+                track_bulk_create(objs)
+        return objs
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        if 'deadline' in fields:
+            objs = list(objs)
+            for obj in objs:
+                obj.deadline_weekday = weekday_number(obj.deadline)
+            fields = [*fields, 'deadline_weekday']
+        return super().bulk_update(objs, fields, batch_size=batch_size)
+
+
+class TrackedFieldsMixin:
+    '''
+    Remembers the values of ``tracked_fields`` (attnames) as loaded from the
+    database, so signal handlers can tell what changed without re-reading
+    the row. The snapshot is refreshed after every save.
+    '''
+    tracked_fields = ()
+    _loaded_values = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance.snapshot_tracked_fields()
+        return instance
+
+    def snapshot_tracked_fields(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {f: getattr(self, f) for f in self.tracked_fields if f not in deferred}
+
+    def has_loaded_values(self, *fields):
+        return self._loaded_values is not None and all(f in self._loaded_values for f in fields)
+
+    def loaded_value(self, field):
+        return self._loaded_values[field]
+
+    def changed_fields(self):
+        '''
+        {field: loaded value} for tracked fields whose value differs from
+        what was loaded. Empty for instances that were never loaded or saved.
+        '''
+        return {
+            f: old for f, old in (self._loaded_values or {}).items()
+            if getattr(self, f) != old
+        }
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self.snapshot_tracked_fields()
+
+
+class Task(TrackedFieldsMixin, models.Model):
     title = models.CharField(max_length=50, verbose_name='Title', unique_for_date='deadline')
     description = models.TextField(verbose_name='Description')
     categories = models.ManyToManyField("Category", verbose_name='Categories')
     status = models.CharField(choices=STATUS_CHOICES, default='N', max_length=15, verbose_name='Status')
     deadline = models.DateField(verbose_name='Deadline')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated at')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Owner', related_name='tasks')
+    # Denormalized from deadline on every write so ?weekday= can use an index.
+    deadline_weekday = models.PositiveSmallIntegerField(editable=False, default=1, verbose_name='Deadline weekday')
+
+    objects = TaskQuerySet.as_manager()
+
+    tracked_fields = ('owner_id', 'status', 'deadline')
+
+    def save(self, *args, **kwargs):
+        self.deadline_weekday = weekday_number(self.deadline)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+            if 'deadline' in update_fields:
+                kwargs['update_fields'].add('deadline_weekday')
+
+        # Signal handlers write counters and outbox rows, keep them in the
+        # same transaction as the task row.
+        with transaction.atomic(using=kwargs.get('using')):
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f'{self.title}'
@@ -30,17 +209,40 @@ class Task(models.Model):
         ordering = ('-created_at',)
         verbose_name = 'Task'
         verbose_name_plural = 'Tasks'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='task_created_idx'),
+            models.Index(fields=['owner', '-created_at'], name='task_owner_created_idx'),
+            models.Index(fields=['status', 'deadline'], name='task_status_deadline_idx'),
+            models.Index(fields=['deadline'], name='task_deadline_idx'),
+            models.Index(fields=['deadline_weekday', 'status'], name='task_weekday_status_idx'),
+            models.Index(fields=['owner', 'deadline_weekday'], name='task_owner_weekday_idx'),
+        ]
 
 
-class SubTask(models.Model):
+class SubTaskQuerySet(VersionedQuerySet):
+    version_scope = 'subtasks'
+
+
+class SubTask(TrackedFieldsMixin, models.Model):
     title = models.CharField(max_length=50, verbose_name='Title', unique=True)
     description = models.TextField(verbose_name='Description')
     task = models.ForeignKey(Task, on_delete=models.CASCADE, verbose_name='Task', related_name='subtasks')
     status = models.CharField(choices=STATUS_CHOICES, default='N', max_length=15, verbose_name='Status')
     deadline = models.DateField(verbose_name='Deadline')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='Updated at')
     owner = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name='Owner', related_name='subtasks')
 
+    objects = SubTaskQuerySet.as_manager()
+
+    tracked_fields = ('owner_id', 'status')
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'updated_at'}
+        super().save(*args, **kwargs)
+
     def __str__(self):
         return f'{self.title}'
 
@@ -49,20 +251,47 @@ class SubTask(models.Model):
         ordering = ('-created_at',)
         verbose_name = 'SubTask'
         verbose_name_plural = 'SubTasks'
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='subtask_created_idx'),
+            models.Index(fields=['task', '-created_at'], name='subtask_task_created_idx'),
+            models.Index(fields=['owner', '-created_at'], name='subtask_owner_created_idx'),
+            models.Index(fields=['status', 'deadline'], name='subtask_status_deadline_idx'),
+            models.Index(fields=['deadline'], name='subtask_deadline_idx'),
+        ]
 
 
-class CategoryManager(models.Manager):
+class CategoryQuerySet(models.QuerySet):
+    def soft_delete(self):
+        '''
+        Mark the categories deleted in one UPDATE; purge_categories removes
+        them and their task links for good later on.
+        '''
+        from .versions import bump
+        with transaction.atomic(using=self.db):
+            rows = self.filter(is_deleted=False).update(is_deleted=True, deleted_at=now())
+            if rows:
+                # Their ids disappear from the linked tasks, whose validators
+                # include 'categories:deleted' (see views.py).
+                bump(['categories', 'categories:deleted'])
+        return rows
+
+
+class CategoryManager(models.Manager.from_queryset(CategoryQuerySet)):
     def get_queryset(self):
         return super().get_queryset().filter(is_deleted=False)
 
 
-class Category(models.Model):
-    name = models.CharField(max_length=50, verbose_name='Name', unique=True)
+class Category(TrackedFieldsMixin, models.Model):
+    name = models.CharField(max_length=50, verbose_name='Name')
     is_deleted = models.BooleanField(default=False, verbose_name='Deleted')
     deleted_at = models.DateTimeField(null=True, blank=True, verbose_name='Deleted at')
+    # Only maintained with settings.CATEGORY_TASK_COUNTS_DENORMALIZED, see counters.py.
+    task_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='Task count')
 
     objects = CategoryManager()
-    all_objects = models.Manager()
+    all_objects = CategoryQuerySet.as_manager()
+
+    tracked_fields = ('is_deleted',)
 
     def delete(self, using = None, keep_parents = False):
         self.is_deleted = True
@@ -75,4 +304,107 @@ class Category(models.Model):
     class Meta:
         db_table = 'task_manager_category'
         verbose_name = 'Category'
-        verbose_name_plural = 'Categories'
\ No newline at end of file
+        verbose_name_plural = 'Categories'
+        # Partial, so deleted rows neither bloat the live lookups nor keep
+        # their names taken (MySQL ignores the conditions, see settings).
+        constraints = [
+            models.UniqueConstraint(fields=['name'], condition=models.Q(is_deleted=False),
+                                    name='category_live_name_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(is_deleted=False), name='category_live_idx'),
+            models.Index(fields=['deleted_at'], condition=models.Q(is_deleted=True), name='category_deleted_at_idx'),
+        ]
+
+
+class TaskStatusCounter(models.Model):
+    status = models.CharField(max_length=15, unique=True, verbose_name='Status')
+    count = models.BigIntegerField(default=0, verbose_name='Count')
+
+    class Meta:
+        db_table = 'task_manager_task_status_counter'
+        verbose_name = 'Task status counter'
+        verbose_name_plural = 'Task status counters'
+
+
+class TaskOwnerCounter(models.Model):
+    # No FK constraint: counter rows are drained by the Task post_delete
+    # signals when an owner is deleted, whatever order the cascade runs in.
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                              verbose_name='Owner', related_name='+')
+    status = models.CharField(max_length=15, verbose_name='Status')
+    count = models.BigIntegerField(default=0, verbose_name='Count')
+
+    class Meta:
+        db_table = 'task_manager_task_owner_counter'
+        verbose_name = 'Task owner counter'
+        verbose_name_plural = 'Task owner counters'
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'status'], name='task_owner_counter_unique'),
+        ]
+
+
+class TaskDeadlineCounter(models.Model):
+    '''
+    Open (not done) tasks per owner and deadline day. Overdue totals are a
+    range sum over this table instead of a scan of task_manager_task.
+    '''
+    # No FK constraint: counter rows are drained by the Task post_delete
+    # signals when an owner is deleted, whatever order the cascade runs in.
+    owner = models.ForeignKey(User, on_delete=models.DO_NOTHING, db_constraint=False,
+                              verbose_name='Owner', related_name='+')
+    deadline = models.DateField(verbose_name='Deadline', db_index=True)
+    count = models.BigIntegerField(default=0, verbose_name='Count')
+
+    class Meta:
+        db_table = 'task_manager_task_deadline_counter'
+        verbose_name = 'Task deadline counter'
+        verbose_name_plural = 'Task deadline counters'
+        constraints = [
+            models.UniqueConstraint(fields=['owner', 'deadline'], name='task_deadline_counter_unique'),
+        ]
+
+
+class OutboxEmail(models.Model):
+    '''
+    Email queued in the same transaction as the change that triggered it and
+    delivered later by the send_outbox_emails command.
+    '''
+    subject = models.CharField(max_length=255, verbose_name='Subject')
+    body = models.TextField(verbose_name='Body')
+    from_email = models.CharField(max_length=254, verbose_name='From')
+    to = models.EmailField(verbose_name='To')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='Created at')
+    attempts = models.PositiveIntegerField(default=0, verbose_name='Attempts')
+    # NULL once the email is sent or given up on, so only pending rows are due.
+    next_attempt_at = models.DateTimeField(null=True, default=now, db_index=True, verbose_name='Next attempt at')
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name='Sent at')
+    last_error = models.TextField(blank=True, verbose_name='Last error')
+
+    def __str__(self):
+        return f'{self.subject} -> {self.to}'
+
+    class Meta:
+        db_table = 'task_manager_outbox_email'
+        ordering = ('id',)
+        verbose_name = 'Outbox email'
+        verbose_name_plural = 'Outbox emails'
+
+
+class ResourceVersion(models.Model):
+    '''
+    Version counter of a collection ('tasks') or of one owner's rows in it
+    ('tasks:owner:1'), bumped on every write. ETags and response caches are
+    derived from these instead of the data itself.
+    '''
+    key = models.CharField(max_length=100, unique=True, verbose_name='Key')
+    version = models.BigIntegerField(default=0, verbose_name='Version')
+    updated_at = models.DateTimeField(default=now, verbose_name='Updated at')
+
+    def __str__(self):
+        return f'{self.key}@{self.version}'
+
+    class Meta:
+        db_table = 'task_manager_resource_version'
+        verbose_name = 'Resource version'
+        verbose_name_plural = 'Resource versions'
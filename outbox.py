@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils.timezone import now
+
+from .models import OutboxEmail
+
+
+def enqueue_email(subject, body, to):
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=to,
+    )
+
+
+def backoff(attempts, base=30, cap=3600):
+    '''
+    Seconds to wait before the next attempt: base * 2^(attempts-1), capped.
+    '''
+    return min(cap, base * 2 ** (attempts - 1))
+
+
+def claim_batch(batch_size, lease=timedelta(minutes=5)):
+    '''
+    Lock up to ``batch_size`` due emails by pushing their next attempt past
+    the lease, so other workers skip them while this one is sending.
+    '''
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(next_attempt_at__lte=now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(next_attempt_at=now() + lease)
+    return batch
+
+
+def release_batch(batch, error, retry_in=timedelta(seconds=backoff(1))):
+    '''
+    Hand a claimed batch back before its lease runs out when nothing in it
+    could be tried. Attempts are left alone, the emails were never sent.
+    '''
+    OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+        next_attempt_at=now() + retry_in, last_error=str(error))
+
+
+def send_batch(batch_size=100, max_attempts=5):
+    '''
+    Deliver up to ``batch_size`` due emails over a single mail connection.
+    Returns (sent, failed) counts for the batch. When the mail server can't
+    be reached the batch is released for a later retry and the error raised.
+    '''
+    batch = claim_batch(batch_size)
+    if not batch:
+        return 0, 0
+
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        release_batch(batch, e)
+        raise
+
+    sent = failed = 0
+    try:
+        for email in batch:
+            message = EmailMessage(email.subject, email.body, email.from_email, [email.to],
+                                   connection=connection)
+            email.attempts += 1
+            try:
+                connection.send_messages([message])
+            except Exception as e:
+                failed += 1
+                email.last_error = str(e)
+                if email.attempts >= max_attempts:
+                    email.next_attempt_at = None
+                else:
+                    email.next_attempt_at = now() + timedelta(seconds=backoff(email.attempts))
+            else:
+                sent += 1
+                email.sent_at = now()
+                email.next_attempt_at = None
+                email.last_error = ''
+    finally:
+        # Saved even if closing the connection fails, so sent emails are not
+        # sent again once the lease runs out.
+        OutboxEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at', 'sent_at', 'last_error'])
+        connection.close()
+    return sent, failed
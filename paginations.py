@@ -1,4 +1,45 @@
+import json
+from base64 import b64decode, b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured, ValidationError as DjangoValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination, LimitOffsetPagination, CursorPagination
+from rest_framework.utils.urls import replace_query_param
+
+
+TABLE_ESTIMATES = {
+    'postgresql': 'SELECT reltuples::bigint FROM pg_class WHERE relname = %s',
+    'mysql': 'SELECT table_rows FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = %s',
+    # Only filled in after ANALYZE, the first number is the row count.
+    'sqlite': 'SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1',
+}
+
+
+def estimated_count(queryset, cap):
+    '''
+    Cheap count for offset-style pagers: the planner's row estimate for an
+    unfiltered table, otherwise an exact count that stops at ``cap``.
+    Returns (count, is_estimate).
+    '''
+    connection = connections[queryset.db]
+    sql = TABLE_ESTIMATES.get(connection.vendor)
+    if sql and not queryset.query.where:
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(sql, [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            except Exception:
+                row = None
+        if row and row[0] is not None:
+            return int(str(row[0]).split()[0]), True
+
+    count = queryset.order_by()[:cap + 1].count()
+    return min(count, cap), count > cap
+
 
 class StandardPageNumberPagination(PageNumberPagination):
     page_size = 3
@@ -12,7 +53,181 @@ class StandardLimitOffsetPagination(LimitOffsetPagination):
     max_limit = 50
 
 
-class StandardCursorPagination(CursorPagination):
-    page_size = 5
+class EstimatedCountPaginator(Paginator):
+    count_cap = 10000
+
+    @cached_property
+    def count(self):
+        self.count_is_estimate = False
+        if not hasattr(self.object_list, 'query'):
+            return len(self.object_list)
+        count, self.count_is_estimate = estimated_count(self.object_list, self.count_cap)
+        return count
+
+
+class EstimatedCountPageNumberPagination(StandardPageNumberPagination):
+    '''
+    Page number pagination without COUNT(*) over the whole result, see
+    estimated_count().
+    '''
+    django_paginator_class = EstimatedCountPaginator
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimate'] = self.page.paginator.count_is_estimate
+        return response
+
+
+class EstimatedCountLimitOffsetPagination(StandardLimitOffsetPagination):
+    '''
+    Limit/offset pagination without COUNT(*) over the whole result, see
+    estimated_count().
+    '''
+    count_cap = 10000
+
+    def get_count(self, queryset):
+        count, self.count_is_estimate = estimated_count(queryset, self.count_cap)
+        return count
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['count_is_estimate'] = self.count_is_estimate
+        return response
+
+
+class KeysetCursorPagination(CursorPagination):
+    '''
+    Cursor pagination on the queryset's active ordering (whatever
+    OrderingFilter or the search filter applied, else the view's or model's
+    default) with ``id`` as a tiebreaker. The cursor stores the ordering
+    values of the boundary row, so every page is a range seek that costs
+    O(page size) at any depth, and no COUNT(*) is issued.
+    Ordering fields must be non-null.
+    '''
     ordering = ('id',)
-    cursor_query_param = 'cursor'
\ No newline at end of file
+    tiebreaker = 'id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.build_page(list(self.page_queryset(queryset, request, view)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        return self.build_page([row async for row in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def page_queryset(self, queryset, request, view=None):
+        '''
+        The slice holding the page plus one row to tell whether there is more.
+        '''
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.position, self.reverse = self.decode_cursor(request, queryset)
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(f[1:] if f.startswith('-') else f'-{f}' for f in ordering)
+
+        queryset = queryset.order_by(*ordering)
+        if self.position is not None:
+            queryset = queryset.filter(self.after(ordering, self.position))
+        return queryset[:self.page_size + 1]
+
+    def build_page(self, results):
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        return self.page
+
+    def get_ordering(self, request, queryset, view):
+        ordering = [f for f in queryset.query.order_by if isinstance(f, str)]
+        if not ordering:
+            ordering = list(getattr(view, 'ordering', None) or queryset.model._meta.ordering or self.ordering)
+        if not {'id', '-id', 'pk', '-pk'}.intersection(ordering):
+            ordering.append(f'-{self.tiebreaker}' if ordering[0].startswith('-') else self.tiebreaker)
+        return tuple(ordering)
+
+    def after(self, ordering, position):
+        '''
+        Rows strictly after ``position`` in ``ordering``. The leading bound
+        on the first field lets the database seek its index.
+        '''
+        first = ordering[0]
+        bound = Q(**{f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": position[0]})
+        rows, equal = Q(), {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            rows |= Q(**equal, **{f"{name}__{'lt' if field.startswith('-') else 'gt'}": value})
+            equal[name] = value
+        return bound & rows
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            cursor = json.loads(b64decode(encoded.encode('ascii')))
+            position, reverse = cursor['p'], bool(cursor.get('r'))
+            if not isinstance(position, list) or len(position) != len(self.ordering):
+                raise ValueError
+            # Cursors come from the client, a value the field can't take
+            # must not reach the query.
+            position = [self.ordering_field(queryset, f.lstrip('-')).to_python(value)
+                        for f, value in zip(self.ordering, position)]
+            if None in position:
+                raise ValueError
+        except (TypeError, ValueError, KeyError, AttributeError, DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def ordering_field(self, queryset, name):
+        '''
+        The model field or annotation output field behind an ordering name.
+        '''
+        if name in queryset.query.annotations:
+            return queryset.query.annotations[name].output_field
+        model = queryset.model
+        if name == 'pk':
+            return model._meta.pk
+        *path, name = name.split('__')
+        try:
+            for part in path:
+                model = model._meta.get_field(part).related_model
+            return model._meta.get_field(name)
+        except (FieldDoesNotExist, AttributeError):
+            raise ImproperlyConfigured(f'Cursor ordering {name!r} is not a field or annotation of {model.__name__}')
+
+    def encode_cursor(self, instance, reverse):
+        position = [self._get_value(instance, f.lstrip('-')) for f in self.ordering]
+        cursor = {'p': position, 'r': 1} if reverse else {'p': position}
+        # isoformat() keeps microseconds, DjangoJSONEncoder would cut them and
+        # break the equality part of the keyset comparison.
+        data = json.dumps(cursor, default=lambda value: value.isoformat())
+        encoded = b64encode(data.encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_value(self, instance, name):
+        if isinstance(instance, dict):
+            return instance[name]
+        return instance.pk if name == 'pk' else getattr(instance, name)
+
+
+class StandardCursorPagination(KeysetCursorPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
@@ -19,4 +19,4 @@ class IsOwnerOrAdminOrReadOnly(BasePermission):
     def has_object_permission(self, request, view, obj):
         if request.method in SAFE_METHODS:
             return True
-        return obj.owner == request.user or request.user.is_superuser
\ No newline at end of file
+        return obj.owner_id == request.user.pk or request.user.is_superuser
\ No newline at end of file
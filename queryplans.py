@@ -0,0 +1,143 @@
+import json
+import re
+from dataclasses import dataclass, field
+
+from django.db import connections
+from django.urls import URLPattern, URLResolver
+from rest_framework.mixins import ListModelMixin
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+
+SQLITE_SCAN = re.compile(r'\bSCAN (\S+)(.*)$')
+SQLITE_INDEX = re.compile(r'USING (?:COVERING )?INDEX (\S+)')
+
+
+@dataclass
+class QueryPlan:
+    sql: str
+    plan: str
+    full_scans: list = field(default_factory=list)
+    indexes: list = field(default_factory=list)
+
+
+def _parse_sqlite(plan):
+    full_scans, indexes = [], []
+    for line in plan.splitlines():
+        index = SQLITE_INDEX.search(line)
+        if index:
+            indexes.append(index.group(1))
+            continue
+        scan = SQLITE_SCAN.search(line)
+        # FTS5 tables report "SCAN <fts> VIRTUAL TABLE INDEX ..." and are served by their own index.
+        if scan and 'VIRTUAL TABLE' not in scan.group(2):
+            full_scans.append(scan.group(1))
+    return full_scans, indexes
+
+
+def _parse_mysql(plan):
+    full_scans, indexes = [], []
+
+    def walk(node):
+        if isinstance(node, dict):
+            table = node.get('table_name')
+            if table and node.get('access_type') == 'ALL':
+                full_scans.append(table)
+            if table and node.get('key'):
+                indexes.append(node['key'])
+            for value in node.values():
+                walk(value)
+        elif isinstance(node, list):
+            for value in node:
+                walk(value)
+
+    walk(json.loads(plan))
+    return full_scans, indexes
+
+
+def explain(queryset):
+    '''
+    Run EXPLAIN (EXPLAIN QUERY PLAN on SQLite) for a queryset and report the
+    tables it reads in full and the indexes it uses.
+    '''
+    vendor = connections[queryset.db].vendor
+    sql = str(queryset.query)
+    if vendor == 'mysql':
+        plan = queryset.explain(format='json')
+        full_scans, indexes = _parse_mysql(plan)
+    elif vendor == 'sqlite':
+        plan = queryset.explain()
+        full_scans, indexes = _parse_sqlite(plan)
+    else:
+        plan = queryset.explain()
+        full_scans = re.findall(r'Seq Scan on (\S+)', plan)
+        indexes = re.findall(r'Index (?:Only )?Scan (?:Backward )?using (\S+)', plan)
+    return QueryPlan(sql=sql, plan=plan, full_scans=full_scans, indexes=indexes)
+
+
+def explain_sql(sql, using='default'):
+    '''
+    Like explain() for an SQL string with its parameters inlined, such as
+    the ones CaptureQueriesContext records.
+    '''
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute(f'EXPLAIN FORMAT=JSON {sql}')
+            plan = cursor.fetchone()[0]
+            full_scans, indexes = _parse_mysql(plan)
+        elif connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            plan = '\n'.join(row[-1] for row in cursor.fetchall())
+            full_scans, indexes = _parse_sqlite(plan)
+        else:
+            cursor.execute(f'EXPLAIN {sql}')
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            full_scans = re.findall(r'Seq Scan on (\S+)', plan)
+            indexes = re.findall(r'Index (?:Only )?Scan (?:Backward )?using (\S+)', plan)
+    return QueryPlan(sql=sql, plan=plan, full_scans=full_scans, indexes=indexes)
+
+
+def _iter_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from _iter_patterns(pattern.url_patterns, prefix + str(pattern.pattern))
+        elif isinstance(pattern, URLPattern):
+            route = (prefix + str(pattern.pattern)).replace('^', '').replace('$', '')
+            yield route, pattern.callback
+
+
+def list_endpoints(urlconf):
+    '''
+    Yield (route, view class, viewset actions) for every DRF list endpoint in
+    a urlconf module.
+    '''
+    seen = set()
+    for route, callback in _iter_patterns(urlconf.urlpatterns):
+        cls = getattr(callback, 'cls', None)
+        if cls is None or not issubclass(cls, ListModelMixin):
+            continue
+        actions = getattr(callback, 'actions', None)
+        if actions is not None and actions.get('get') != 'list':
+            continue
+        # Routers register a second, format-suffixed route for the same view.
+        if cls in seen:
+            continue
+        seen.add(cls)
+        yield route, cls, actions
+
+
+def list_queryset(route, cls, actions, params, user):
+    '''
+    Build the queryset a GET on a list endpoint would paginate, with the
+    view's own get_queryset() and filter backends applied.
+    '''
+    request = Request(APIRequestFactory().get('/' + route, params))
+    request.user = user
+    view = cls(**(getattr(cls, 'initkwargs', None) or {}))
+    if actions is not None:
+        view.action_map = actions
+        view.action = 'list'
+    view.request = request
+    view.args, view.kwargs, view.format_kwarg = (), {}, None
+    return view.filter_queryset(view.get_queryset())
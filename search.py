@@ -0,0 +1,164 @@
+import re
+
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+from django.db import connection, connections
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+from rest_framework.settings import api_settings
+
+from .models import Task, SubTask
+
+
+INDEXED_MODELS = (Task, SubTask)
+INDEXED_FIELDS = ('title', 'description')
+
+
+class SQLiteFTSBackend:
+    '''
+    FTS5 external-content tables (<table>_fts) over title and description,
+    kept in sync with the base tables by triggers.
+    '''
+    vendor = 'sqlite'
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        fts = f'{table}_fts'
+        # Quote every term so user input can't inject FTS5 operators and
+        # keep prefix matching close to the old icontains behaviour.
+        match = ' '.join('"%s"*' % term.replace('"', '""') for term in terms)
+        rank = RawSQL(f'SELECT -rank FROM {fts} WHERE {fts} MATCH %s AND rowid = {table}.id', (match,))
+        matches = RawSQL(f'SELECT rowid FROM {fts} WHERE {fts} MATCH %s', (match,))
+        return queryset.filter(pk__in=matches).annotate(search_rank=rank)
+
+    def install(self, schema_editor, table):
+        fts = f'{table}_fts'
+        columns = ', '.join(INDEXED_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in INDEXED_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in INDEXED_FIELDS)
+        insert = f'INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});'
+        delete = f"INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});"
+
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({columns}, content='{table}', content_rowid='id')"
+        )
+        schema_editor.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END')
+        schema_editor.execute(f'CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END')
+        schema_editor.execute(
+            f'CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN {delete} {insert} END'
+        )
+        self.rebuild(schema_editor, table)
+
+    def missing(self, connection, table):
+        '''
+        Names of the index objects of ``table`` that don't exist.
+        '''
+        fts = f'{table}_fts'
+        expected = [fts] + [f'{fts}_{suffix}' for suffix in ('ai', 'ad', 'au')]
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            existing = {row[0] for row in cursor.fetchall()}
+        return [name for name in expected if name not in existing]
+
+    def uninstall(self, schema_editor, table):
+        fts = f'{table}_fts'
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f'DROP TRIGGER IF EXISTS {fts}_{suffix}')
+        schema_editor.execute(f'DROP TABLE IF EXISTS {fts}')
+
+    def rebuild(self, schema_editor, table):
+        fts = f'{table}_fts'
+        schema_editor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class MySQLFulltextBackend:
+    '''
+    InnoDB FULLTEXT index over title and description, maintained by MySQL.
+    '''
+    vendor = 'mysql'
+
+    def search(self, queryset, terms):
+        table = queryset.model._meta.db_table
+        columns = ', '.join(f'{table}.{field}' for field in INDEXED_FIELDS)
+        # Strip boolean-mode operators from user input, then require every term.
+        words = [re.sub(r'[+\-<>()~*"@]+', ' ', term).strip() for term in terms]
+        match = ' '.join(f'+{word}*' for word in words if word)
+        rank = RawSQL(f'MATCH ({columns}) AGAINST (%s IN BOOLEAN MODE)', (match,))
+        return queryset.annotate(search_rank=rank).filter(search_rank__gt=0)
+
+    def install(self, schema_editor, table):
+        columns = ', '.join(INDEXED_FIELDS)
+        schema_editor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {table}_fts ({columns})')
+
+    def missing(self, connection, table):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1 FROM information_schema.statistics WHERE table_schema = DATABASE() '
+                           'AND table_name = %s AND index_name = %s LIMIT 1', [table, f'{table}_fts'])
+            return [] if cursor.fetchone() else [f'{table}_fts']
+
+    def uninstall(self, schema_editor, table):
+        schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {table}_fts')
+
+    def rebuild(self, schema_editor, table):
+        schema_editor.execute(f'OPTIMIZE TABLE {table}')
+
+
+def get_backend(using=connection):
+    '''
+    Return the configured search backend, or None when it doesn't match the
+    database in use (e.g. tests on another vendor) so callers fall back to LIKE.
+    '''
+    path = getattr(settings, 'TASK_SEARCH_BACKEND', None)
+    if not path:
+        return None
+    backend = import_string(path)()
+    if backend.vendor != using.vendor:
+        return None
+    return backend
+
+
+@register(Tags.database)
+def check_search_index(app_configs=None, databases=None, **kwargs):
+    '''
+    A table rebuild (SQLite ALTER TABLE) silently drops the sync triggers, after
+    which ?search= misses every new or edited row. Skipped while migrations are
+    pending, they may be the ones reinstalling it.
+    '''
+    errors = []
+    for alias in databases or ():
+        using = connections[alias]
+        backend = get_backend(using)
+        if backend is None:
+            continue
+        executor = MigrationExecutor(using)
+        if executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            continue
+        missing = [name for model in INDEXED_MODELS for name in backend.missing(using, model._meta.db_table)]
+        if missing:
+            errors.append(Error(
+                f"Full-text search index objects are missing from database '{alias}': {', '.join(missing)}.",
+                hint='Run `python manage.py install_search_index`.',
+                id='task_manager.E001',
+            ))
+    return errors
+
+
+class FullTextSearchFilter(SearchFilter):
+    '''
+    SearchFilter that sends ?search= to the full-text backend and, unless the
+    client passed ?ordering=, orders the matches by relevance. Place it after
+    OrderingFilter in filter_backends.
+    '''
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        backend = get_backend()
+        if not terms or backend is None or queryset.model not in INDEXED_MODELS:
+            return super().filter_queryset(request, queryset, view)
+
+        queryset = backend.search(queryset, terms)
+        if api_settings.ORDERING_PARAM not in request.query_params:
+            ordering = queryset.query.order_by or queryset.model._meta.ordering
+            queryset = queryset.order_by('-search_rank', *ordering)
+        return queryset
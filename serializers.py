@@ -1,9 +1,16 @@
+from collections import Counter
+
+from django.db import transaction
 from django.utils.timezone import  now
 from rest_framework import serializers
-from .models import  Task, SubTask, Category
+from .models import  Task, SubTask, Category, STATUS_CHOICES
 from .validators import validate_deadline
+from . import counters, versions
 from django.contrib.auth.models import  User
 from django.contrib.auth.password_validation import validate_password
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from .blacklist import FilteredRefreshToken
 
 
 class TaskSerializer(serializers.ModelSerializer):
@@ -19,6 +26,12 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
 
 
+class OwnerSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username']
+
+
 class SubTaskCreateSerializer(serializers.ModelSerializer):
     owner = serializers.HiddenField(default=serializers.CurrentUserDefault())
     deadline = serializers.DateField(validators=[validate_deadline])
@@ -32,7 +45,7 @@ class SubTaskCreateSerializer(serializers.ModelSerializer):
 class CategoryCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = '__all__'
+        exclude = ['task_count']
 
     def create(self, validated_data):
         return Category.objects.create(**validated_data)
@@ -45,6 +58,27 @@ class CategoryCreateSerializer(serializers.ModelSerializer):
         return super().update(obj, validated_data)
 
 
+class CategoryCountsSerializer(CategoryCreateSerializer):
+    '''
+    Category with the task counts annotated by CategoryViewSet (?with_counts=).
+    '''
+    task_count = serializers.SerializerMethodField()
+    status_counts = serializers.SerializerMethodField()
+
+    def get_task_count(self, obj):
+        # Annotated by the GROUP BY, else the denormalized column.
+        return getattr(obj, 'counted_tasks', obj.task_count)
+
+    def get_status_counts(self, obj):
+        if not hasattr(obj, f'{STATUS_CHOICES[0][0]}_count'):
+            return None
+        return {key: getattr(obj, f'{key}_count') for key, _ in STATUS_CHOICES}
+
+    class Meta(CategoryCreateSerializer.Meta):
+        exclude = None
+        fields = '__all__'
+
+
 class SubTaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = SubTask
@@ -56,7 +90,7 @@ class TaskDetailSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ['deadline_weekday']
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
@@ -65,7 +99,7 @@ class TaskCreateSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Task
-        fields = '__all__'
+        exclude = ['deadline_weekday']
         read_only_fields = ['created_at', 'owner']
 
     def validate_deadline(self, value):
@@ -74,6 +108,202 @@ class TaskCreateSerializer(serializers.ModelSerializer):
         return value
 
 
+class BulkUpsertListSerializer(serializers.ListSerializer):
+    '''
+    Validates a JSON array item by item and writes the valid items with
+    bulk_create/bulk_update in one transaction. Lookups the single-object
+    serializers run per row (uniqueness, related objects) are done once per
+    batch. Invalid items end up in ``item_errors`` instead of failing the
+    whole batch, and items matching an existing row on ``upsert_key`` update
+    that row so re-running an import is idempotent.
+    '''
+    upsert_key = ()
+    max_items = 1000
+
+    def to_internal_value(self, data):
+        if not isinstance(data, list):
+            raise serializers.ValidationError({'non_field_errors': ['Expected a list of items.']})
+        if len(data) > self.max_items:
+            raise serializers.ValidationError(
+                {'non_field_errors': [f'Ensure this list has no more than {self.max_items} items.']}
+            )
+
+        self.item_errors = {}
+        items = {}
+        for index, item in enumerate(data):
+            try:
+                items[index] = self.child.run_validation(item)
+            except serializers.ValidationError as e:
+                self.item_errors[index] = e.detail
+
+        seen = set()
+        for index, attrs in list(items.items()):
+            key = tuple(attrs[f] for f in self.upsert_key)
+            if key in seen:
+                self.item_errors[index] = {'non_field_errors': ['Duplicate item in this batch.']}
+                del items[index]
+            seen.add(key)
+
+        for index, errors in self.validate_items(items).items():
+            self.item_errors[index] = errors
+            del items[index]
+
+        self.existing = self.get_existing(items)
+        user = self.context['request'].user
+        for index, attrs in list(items.items()):
+            instance = self.existing.get(tuple(attrs[f] for f in self.upsert_key))
+            if instance is not None and instance.owner_id != user.pk and not user.is_superuser:
+                self.item_errors[index] = {'non_field_errors': ['You do not have permission to update this item.']}
+                del items[index]
+        return items
+
+    def validate_items(self, items):
+        '''
+        Batch checks for the valid items, returns {index: errors}.
+        '''
+        return {}
+
+    def get_existing(self, items):
+        model = self.child.Meta.model
+        if not items:
+            return {}
+        lookup = {f'{f}__in': {attrs[f] for attrs in items.values()} for f in self.upsert_key}
+        return {tuple(getattr(obj, f) for f in self.upsert_key): obj for obj in model.objects.filter(**lookup)}
+
+    def save(self, **kwargs):
+        items = {index: {**attrs, **kwargs} for index, attrs in self.validated_data.items()}
+        with transaction.atomic():
+            self.results = self.upsert(items)
+        return self.results
+
+    def upsert(self, items):
+        model = self.child.Meta.model
+        created, updated, results = [], [], {}
+        for index, attrs in items.items():
+            instance = self.existing.get(tuple(attrs[f] for f in self.upsert_key))
+            if instance is None:
+                created.append((index, model(**attrs)))
+                continue
+            attrs.pop('owner', None)
+            for field, value in attrs.items():
+                setattr(instance, field, value)
+            updated.append((index, instance))
+
+        model.objects.bulk_create([obj for _, obj in created])
+        self.fill_missing_pks([obj for _, obj in created])
+        update_fields = {f for index, _ in updated for f in items[index]} - {'owner'}
+        if updated and update_fields:
+            model.objects.bulk_update([obj for _, obj in updated], sorted(update_fields))
+
+        from .signals import status_changed
+        for _, obj in updated:
+            old_status = obj.loaded_value('status')
+            if old_status != obj.status:
+                status_changed.send(sender=model, instance=obj, old_status=old_status, new_status=obj.status)
+            obj.snapshot_tracked_fields()
+
+        for index, obj in created:
+            results[index] = {'index': index, 'id': obj.pk, 'result': 'created'}
+        for index, obj in updated:
+            results[index] = {'index': index, 'id': obj.pk, 'result': 'updated'}
+        return results
+
+    def fill_missing_pks(self, objs):
+        # Backends that can't return ids from a bulk insert (MySQL) need one
+        # lookup by the upsert key.
+        missing = [obj for obj in objs if obj.pk is None]
+        if missing:
+            existing = self.get_existing({i: {f: getattr(obj, f) for f in self.upsert_key}
+                                          for i, obj in enumerate(missing)})
+            for obj in missing:
+                obj.pk = existing[tuple(getattr(obj, f) for f in self.upsert_key)].pk
+
+    def get_response_data(self):
+        errors = {index: {'index': index, 'errors': detail} for index, detail in self.item_errors.items()}
+        results = {**self.results, **errors}
+        return {
+            'created': sum(r.get('result') == 'created' for r in results.values()),
+            'updated': sum(r.get('result') == 'updated' for r in results.values()),
+            'failed': len(errors),
+            'results': [results[index] for index in sorted(results)],
+        }
+
+
+class TaskBulkListSerializer(BulkUpsertListSerializer):
+    upsert_key = ('title', 'deadline')
+
+    def validate_items(self, items):
+        category_ids = {pk for attrs in items.values() for pk in attrs.get('categories', ())}
+        existing = set(Category.objects.filter(pk__in=category_ids).values_list('pk', flat=True))
+        errors = {}
+        for index, attrs in items.items():
+            missing = [pk for pk in attrs.get('categories', ()) if pk not in existing]
+            if missing:
+                errors[index] = {'categories': [f'Invalid pk "{pk}" - object does not exist.' for pk in missing]}
+        return errors
+
+    def upsert(self, items):
+        categories = {index: attrs.pop('categories') for index, attrs in items.items() if 'categories' in attrs}
+        results = super().upsert(items)
+
+        through = Task.categories.through
+        task_ids = {index: results[index]['id'] for index in categories}
+        replaced = [task_ids[index] for index in categories if results[index]['result'] == 'updated']
+        unlinked = Counter()
+        if replaced:
+            unlinked = counters.count_category_links(through.objects.filter(task_id__in=replaced))
+            through.objects.filter(task_id__in=replaced).delete()
+        links = through.objects.bulk_create([
+            through(task_id=task_ids[index], category_id=category_id)
+            for index, ids in categories.items() for category_id in set(ids)
+        ])
+        # Direct through table writes send no m2m_changed.
+        linked = Counter(link.category_id for link in links)
+        linked.subtract(unlinked)
+        counters.adjust_category_counts(linked)
+        versions.bump(['categories'])
+        return results
+
+
+class TaskBulkSerializer(serializers.ModelSerializer):
+    deadline = serializers.DateField(validators=[validate_deadline])
+    categories = serializers.ListField(child=serializers.IntegerField(), required=False)
+
+    class Meta:
+        model = Task
+        fields = ['id', 'title', 'description', 'categories', 'status', 'deadline']
+        read_only_fields = ['id']
+        list_serializer_class = TaskBulkListSerializer
+        # unique_for_date is checked once per batch by TaskBulkListSerializer.
+        validators = []
+
+
+class SubTaskBulkListSerializer(BulkUpsertListSerializer):
+    upsert_key = ('title',)
+
+    def validate_items(self, items):
+        task_ids = {attrs['task_id'] for attrs in items.values()}
+        existing = set(Task.objects.filter(pk__in=task_ids).values_list('pk', flat=True))
+        return {
+            index: {'task': [f'Invalid pk "{attrs["task_id"]}" - object does not exist.']}
+            for index, attrs in items.items() if attrs['task_id'] not in existing
+        }
+
+
+class SubTaskBulkSerializer(serializers.ModelSerializer):
+    deadline = serializers.DateField(validators=[validate_deadline])
+    task = serializers.IntegerField(source='task_id')
+    # Declared without the UniqueValidator, titles are matched per batch
+    # by SubTaskBulkListSerializer.
+    title = serializers.CharField(max_length=50)
+
+    class Meta:
+        model = SubTask
+        fields = ['id', 'title', 'description', 'task', 'status', 'deadline']
+        read_only_fields = ['id']
+        list_serializer_class = SubTaskBulkListSerializer
+
+
 class RegisterSerializer(serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, validators=[validate_password])
     password2 = serializers.CharField(write_only=True)
@@ -95,4 +325,35 @@ class RegisterSerializer(serializers.ModelSerializer):
         )
         user.set_password(validated_data['password'])  # хэширование
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+def set_user_claims(token, user):
+    # For clients only, permissions are always checked against the user row.
+    token['username'] = user.get_username()
+    token['is_active'] = user.is_active
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        set_user_claims(token, user)
+        return token
+
+
+class ClaimsRefreshToken(FilteredRefreshToken):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Rotation would copy the old claims, take them from the user as it is now.
+        user_id = self.payload.get(api_settings.USER_ID_CLAIM)
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first() if user_id else None
+        if user is not None:
+            set_user_claims(self, user)
+
+
+class FilteredTokenRefreshSerializer(TokenRefreshSerializer):
+    # Checks the blacklist Bloom filter before the database.
+    token_class = ClaimsRefreshToken
@@ -1,31 +1,165 @@
-from django.db.models.signals import pre_save
-from django.dispatch import receiver
-from django.core.mail import send_mail
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.conf import settings
-from .models import Task
+from django.dispatch import receiver, Signal
+from django.utils.timezone import now
+from .models import Task, SubTask, Category, User
+from . import counters, outbox, versions
+from .authentication import user_cache
+from .blacklist import blacklist_filter
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+
+# Sent after a Task or SubTask is saved with a different status than the one
+# it was loaded with. Arguments: instance, old_status, new_status.
+status_changed = Signal()
 
 
 @receiver(pre_save, sender=Task)
-def notify_owner_on_status_change(sender, instance: Task, **kwargs):
-    if not instance.pk:
-        return #new task
+@receiver(pre_save, sender=SubTask)
+def load_missing_tracked_values(sender, instance, **kwargs):
+    # Instances read from the database already carry their snapshot, only
+    # ones built by hand (e.g. Task(pk=1, ...)) cost a query here.
+    if not instance.pk or instance.has_loaded_values(*sender.tracked_fields):
+        return
+    row = sender.objects.filter(pk=instance.pk).values(*sender.tracked_fields).first()
+    instance._loaded_values = row or {}
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_save, sender=SubTask)
+def send_status_changed(sender, instance, created, **kwargs):
+    if created or not instance.has_loaded_values('status'):
+        return
+    old_status = instance.loaded_value('status')
+    if old_status != instance.status:
+        status_changed.send(sender=sender, instance=instance, old_status=old_status, new_status=instance.status)
+
+
+@receiver(status_changed, sender=Task)
+def notify_owner_on_status_change(sender, instance: Task, old_status, new_status, **kwargs):
+    if Task.owner.is_cached(instance):
+        email = instance.owner.email
+    else:
+        email = User.objects.filter(pk=instance.owner_id).values_list('email', flat=True).first()
+
+    if email:
+        subject = f'Task status changed: {instance.title}'
+        message = f"New status of the task {instance.title} has been changed to {new_status}"
+        # Delivered by the send_outbox_emails worker, Task.save() keeps
+        # this row in the same transaction as the task update.
+        outbox.enqueue_email(subject=subject, body=message, to=email)
+
+
+@receiver(post_save, sender=Task)
+def update_counters_on_save(sender, instance: Task, created, **kwargs):
+    old_key = None
+    if not created and instance.has_loaded_values(*counters.KEY_FIELDS):
+        old_key = counters.make_key(*(instance.loaded_value(f) for f in counters.KEY_FIELDS))
+    counters.task_saved(instance, created, old_key)
+
+
+@receiver(post_delete, sender=Task)
+def update_counters_on_delete(sender, instance: Task, **kwargs):
+    counters.task_deleted(instance)
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=SubTask)
+@receiver(post_delete, sender=SubTask)
+def bump_versions_on_write(sender, instance, **kwargs):
+    owner_ids = {instance.owner_id}
+    if instance.has_loaded_values('owner_id'):
+        owner_ids.add(instance.loaded_value('owner_id'))
+    fields = instance.changed_fields() if 'created' in kwargs else sender.tracked_fields
+    versions.bump(sender.objects.get_queryset().version_keys(owner_ids - {None}, fields))
+
 
-    try:
-        old_instance = Task.objects.get(pk=instance.pk)
-    except Task.DoesNotExist:
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def bump_category_version(sender, instance, created=False, **kwargs):
+    keys = ['categories']
+    # Tasks show the ids of their live categories, a (soft) delete or restore
+    # changes them. Their validators include this key instead of every
+    # linked task row being rewritten.
+    if kwargs.get('signal') is post_delete:
+        if not instance.is_deleted:
+            keys.append('categories:deleted')
+    elif not created and (not instance.has_loaded_values('is_deleted') or 'is_deleted' in instance.changed_fields()):
+        keys.append('categories:deleted')
+    versions.bump(keys)
+
+
+def touch_tasks(queryset):
+    # New updated_at for their detail ETags, update() bumps the owners' list versions.
+    queryset.update(updated_at=now())
+
+
+@receiver(m2m_changed, sender=Task.categories.through)
+def bump_versions_on_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    # Task representations list their categories and categories can list
+    # their task counts, so a changed link invalidates both sides.
+    if not reverse:
+        if action.startswith('post_'):
+            Task.objects.filter(pk=instance.pk).touch()
+            versions.bump(versions.owner_keys('tasks', {instance.owner_id}) + ['categories'])
         return
 
-    old_status = old_instance.status
-    new_status = instance.status
-
-    if old_status != new_status:
-        user = instance.owner
-        if user and user.email:
-            subject = f'Task status changed: {instance.title}'
-            message = f"New status of the task {instance.title} has been changed to {new_status}"
-            send_mail(subject=subject,
-                      message=message,
-                      from_email=settings.DEFAULT_FROM_EMAIL,
-                      recipient_list=[user.email],
-                      fail_silently=False,
-                      )
\ No newline at end of file
+    if action == 'pre_clear':
+        instance._cleared_task_ids = set(Task.objects.filter(categories=instance).values_list('pk', flat=True))
+    elif action == 'post_clear':
+        touch_tasks(Task.objects.filter(pk__in=getattr(instance, '_cleared_task_ids', ())))
+        versions.bump(['categories'])
+    elif action in ('post_add', 'post_remove') and pk_set:
+        touch_tasks(Task.objects.filter(pk__in=pk_set))
+        versions.bump(['categories'])
+
+
+def count_category_links(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'post_add':
+        # pk_set only holds the links that were actually inserted.
+        if reverse:
+            counters.adjust_category_counts({instance.pk: len(pk_set)})
+        else:
+            counters.adjust_category_counts({pk: 1 for pk in pk_set})
+    elif action in ('pre_remove', 'pre_clear'):
+        # remove() gets the requested pks, not only the linked ones.
+        links = sender.objects.filter(**{'category_id' if reverse else 'task_id': instance.pk})
+        if action == 'pre_remove':
+            links = links.filter(**{'task_id__in' if reverse else 'category_id__in': pk_set})
+        instance._unlinked_categories = counters.count_category_links(links)
+    elif action in ('post_remove', 'post_clear'):
+        counters.adjust_category_counts({pk: -n for pk, n in instance._unlinked_categories.items()})
+
+
+def remember_task_categories(sender, instance, **kwargs):
+    # Links of a deleted task cascade without m2m_changed or delete signals
+    # (Django sends none for auto-created through models).
+    instance._unlinked_categories = counters.count_category_links(
+        Task.categories.through.objects.filter(task_id=instance.pk))
+
+
+def uncount_task_categories(sender, instance, **kwargs):
+    counters.adjust_category_counts({pk: -n for pk, n in instance._unlinked_categories.items()})
+
+
+if settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+    m2m_changed.connect(count_category_links, sender=Task.categories.through)
+    pre_delete.connect(remember_task_categories, sender=Task)
+    post_delete.connect(uncount_task_categories, sender=Task)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    # Covers deactivation and password changes, both end in save().
+    user_cache.invalidate(getattr(instance, jwt_settings.USER_ID_FIELD))
+    # Usernames appear in ?expand=owner responses.
+    versions.bump(['users'])
+
+
+@receiver(post_save, sender=BlacklistedToken)
+def add_to_blacklist_filter(sender, instance, created, **kwargs):
+    if created:
+        blacklist_filter.add(instance.token.jti)
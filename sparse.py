@@ -0,0 +1,184 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import permissions, serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.relations import ManyRelatedField, PrimaryKeyRelatedField
+from rest_framework.response import Response
+
+from .instrumentation import time_serializer
+
+
+# Field types whose to_representation() formats the raw database value,
+# all other plain fields are passed through as they come from values().
+CONVERTED_FIELDS = (
+    serializers.DateTimeField, serializers.DateField, serializers.TimeField,
+    serializers.DecimalField, serializers.DurationField, serializers.UUIDField,
+)
+
+
+class RowPlan:
+    '''
+    How to build a serializer's output from values() rows: one
+    (name, column, converter) per plain field or foreign key and one
+    (name, model field) per many-to-many of primary keys. build() returns
+    None for serializers with anything else (nested or method fields...).
+    '''
+    def __init__(self, columns, many):
+        self.columns, self.many = columns, many
+
+    @classmethod
+    def build(cls, serializer, model, names):
+        columns, many = [], []
+        for name in names:
+            field = serializer.fields[name]
+            if '.' in field.source or field.source == '*':
+                return None
+            try:
+                model_field = model._meta.get_field(field.source)
+            except FieldDoesNotExist:
+                return None
+
+            if isinstance(field, ManyRelatedField) and isinstance(field.child_relation, PrimaryKeyRelatedField):
+                many.append((name, model_field))
+            elif isinstance(field, PrimaryKeyRelatedField) and model_field.many_to_one:
+                columns.append((name, model_field.attname, None))
+            elif not isinstance(field, (serializers.RelatedField, ManyRelatedField, serializers.BaseSerializer,
+                                        serializers.SerializerMethodField)) and model_field.concrete:
+                columns.append((name, model_field.attname,
+                                field.to_representation if isinstance(field, CONVERTED_FIELDS) else None))
+            else:
+                return None
+        return cls(columns, many)
+
+    @property
+    def attnames(self):
+        return [attname for _, attname, _ in self.columns]
+
+    def render(self, rows):
+        ids = [row['id'] for row in rows]
+        related = {name: self.group_many(self.many_queryset(model_field, ids)) for name, model_field in self.many}
+        return self.build_items(rows, related)
+
+    async def arender(self, rows):
+        ids = [row['id'] for row in rows]
+        related = {}
+        for name, model_field in self.many:
+            related[name] = self.group_many([pair async for pair in self.many_queryset(model_field, ids)])
+        return self.build_items(rows, related)
+
+    @time_serializer
+    def build_items(self, rows, related):
+        data = []
+        for row in rows:
+            item = {}
+            for name, attname, convert in self.columns:
+                value = row[attname]
+                item[name] = convert(value) if convert is not None and value is not None else value
+            for name, _ in self.many:
+                item[name] = related[name].get(row['id'], [])
+            data.append(item)
+        return data
+
+    @staticmethod
+    def many_queryset(model_field, ids):
+        # Through the related model's default manager, like the slow path.
+        lookup = model_field.related_query_name()
+        return (model_field.related_model._default_manager.filter(**{f'{lookup}__in': ids})
+                .values_list(lookup, 'pk').order_by('pk'))
+
+    @staticmethod
+    def group_many(pairs):
+        related = {}
+        for owner_id, pk in pairs:
+            related.setdefault(owner_id, []).append(pk)
+        return related
+
+
+class SparseFieldsMixin:
+    '''
+    ?fields=id,title,status on GET limits the output to those fields and the
+    SELECT to the columns they need (plus the ordering ones).
+
+    Read-only lists without ?expand= take a fast path: rows are read with
+    values() and turned into dicts by a RowPlan, without model instances or
+    per-row serializer fields. Serializers the plan can't express fall back
+    to the regular path.
+    '''
+    fast_list = True
+
+    @property
+    def sparse_fields(self):
+        value = self.request.query_params.get('fields')
+        if not value or self.request.method not in permissions.SAFE_METHODS:
+            return None
+        return [name.strip() for name in value.split(',') if name.strip()]
+
+    def get_output_fields(self, serializer):
+        readable = [name for name, field in serializer.fields.items() if not field.write_only]
+        requested = self.sparse_fields
+        if requested is None:
+            return readable
+        # Relations nested by ?expand= (ExpandMixin) are added after this.
+        allowed = readable + [name for name in getattr(self, 'expand', ()) if name not in readable]
+        unknown = [name for name in requested if name not in allowed]
+        if unknown:
+            raise ValidationError({'fields': f"Invalid field: {', '.join(unknown)}. Choose from: {', '.join(allowed)}"})
+        return [name for name in readable if name in requested]
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.sparse_fields is not None:
+            fields = getattr(serializer, 'child', serializer).fields
+            keep = set(self.get_output_fields(getattr(serializer, 'child', serializer)))
+            for name in list(fields):
+                if name not in keep and not fields[name].write_only:
+                    fields.pop(name)
+        return serializer
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.sparse_fields is None or getattr(self, 'expand', ()):
+            return queryset
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        columns = set()
+        for name in self.get_output_fields(serializer):
+            try:
+                field = queryset.model._meta.get_field(serializer.fields[name].source)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete and not field.many_to_many:
+                columns.add(field.name)
+        return queryset.only(*columns, *self.get_ordering_columns(queryset))
+
+    def get_ordering_columns(self, queryset, annotations=False):
+        '''
+        Columns the paginator needs to build its cursor: the ordering fields
+        (annotations only if asked for) and the primary key.
+        '''
+        ordering = [f for f in queryset.query.order_by if isinstance(f, str)] or list(queryset.model._meta.ordering)
+        columns = {'id'}
+        for name in ordering:
+            name = name.lstrip('-')
+            if name != 'pk' and (annotations or name not in queryset.query.annotations):
+                columns.add(name)
+        return columns
+
+    def get_row_plan(self):
+        if not self.fast_list or getattr(self, 'expand', ()):
+            return None
+        serializer = self.get_serializer_class()(context=self.get_serializer_context())
+        return RowPlan.build(serializer, self.get_queryset().model, self.get_output_fields(serializer))
+
+    def get_row_queryset(self, plan):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        return queryset.values(*{*plan.attnames, *self.get_ordering_columns(queryset, annotations=True)})
+
+    def list(self, request, *args, **kwargs):
+        plan = self.get_row_plan()
+        if plan is None:
+            return super().list(request, *args, **kwargs)
+
+        rows = self.get_row_queryset(plan)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(plan.render(page))
+        return Response(plan.render(list(rows)))
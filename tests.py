@@ -1,3 +1,1079 @@
-from django.test import TestCase
+import csv
+import json
+import os
+import re
+import tempfile
+from base64 import b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Count, F
+from django.db.models.signals import m2m_changed, post_delete, pre_delete
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils.timezone import now
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase, force_authenticate
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import caching, counters, outbox, signals
+from .async_views import (
+    AsyncMySubTasksAPIView, AsyncMyTasksAPIView, AsyncSubTaskListAPIView, AsyncSubTaskRetrieveAPIView,
+    AsyncTaskListAPIView, AsyncTaskRetrieveAPIView, AsyncTaskStatisticsAPIView,
+)
+from .authentication import ClaimsJWTAuthentication
+from .blacklist import BloomFilter, blacklist_filter
+from .models import (Task, SubTask, Category, OutboxEmail, STATUS_CHOICES, TaskStatusCounter, TaskOwnerCounter,
+                     TaskDeadlineCounter)
+from .queryplans import explain_sql
+from .search import check_search_index
+from .views import (
+    MySubTasksAPIView, MyTasksAPIView, SubTaskListCreateAPIView, SubTaskRetrieveUpdateDestroyAPIView,
+    TaskListCreateAPIView, TaskRetrieveUpdateDestroyAPIView, task_statistics,
+)
+
+
+class QueryCountAssertions:
+    '''
+    assertEndpointQueries() for APITestCase subclasses: request an endpoint
+    and fail with the captured SQL when it runs a different number of queries.
+    '''
+    def assertEndpointQueries(self, expected, path, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, **kwargs)
+        queries = '\n'.join(f"{i}. {query['sql']}" for i, query in enumerate(context.captured_queries, 1))
+        self.assertEqual(len(context), expected,
+                         f'{method.upper()} {path} ran {len(context)} queries, expected {expected}:\n{queries}')
+        return response
+
+
+# The response cache would answer repeated requests without the queries under test.
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ExpandQueryCountTests(QueryCountAssertions, APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.categories = [Category.objects.create(name=f'Category {i}') for i in range(3)]
+
+    def create_tasks(self, count):
+        for i in range(count):
+            task = Task.objects.create(title=f'Task {Task.objects.count()}', description='', owner=self.user,
+                                       deadline=now() + timedelta(days=1))
+            task.categories.set(self.categories)
+            SubTask.objects.create(title=f'Subtask of {task.title}', description='', task=task, owner=self.user,
+                                   deadline=now() + timedelta(days=1))
+
+    def test_task_list_queries_do_not_grow_with_page_size(self):
+        # Versions, tasks joined with owners, subtasks, categories.
+        path = '/tasks/?expand=subtasks,categories,owner'
+        self.create_tasks(2)
+        response = self.assertEndpointQueries(4, path)
+        self.create_tasks(8)
+        self.assertEndpointQueries(4, path)
+
+        task = response.data['results'][0]
+        self.assertEqual(task['owner'], {'id': self.user.pk, 'username': 'owner'})
+        self.assertEqual(len(task['categories']), 3)
+        self.assertEqual(len(task['subtasks']), 1)
+
+    def test_subtask_list_queries_do_not_grow_with_page_size(self):
+        path = '/subtasks/?expand=task,owner'
+        self.create_tasks(2)
+        self.assertEndpointQueries(2, path)
+        self.create_tasks(8)
+        response = self.assertEndpointQueries(2, path)
+        self.assertEqual(response.data['results'][0]['owner']['username'], 'owner')
+
+    def test_task_detail_queries(self):
+        self.create_tasks(1)
+        task = Task.objects.get()
+        # Owner for the version key, versions, task joined with owner, two prefetches.
+        self.assertEndpointQueries(5, f'/tasks/{task.pk}/?expand=subtasks,categories,owner')
+
+    def test_unknown_expansion(self):
+        response = self.client.get('/tasks/?expand=project')
+        self.assertEqual(response.status_code, 400)
+
+
+EXPLAINABLE = re.compile(r'\s*(SELECT|UPDATE|DELETE)\b', re.IGNORECASE)
+
+
+class QueryBudgetAssertions:
+    '''
+    assertQueryBudget() for APITestCase subclasses: request an endpoint and
+    fail when it runs more than ``max_queries`` queries or when the plan of
+    any of them reads a table in full. Failures print every query with its
+    EXPLAIN plan.
+    '''
+    # At most one row per status, reading it in full is fine.
+    scan_allowed = {'task_manager_task_status_counter'}
+
+    def assertQueryBudget(self, max_queries, path, method='get', **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, **kwargs)
+        self.assertLess(response.status_code, 400, f'{method.upper()} {path}: {response.status_code} {response.data}')
+
+        plans = [explain_sql(query['sql']) if EXPLAINABLE.match(query['sql']) else None
+                 for query in context.captured_queries]
+        report = '\n'.join(
+            f"{i}. {query['sql']}" + ('\n    ' + plan.plan.replace('\n', '\n    ') if plan else '')
+            for i, (query, plan) in enumerate(zip(context.captured_queries, plans), 1)
+        )
+        self.assertLessEqual(len(context), max_queries,
+                             f'{method.upper()} {path} ran {len(context)} queries, budget {max_queries}:\n{report}')
+        scans = {table for plan in plans if plan for table in plan.full_scans} - self.scan_allowed
+        self.assertFalse(scans, f"{method.upper()} {path} reads {', '.join(sorted(scans))} in full:\n{report}")
+        return response
+
+
+# (scenario, client, method, path, request data, max queries). Paths and
+# data are formatted with QueryBudgetTests.ids; the client is 'user' (the
+# owner with the most tasks) or 'admin'.
+QUERY_BUDGETS = [
+    # Versions, one page of tasks with their categories.
+    ('task list', 'user', 'get', '/tasks/', None, 2),
+    ('task list by status', 'user', 'get', '/tasks/?status=N', None, 2),
+    ('task list by status and deadline', 'user', 'get', '/tasks/?status=N&deadline={deadline}', None, 2),
+    ('task list by weekday', 'user', 'get', '/tasks/?weekday=Monday', None, 2),
+    ('task search', 'user', 'get', '/tasks/?search=audit', None, 2),
+    ('task list by deadline', 'user', 'get', '/tasks/?ordering=deadline', None, 2),
+    ('task list oldest first', 'user', 'get', '/tasks/?ordering=created_at', None, 2),
+    ('task list sparse fields', 'user', 'get', '/tasks/?fields=id,title,status', None, 2),
+    ('task list expanded', 'user', 'get', '/tasks/?expand=subtasks,categories,owner', None, 4),
+    ('my tasks', 'user', 'get', '/tasks/my/', None, 3),
+    # The row's updated_at and the deleted categories version for the ETag, the task, its categories.
+    ('task detail', 'user', 'get', '/tasks/{task}/', None, 4),
+    ('task create', 'user', 'post', '/tasks/',
+     {'title': 'Budget task', 'description': 'New', 'deadline': '{deadline}', 'categories': ['{category}']}, 15),
+    # Status change: counters, a notification email in the outbox, versions.
+    ('task update', 'user', 'patch', '/tasks/{task}/', {'title': '{title}', 'deadline': '{deadline}', 'status': 'D'}, 18),
+    # Counter rollups, never the task table.
+    ('task statistics', 'admin', 'get', '/tasks/statistics/', None, 2),
+    ('task statistics of an owner', 'admin', 'get', '/tasks/statistics/?owner={owner}', None, 2),
+    ('subtask list', 'user', 'get', '/subtasks/', None, 2),
+    ('subtask list by status', 'user', 'get', '/subtasks/?status=N', None, 2),
+    ('subtask list expanded', 'user', 'get', '/subtasks/?expand=task,owner', None, 2),
+    ('my subtasks', 'user', 'get', '/subtasks/my/', None, 2),
+    ('subtask detail', 'user', 'get', '/subtasks/{subtask}/', None, 3),
+    ('category list', 'user', 'get', '/categories/', None, 2),
+    ('category list with counts', 'user', 'get', '/categories/?with_counts=1', None, 2),
+    ('category detail', 'user', 'get', '/categories/{category}/', None, 2),
+    ('category task count', 'user', 'get', '/categories/{category}/count_tasks/', None, 2),
+]
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class QueryBudgetTests(QueryBudgetAssertions, APITestCase):
+    '''
+    QUERY_BUDGETS on a seeded dataset big enough for the planner to pick
+    the plans it would pick in production.
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed', seed=1, tasks=20000, users=400, categories=100, stdout=StringIO())
+        if connection.vendor in ('sqlite', 'postgresql'):
+            # Planner statistics, MySQL keeps its own up to date.
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+        owner_id = Task.objects.order_by().values('owner').annotate(n=Count('pk')).order_by('-n')[0]['owner']
+        cls.user = User.objects.get(pk=owner_id)
+        cls.admin = User.objects.create_user('admin', is_staff=True)
+        deadline = now().date() + timedelta(days=3)
+        task = Task.objects.create(title='Budget', description='Owned', owner=cls.user, deadline=deadline)
+        task.categories.set(Category.objects.all()[:2])
+        cls.ids = {
+            'task': task.pk, 'title': task.title, 'deadline': deadline.isoformat(), 'owner': owner_id,
+            'subtask': SubTask.objects.filter(owner=cls.user).values_list('pk', flat=True).first(),
+            'category': Category.objects.values_list('pk', flat=True).first(),
+        }
+
+    def format(self, value):
+        if isinstance(value, dict):
+            return {key: self.format(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.format(item) for item in value]
+        return value.format(**self.ids)
+
+    def test_query_budgets(self):
+        for scenario, client, method, path, data, max_queries in QUERY_BUDGETS:
+            with self.subTest(scenario):
+                self.client.force_authenticate(self.admin if client == 'admin' else self.user)
+                kwargs = {'data': self.format(data), 'format': 'json'} if data is not None else {}
+                self.assertQueryBudget(max_queries, self.format(path), method, **kwargs)
+
+
+class AdminRightsTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@example.com', 'password', is_staff=True)
+        response = self.client.post('/api/token/', {'username': 'admin', 'password': 'password'})
+        self.refresh = response.data['refresh']
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+
+    def test_demoted_user_loses_admin_endpoints(self):
+        for path in ('/tasks/statistics/', '/cache/statistics/', '/metrics/'):
+            self.assertEqual(self.client.get(path).status_code, 200, path)
+
+        self.admin.is_staff = False
+        self.admin.save()
+        for path in ('/tasks/statistics/', '/cache/statistics/', '/metrics/'):
+            self.assertEqual(self.client.get(path).status_code, 403, path)
+
+    def test_refresh_takes_claims_from_the_user(self):
+        self.admin.is_staff = False
+        self.admin.save()
+        response = self.client.post('/api/token/refresh/', {'refresh': self.refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(AccessToken(response.data['access'])['is_staff'])
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.data['access']}")
+        self.assertEqual(self.client.get('/tasks/statistics/').status_code, 403)
+
+    def test_claims_authentication_reads_no_user_row(self):
+        @api_view(['GET'])
+        @authentication_classes([ClaimsJWTAuthentication])
+        @permission_classes([IsAuthenticated])
+        def whoami(request):
+            return Response({'id': request.user.id, 'is_staff': request.user.is_staff})
+
+        access = self.client.post('/api/token/', {'username': 'admin', 'password': 'password'}).data['access']
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        with CaptureQueriesContext(connection) as context:
+            response = whoami(request)
+        self.assertEqual(response.status_code, 200)
+        # Claims as issued, the id is a string claim.
+        self.assertEqual(response.data, {'id': str(self.admin.pk), 'is_staff': True})
+        self.assertEqual([q['sql'] for q in context.captured_queries if 'auth_user' in q['sql']], [])
+
+
+class WriteInvalidationTests(APITestCase):
+    '''
+    Cached list pages and 304s must never outlive a write, whatever path
+    the write takes.
+    '''
+    def setUp(self):
+        # Versions restart with every test, so would the cache keys.
+        caching.get_cache().clear()
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+
+    def assertChanged(self, path, read, write):
+        '''
+        GET ``path`` twice to fill the cache, run ``write``, then check that
+        neither the cache nor If-None-Match serve the old page and that
+        ``read`` returns something different from before.
+        '''
+        self.client.get(path)
+        before = self.client.get(path)
+        self.assertEqual(before['X-Cache'], 'HIT')
+        write()
+        after = self.client.get(path)
+        self.assertNotEqual(after.get('X-Cache'), 'HIT')
+        self.assertNotEqual(read(after.data), read(before.data))
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=before['ETag']).status_code, 200)
+        return after
+
+    def test_import(self):
+        deadline = (now().date() + timedelta(days=1)).isoformat()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('title,description,status,deadline,owner,categories\n')
+            f.write(f'Imported,From CSV,N,{deadline},owner,Imported category\n')
+        self.addCleanup(os.remove, f.name)
+        write = lambda: call_command('import_tasks', f.name, stdout=StringIO(), stderr=StringIO())
+
+        names = lambda data: [category['name'] for category in data['results']]
+        self.assertChanged('/categories/', names, write)
+        self.assertEqual(self.client.get('/tasks/').data['results'][0]['title'], 'Imported')
+
+    def test_model_signals(self):
+        deadline = now().date() + timedelta(days=1)
+        titles = lambda data: [task['title'] for task in data['results']]
+        create = lambda: Task.objects.create(title='Saved', description='', deadline=deadline, owner=self.user)
+        self.assertChanged('/tasks/', titles, create)
+        task = Task.objects.get()
+
+        def rename():
+            task.title = 'Renamed'
+            task.save()
+        self.assertChanged('/tasks/', titles, rename)
+        self.assertChanged('/tasks/', titles, task.delete)
+
+    def test_queryset_update(self):
+        deadline = now().date() + timedelta(days=1)
+        Task.objects.create(title='Task', description='', deadline=deadline, owner=self.user)
+        statuses = lambda data: [task['status'] for task in data['results']]
+        self.assertChanged('/tasks/', statuses, lambda: Task.objects.update(status='D'))
+
+        subtask_titles = lambda data: [subtask['title'] for subtask in data['results']]
+        create = lambda: SubTask.objects.create(title='Subtask', description='', task=Task.objects.get(),
+                                                deadline=deadline, owner=self.user)
+        self.assertChanged('/subtasks/', subtask_titles, create)
+        self.assertChanged('/subtasks/', subtask_titles, lambda: SubTask.objects.update(title='Updated'))
+
+    def test_category_soft_delete_list(self):
+        Category.objects.create(name='Kept')
+        Category.objects.create(name='Deleted')
+        names = lambda data: [category['name'] for category in data['results']]
+        soft_delete = lambda: Category.objects.filter(name='Deleted').soft_delete()
+        after = self.assertChanged('/categories/', names, soft_delete)
+        self.assertEqual(names(after.data), ['Kept'])
+
+    def test_task_bulk_upsert(self):
+        deadline = (now().date() + timedelta(days=1)).isoformat()
+        task = Task.objects.create(title='Existing', description='Old', deadline=deadline, owner=self.user)
+        items = [{'title': 'Existing', 'description': 'Updated', 'deadline': deadline},
+                 {'title': 'Created', 'description': 'New', 'deadline': deadline}]
+        write = lambda: self.client.post('/tasks/bulk/', items, format='json')
+
+        descriptions = lambda data: sorted(task['description'] for task in data['results'])
+        after = self.assertChanged('/tasks/', descriptions, write)
+        self.assertEqual(descriptions(after.data), ['New', 'Updated'])
+        self.assertNotModifiedUntil(f'/tasks/{task.pk}/', lambda: self.client.post('/tasks/bulk/', [
+            {'title': 'Existing', 'description': 'Again', 'deadline': deadline}], format='json'))
+
+    def test_subtask_bulk_upsert(self):
+        deadline = (now().date() + timedelta(days=1)).isoformat()
+        task = Task.objects.create(title='Task', description='', deadline=deadline, owner=self.user)
+        SubTask.objects.create(title='Existing', description='Old', task=task, deadline=deadline, owner=self.user)
+        items = [{'title': 'Existing', 'description': 'Updated', 'task': task.pk, 'deadline': deadline},
+                 {'title': 'Created', 'description': 'New', 'task': task.pk, 'deadline': deadline}]
+        write = lambda: self.client.post('/subtasks/bulk/', items, format='json')
+
+        descriptions = lambda data: sorted(subtask['description'] for subtask in data['results'])
+        after = self.assertChanged('/subtasks/', descriptions, write)
+        self.assertEqual(descriptions(after.data), ['New', 'Updated'])
+
+    def assertNotModifiedUntil(self, path, write):
+        '''
+        ``path`` answers If-None-Match with 304 until ``write`` runs.
+        '''
+        etag = self.client.get(path)['ETag']
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        write()
+        self.assertEqual(self.client.get(path, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def create_linked_task(self):
+        category = Category.objects.create(name='Linked')
+        task = Task.objects.create(title='Linked task', description='', deadline=now().date(), owner=self.user)
+        task.categories.add(category)
+        return task, category
+
+    def test_category_delete(self):
+        task, category = self.create_linked_task()
+        self.assertNotModifiedUntil(f'/tasks/{task.pk}/', category.delete)
+        self.assertEqual(self.client.get(f'/tasks/{task.pk}/').data['categories'], [])
+
+        def restore():
+            category.is_deleted = False
+            category.save()
+        self.assertNotModifiedUntil(f'/tasks/{task.pk}/', restore)
+        self.assertEqual(self.client.get(f'/tasks/{task.pk}/').data['categories'], [category.pk])
+
+    def test_category_soft_delete(self):
+        task, category = self.create_linked_task()
+        self.assertNotModifiedUntil('/tasks/my/', Category.objects.filter(pk=category.pk).soft_delete)
+
+    def test_category_rename(self):
+        task, category = self.create_linked_task()
+
+        def rename():
+            category.name = 'Renamed'
+            category.save()
+        # Plain task output only has the category ids, expanded output has the names.
+        self.assertNotModifiedUntil(f'/tasks/{task.pk}/?expand=categories', rename)
+        etag = self.client.get(f'/tasks/{task.pk}/')['ETag']
+        category.name = 'Renamed again'
+        category.save()
+        self.assertEqual(self.client.get(f'/tasks/{task.pk}/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def assertNoTaskRowWrites(self, write):
+        '''
+        ``write`` must not rewrite the task rows, however many are linked.
+        '''
+        category = Category.objects.get()
+        for i in range(3):
+            task = Task.objects.create(title=f'Task {i}', description='', deadline=now().date(), owner=self.user)
+            task.categories.add(category)
+        with CaptureQueriesContext(connection) as context:
+            write(category)
+        update = f'UPDATE "{Task._meta.db_table}"'
+        self.assertEqual([query['sql'] for query in context.captured_queries if update in query['sql']], [])
+
+    def test_category_save_leaves_task_rows_alone(self):
+        self.create_linked_task()
+
+        def write(category):
+            category.name = 'Renamed'
+            category.save()
+            category.delete()
+            category.is_deleted = False
+            category.save()
+        self.assertNoTaskRowWrites(write)
+
+    def test_category_soft_delete_leaves_task_rows_alone(self):
+        self.create_linked_task()
+        self.assertNoTaskRowWrites(lambda category: Category.objects.filter(pk=category.pk).soft_delete())
+
+
+class ConditionalUpdateTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        deadline = now().date() + timedelta(days=1)
+        self.task = Task.objects.create(title='Task', description='', deadline=deadline, owner=self.user)
+        self.other = Task.objects.create(title='Other task', description='', deadline=deadline, owner=self.user)
+
+    def patch(self, etag, title, task=None):
+        task = task or self.task
+        # unique_for_date needs the deadline alongside the title.
+        data = {'title': title, 'deadline': task.deadline.isoformat()}
+        return self.client.patch(f'/tasks/{task.pk}/', data, format='json', HTTP_IF_MATCH=etag)
+
+    def test_if_match(self):
+        etag = self.client.get(f'/tasks/{self.task.pk}/')['ETag']
+        response = self.patch(etag, 'First')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(self.patch(etag, 'Second').status_code, 412)
+        self.assertEqual(self.patch(response['ETag'], 'Second').status_code, 200)
+
+    def test_other_tasks_of_the_owner_keep_the_etag(self):
+        etag = self.client.get(f'/tasks/{self.task.pk}/')['ETag']
+        self.assertEqual(self.patch('*', 'Changed', task=self.other).status_code, 200)
+        Task.objects.filter(pk=self.other.pk).update(status='D')
+        self.assertEqual(self.patch(etag, 'First').status_code, 200)
+
+
+    def test_subtask_if_match(self):
+        subtask = SubTask.objects.create(title='Subtask', description='', task=self.task, owner=self.user,
+                                         deadline=self.task.deadline)
+        url = f'/subtasks/{subtask.pk}/'
+        etag = self.client.get(url)['ETag']
+        SubTask.objects.filter(pk=subtask.pk).update(status='D')
+        response = self.client.patch(url, {'description': 'Changed'}, format='json', HTTP_IF_MATCH=etag)
+        self.assertEqual(response.status_code, 412)
+        response = self.client.patch(url, {'description': 'Changed'}, format='json',
+                                     HTTP_IF_MATCH=self.client.get(url)['ETag'])
+        self.assertEqual(response.status_code, 200)
+
+    def test_not_modified(self):
+        response = self.client.get(f'/tasks/{self.task.pk}/')
+        for header, value in [('HTTP_IF_NONE_MATCH', response['ETag']),
+                              ('HTTP_IF_MODIFIED_SINCE', response['Last-Modified'])]:
+            self.assertEqual(self.client.get(f'/tasks/{self.task.pk}/', **{header: value}).status_code, 304)
+        self.assertEqual(self.client.get('/tasks/999999/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 404)
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class CursorPaginationTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        deadline = now().date() + timedelta(days=1)
+        cls.tasks = [Task.objects.create(title=f'Task {i}', description='', deadline=deadline, owner=cls.user)
+                     for i in range(7)]
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link):
+        '''
+        Follow ``link`` from ``url`` to the end, return the pages' ids and the
+        last response.
+        '''
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([task['id'] for task in response.data['results']])
+            url = response.data[link]
+        return pages, response
+
+    def assertRoundTrip(self, query, expected):
+        forward, last = self.walk(f'/tasks/?page_size=3&{query}', 'next')
+        self.assertEqual(forward, [expected[:3], expected[3:6], expected[6:]])
+        backward, first = self.walk(last.data['previous'], 'previous')
+        self.assertEqual(backward, forward[-2::-1])
+        self.assertIsNotNone(first.data['next'])
+
+    def test_newest_first(self):
+        self.assertRoundTrip('', [task.pk for task in reversed(self.tasks)])
+
+    def test_oldest_first(self):
+        self.assertRoundTrip('ordering=created_at', [task.pk for task in self.tasks])
+
+    def test_malformed_cursor(self):
+        for cursor in ['not base64!', b64encode(b'not json').decode(), b64encode(b'{"r": 1}').decode()]:
+            self.assertEqual(self.client.get('/tasks/', {'cursor': cursor}).status_code, 404)
+
+    def test_tampered_cursor(self):
+        for position in [['garbage', 'x'], [None, 1], ['2026-01-01T00:00:00', 1, 2]]:
+            cursor = b64encode(json.dumps({'p': position}).encode()).decode()
+            self.assertEqual(self.client.get('/tasks/', {'cursor': cursor}).status_code, 404)
+
+
+class UnreachableEmailBackend(BaseEmailBackend):
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+    def send_messages(self, messages):
+        self.open()
+
+
+class OutboxTests(APITestCase):
+    def setUp(self):
+        self.emails = [outbox.enqueue_email('Subject', 'Body', f'user{i}@example.com') for i in range(2)]
+
+    def send(self):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('send_outbox_emails', '--once', stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    @override_settings(EMAIL_BACKEND='task_manager.tests.UnreachableEmailBackend')
+    def test_unreachable_mail_server(self):
+        _, stderr = self.send()
+        self.assertIn('Connection refused', stderr)
+        for email in OutboxEmail.objects.all():
+            # Released with a backoff, no attempt used up.
+            self.assertEqual(email.attempts, 0)
+            self.assertIsNone(email.sent_at)
+            self.assertGreater(email.next_attempt_at, now())
+            self.assertEqual(email.last_error, 'Connection refused')
+
+        OutboxEmail.objects.update(next_attempt_at=now())
+        with self.settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend'):
+            stdout, _ = self.send()
+        self.assertIn('Sent 2, failed 0', stdout)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertFalse(OutboxEmail.objects.filter(sent_at=None).exists())
+
+
+class CounterAssertions:
+    '''
+    assertCountersRebuilt() for the incrementally maintained statistics
+    counters: whatever path a write took, the counters must match a rebuild
+    from the task table.
+    '''
+    counter_models = (TaskStatusCounter, TaskOwnerCounter, TaskDeadlineCounter)
+
+    def counter_rows(self):
+        rows = {}
+        for model in self.counter_models:
+            fields = [f.attname for f in model._meta.concrete_fields if not f.primary_key]
+            # Rows that dropped to zero are kept, a rebuild doesn't create them.
+            rows[model.__name__] = sorted(model.objects.exclude(count=0).values_list(*fields))
+        return rows
+
+    def assertCountersRebuilt(self):
+        incremental = self.counter_rows()
+        counters.rebuild()
+        self.assertEqual(incremental, self.counter_rows())
+
+
+class CounterTests(CounterAssertions, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.other = User.objects.create_user('other', 'other@example.com', 'password')
+        self.deadline = now().date() + timedelta(days=1)
+
+    def create(self, title, status='N', days=1):
+        return Task.objects.create(title=title, description='', status=status, owner=self.user,
+                                   deadline=now().date() + timedelta(days=days))
+
+    def test_save(self):
+        task = self.create('Task')
+        self.assertCountersRebuilt()
+        task.status, task.deadline = 'IP', task.deadline - timedelta(days=3)
+        task.save()
+        self.assertCountersRebuilt()
+        task.owner, task.status = self.other, 'D'
+        task.save(update_fields=['owner', 'status'])
+        self.assertCountersRebuilt()
+
+    def test_update(self):
+        tasks = [self.create(f'Task {i}', status=status) for i, status in enumerate(['N', 'N', 'D'])]
+        Task.objects.filter(status='N').update(status='B')
+        self.assertCountersRebuilt()
+        Task.objects.filter(pk=tasks[0].pk).update(owner=self.other, deadline=now().date() - timedelta(days=2))
+        self.assertCountersRebuilt()
+        Task.objects.update(deadline=F('deadline') + timedelta(days=7))
+        self.assertCountersRebuilt()
+
+    def test_bulk(self):
+        Task.objects.bulk_create([Task(title=f'Task {i}', description='', status=['N', 'IP'][i % 2],
+                                       owner=self.user, deadline=self.deadline) for i in range(4)])
+        self.assertCountersRebuilt()
+        tasks = list(Task.objects.all())
+        for task in tasks:
+            task.status = 'D'
+        Task.objects.bulk_update(tasks[:2], ['status'])
+        self.assertCountersRebuilt()
+
+        self.client.force_authenticate(self.user)
+        items = [{'title': title, 'description': 'Bulk', 'deadline': self.deadline.isoformat(), 'status': status}
+                 for title, status in [('Task 0', 'P'), ('Bulk', 'B')]]
+        self.assertEqual(self.client.post('/tasks/bulk/', items, format='json').data['failed'], 0)
+        self.assertCountersRebuilt()
+
+    def test_delete(self):
+        tasks = [self.create(f'Task {i}', status=status, days=i - 1) for i, status in enumerate(['N', 'IP', 'D'])]
+        tasks[0].delete()
+        self.assertCountersRebuilt()
+        Task.objects.filter(pk__in=[task.pk for task in tasks[1:]]).delete()
+        self.assertCountersRebuilt()
+        self.assertEqual(self.counter_rows(), {model.__name__: [] for model in self.counter_models})
+
+
+@override_settings(CATEGORY_TASK_COUNTS_DENORMALIZED=True)
+class ImportTests(CounterAssertions, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.deadline = (now().date() + timedelta(days=1)).isoformat()
+        self.category = Category.objects.create(name='Existing')
+        Task.objects.create(title='Before', description='', deadline=self.deadline, owner=self.user)
+
+    def write_csv(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as f:
+            f.write('title,description,status,deadline,owner,categories\n')
+            f.writelines(f'{row}\n' for row in rows)
+        self.addCleanup(os.remove, f.name)
+        return f.name
+
+    def import_tasks(self, path):
+        call_command('import_tasks', path, '--batch-size', '2', stdout=StringIO(), stderr=StringIO())
+
+    def category_counts(self):
+        return dict(Category.all_objects.values_list('name', 'task_count'))
+
+    def test_counters_and_category_counts(self):
+        path = self.write_csv([
+            f'First,,N,{self.deadline},owner,Existing|Imported',
+            f'Second,,IP,{self.deadline},owner,Imported',
+            f'Third,,D,{self.deadline},owner,',
+        ])
+        self.import_tasks(path)
+        self.assertCountersRebuilt()
+        counts = self.category_counts()
+        counters.rebuild_category_counts()
+        self.assertEqual(counts, self.category_counts())
+        self.assertEqual(counts, {'Existing': 1, 'Imported': 2})
+
+        # Existing (title, deadline) pairs are skipped on a second run.
+        self.import_tasks(path)
+        self.assertEqual(Task.objects.count(), 4)
+        self.assertEqual(self.category_counts(), counts)
+
+    def test_invalidates_my_tasks(self):
+        etag = self.client.get('/tasks/my/')['ETag']
+        self.import_tasks(self.write_csv([f'Imported,,N,{self.deadline},owner,']))
+        response = self.client.get('/tasks/my/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 2)
+
+
+class RefreshBlacklistTests(APITestCase):
+    def setUp(self):
+        User.objects.create_user('owner', 'owner@example.com', 'password')
+        # The filter lives as long as the process, start from this test's rows.
+        blacklist_filter.rebuild()
+        self.tokens = self.client.post('/api/token/', {'username': 'owner', 'password': 'password'}).data
+
+    def refresh(self, token):
+        return self.client.post('/api/token/refresh/', {'refresh': token})
+
+    def test_logout(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.tokens['access']}")
+        self.assertEqual(self.client.post('/auth/logout/', {'refresh': self.tokens['refresh']}).status_code, 205)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+    def test_rotated_token(self):
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+    def test_blacklisted_by_another_process(self):
+        # bulk_create sends no post_save, like a blacklist write of another
+        # worker: the filter only learns about it from its periodic sync.
+        jti = RefreshToken(self.tokens['refresh'])['jti']
+        BlacklistedToken.objects.bulk_create([BlacklistedToken(token=OutstandingToken.objects.get(jti=jti))])
+        with mock.patch.object(blacklist_filter, 'sync_interval', 0):
+            self.assertEqual(self.refresh(self.tokens['refresh']).status_code, 401)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f'jti-{i}' for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        self.assertTrue(all(item in bloom for item in items))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SearchTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.deadline = (now().date() + timedelta(days=1)).isoformat()
+
+    def search(self, text, path='/tasks/'):
+        response = self.client.get(path, {'search': text})
+        self.assertEqual(response.status_code, 200)
+        return [row['title'] for row in response.data['results']]
+
+    def test_created_task_is_found(self):
+        category = Category.objects.create(name='Billing')
+        response = self.client.post('/tasks/', {'title': 'Quarterly invoice', 'description': 'Send it',
+                                                'deadline': self.deadline, 'categories': [category.pk]},
+                                    format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.search('invoice'), ['Quarterly invoice'])
+
+    def create(self, title, description=''):
+        return Task.objects.create(title=title, description=description, deadline=self.deadline, owner=self.user)
+
+    def test_updates_and_deletes_reach_the_index(self):
+        task = self.create('Draft budget')
+        self.assertEqual(self.search('budget'), ['Draft budget'])
+
+        response = self.client.patch(f'/tasks/{task.pk}/', {'title': 'Draft roadmap', 'deadline': self.deadline},
+                                     format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.search('budget'), [])
+        self.assertEqual(self.search('roadmap'), ['Draft roadmap'])
+
+        self.assertEqual(self.client.delete(f'/tasks/{task.pk}/').status_code, 204)
+        self.assertEqual(self.search('roadmap'), [])
+
+    def test_subtasks(self):
+        task = self.create('Parent')
+        subtask = SubTask.objects.create(title='Rotate keys', description='', task=task, deadline=self.deadline,
+                                         owner=self.user)
+        self.assertEqual(self.search('rotate', '/subtasks/'), ['Rotate keys'])
+        SubTask.objects.filter(pk=subtask.pk).update(title='Renew certificates')
+        self.assertEqual(self.search('rotate', '/subtasks/'), [])
+
+    def test_rank_order(self):
+        # Created best match first, so the default newest-first order would reverse them.
+        self.create('Audit', 'audit the audit log')
+        self.create('Audit report', 'yearly numbers for the board')
+        self.create('Quarterly review', 'prepare slides, then the audit of every account in the region')
+        self.assertEqual(self.search('audit'), ['Audit', 'Audit report', 'Quarterly review'])
+
+
+class SearchIndexCheckTests(TransactionTestCase):
+    # The schema editor can't run inside the transaction of a TestCase on SQLite.
+    def test_missing_triggers_fail_the_check(self):
+        self.assertEqual(check_search_index(databases=['default']), [])
+        with connection.cursor() as cursor:
+            cursor.execute('DROP TRIGGER task_manager_task_fts_au')
+        # Put it back for the other tests even if an assertion fails.
+        self.addCleanup(call_command, 'install_search_index', stdout=StringIO())
+        errors = check_search_index(databases=['default'])
+        self.assertEqual([error.id for error in errors], ['task_manager.E001'])
+        self.assertIn('task_manager_task_fts_au', errors[0].msg)
+
+        call_command('install_search_index', stdout=StringIO())
+        self.assertEqual(check_search_index(databases=['default']), [])
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class ExportTests(APITestCase):
+    fields = ['id', 'title', 'description', 'status', 'deadline', 'owner']
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        deadline = now().date() + timedelta(days=1)
+        # Commas, quotes, newlines and non-ASCII text must survive both encodings.
+        descriptions = ['plain', 'with, comma', 'with "quotes"', 'two\nlines', 'Отчёт']
+        Task.objects.bulk_create([
+            Task(title=f'Task {i}', description=description, status=['N', 'D'][i % 2], deadline=deadline,
+                 owner=cls.user)
+            for i, description in enumerate(descriptions * 3)
+        ])
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def list_rows(self, query):
+        rows, url = [], f'/tasks/?page_size=100&{query}'
+        while url:
+            response = self.client.get(url)
+            rows += [{field: str(row[field]) for field in self.fields} for row in response.data['results']]
+            url = response.data['next']
+        return rows
+
+    def assertRowsEqual(self, exported, listed):
+        # Rows created in the same microsecond may come in either order.
+        key = lambda row: int(row['id'])
+        self.assertEqual(len(listed), len(set(map(key, listed))))
+        self.assertEqual(sorted(exported, key=key), sorted(listed, key=key))
+
+    def export(self, output, query):
+        response = self.client.get(f'/tasks/export/?output={output}&{query}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_csv(self):
+        for query in ['', 'status=D']:
+            rows = list(csv.DictReader(StringIO(self.export('csv', query), newline='')))
+            self.assertRowsEqual([{field: row[field] for field in self.fields} for row in rows], self.list_rows(query))
+
+    def test_ndjson(self):
+        for query in ['', 'status=D']:
+            rows = [json.loads(line) for line in self.export('ndjson', query).splitlines()]
+            self.assertRowsEqual([{field: str(row[field]) for field in self.fields} for row in rows],
+                                 self.list_rows(query))
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class WeekdayFilterTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        today = now().date()
+        self.tasks = [Task.objects.create(title=f'Task {i}', description='', deadline=today + timedelta(days=i),
+                                          owner=self.user) for i in range(1, 15)]
+
+    def weekday_ids(self, weekday):
+        response = self.client.get('/tasks/', {'weekday': weekday, 'page_size': 100})
+        self.assertEqual(response.status_code, 200)
+        return sorted(task['id'] for task in response.data['results'])
+
+    def on(self, weekday):
+        return sorted(task.pk for task in Task.objects.all() if task.deadline.weekday() == weekday)
+
+    def test_only_that_weekday(self):
+        self.assertEqual(len(self.on(0)), 2)
+        self.assertEqual(self.weekday_ids('Monday'), self.on(0))
+        self.assertEqual(self.weekday_ids('воскресенье'), self.on(6))
+        self.assertEqual(self.client.get('/tasks/', {'weekday': 'Someday'}).status_code, 400)
+
+    def test_deadline_updates_move_the_task(self):
+        task = next(task for task in self.tasks if task.deadline.weekday() == 0)
+        # unique_for_date needs the title alongside the deadline.
+        data = {'title': task.title, 'deadline': (task.deadline + timedelta(days=1)).isoformat()}
+        response = self.client.patch(f'/tasks/{task.pk}/', data, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(task.pk, self.weekday_ids('Monday'))
+        self.assertIn(task.pk, self.weekday_ids('Tuesday'))
+
+        Task.objects.filter(pk=task.pk).update(deadline=F('deadline') + timedelta(days=1))
+        self.assertEqual(self.weekday_ids('Wednesday'), self.on(2))
+        self.assertIn(task.pk, self.on(2))
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class CategoryCountsTests(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        self.client.force_authenticate(self.user)
+        self.categories = [Category.objects.create(name=name) for name in ('Home', 'Work', 'Travel')]
+        deadline = now().date() + timedelta(days=1)
+        for i in range(6):
+            task = Task.objects.create(title=f'Task {i}', description='', status=['N', 'D', 'B'][i % 3],
+                                       deadline=deadline, owner=self.user)
+            task.categories.set(self.categories[:i % 3 + 1])
+
+    def write(self):
+        Task.objects.get(title='Task 5').delete()
+        Task.objects.get(title='Task 4').categories.remove(self.categories[0])
+        Category.objects.filter(pk=self.categories[2].pk).soft_delete()
+
+    def assertCountsMatchLinks(self, with_status):
+        response = self.client.get('/categories/', {'with_counts': '1'})
+        self.assertEqual(response.status_code, 200)
+        links = Task.categories.through.objects
+        self.assertEqual([category['name'] for category in response.data['results']], ['Home', 'Work'])
+        for category in response.data['results']:
+            self.assertEqual(category['task_count'], links.filter(category_id=category['id']).count())
+            if with_status:
+                expected = {key: links.filter(category_id=category['id'], task__status=key).count()
+                            for key, _ in STATUS_CHOICES}
+                self.assertEqual(category['status_counts'], expected)
+
+    def test_grouped_counts(self):
+        self.write()
+        self.assertCountsMatchLinks(with_status=True)
+
+    @override_settings(CATEGORY_TASK_COUNTS_DENORMALIZED=True)
+    def test_denormalized_counts(self):
+        # signals.py only connects these at startup when the setting is on.
+        for signal, receiver, sender in [(m2m_changed, signals.count_category_links, Task.categories.through),
+                                         (pre_delete, signals.remember_task_categories, Task),
+                                         (post_delete, signals.uncount_task_categories, Task)]:
+            signal.connect(receiver, sender=sender)
+            self.addCleanup(signal.disconnect, receiver, sender=sender)
+        # Enabled after the links were made, as the README says.
+        call_command('reconcile_task_statistics', stdout=StringIO())
+        self.write()
+        self.assertCountsMatchLinks(with_status=False)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class SparseFieldsTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password')
+        deadline = now().date() + timedelta(days=1)
+        cls.category = Category.objects.create(name='Home')
+        cls.task = Task.objects.create(title='Task', description='Full', deadline=deadline, owner=cls.user)
+        cls.task.categories.add(cls.category)
+        SubTask.objects.create(title='Subtask', description='', task=cls.task, deadline=deadline, owner=cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(self.user)
+
+    def assertSparse(self, path, fields):
+        full = self.client.get(path)
+        sparse = self.client.get(path, {'fields': ','.join(fields)})
+        self.assertEqual(sparse.status_code, 200, path)
+        full_items = full.data.get('results', [full.data])
+        sparse_items = sparse.data.get('results', [sparse.data])
+        self.assertTrue(sparse_items)
+        self.assertEqual(sparse_items, [{field: item[field] for field in fields} for item in full_items])
+
+    def test_only_requested_fields(self):
+        self.assertSparse('/tasks/', ['id', 'title', 'status'])
+        self.assertSparse('/tasks/my/', ['deadline', 'categories'])
+        self.assertSparse(f'/tasks/{self.task.pk}/', ['id', 'description', 'categories'])
+        self.assertSparse('/subtasks/', ['id', 'task', 'status'])
+
+    def test_with_expansion(self):
+        response = self.client.get('/tasks/', {'fields': 'id,owner', 'expand': 'owner,subtasks'})
+        self.assertEqual(response.data['results'], [{'id': self.task.pk,
+                                                     'owner': {'id': self.user.pk, 'username': 'owner'}}])
+
+    def test_unknown_field(self):
+        for path in ('/tasks/', f'/tasks/{self.task.pk}/', '/subtasks/'):
+            response = self.client.get(path, {'fields': 'id,password'})
+            self.assertEqual(response.status_code, 400, path)
+            self.assertIn('fields', response.data)
+
+
+@override_settings(RESPONSE_CACHE_TIMEOUT=0)
+class AsyncViewTests(APITestCase):
+    '''
+    The async GET views must answer exactly like the sync views they
+    replace (see async_views.py).
+    '''
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('owner', 'owner@example.com', 'password', is_staff=True)
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        cls.category = Category.objects.create(name='Home')
+        today = now().date()
+        for i in range(5):
+            task = Task.objects.create(title=f'Report {i}', description=f'Quarterly audit {i}', status=['N', 'D'][i % 2],
+                                       deadline=today + timedelta(days=i - 1), owner=[cls.user, other][i % 2])
+            task.categories.add(cls.category)
+            SubTask.objects.create(title=f'Subtask {i}', description='', task=task, deadline=task.deadline,
+                                   owner=task.owner)
+        cls.task = Task.objects.first()
+        cls.subtask = SubTask.objects.first()
+
+    def get(self, view, path, params=None, **kwargs):
+        request = APIRequestFactory().get(path, params or {}, **kwargs.pop('headers', {}))
+        force_authenticate(request, self.user)
+        return view(request, **kwargs)
+
+    async def assertSameResponse(self, sync_view, async_view, path, params=None, **kwargs):
+        expected = await sync_to_async(self.get)(sync_view.as_view(), path, params, **kwargs)
+        response = await self.get(async_view.as_view(), path, params, **kwargs)
+        self.assertEqual(response.status_code, expected.status_code, (path, params))
+        self.assertEqual(getattr(response, 'data', None), getattr(expected, 'data', None), (path, params))
+        self.assertEqual(response.get('ETag'), expected.get('ETag'), (path, params))
+        return response
+
+    async def test_lists(self):
+        response = await self.assertSameResponse(TaskListCreateAPIView, AsyncTaskListAPIView, '/tasks/')
+        self.assertEqual(len(response.data['results']), 5)
+        for params in [None, {'status': 'N'}, {'weekday': 'Monday'}, {'search': 'audit'}, {'page_size': 2},
+                       {'expand': 'subtasks,categories,owner'}, {'fields': 'id,title'}, {'expand': 'nothing'}]:
+            await self.assertSameResponse(TaskListCreateAPIView, AsyncTaskListAPIView, '/tasks/', params)
+            await self.assertSameResponse(MyTasksAPIView, AsyncMyTasksAPIView, '/tasks/my/', params)
+        for params in [None, {'expand': 'task,owner'}, {'fields': 'id,task'}]:
+            await self.assertSameResponse(SubTaskListCreateAPIView, AsyncSubTaskListAPIView, '/subtasks/', params)
+            await self.assertSameResponse(MySubTasksAPIView, AsyncMySubTasksAPIView, '/subtasks/my/', params)
+
+    async def test_details(self):
+        for pk in (self.task.pk, 999999):
+            for params in [None, {'expand': 'categories'}]:
+                await self.assertSameResponse(TaskRetrieveUpdateDestroyAPIView, AsyncTaskRetrieveAPIView,
+                                              f'/tasks/{pk}/', params, pk=pk)
+        await self.assertSameResponse(SubTaskRetrieveUpdateDestroyAPIView, AsyncSubTaskRetrieveAPIView,
+                                      f'/subtasks/{self.subtask.pk}/', pk=self.subtask.pk)
+
+    async def test_not_modified(self):
+        response = await self.assertSameResponse(TaskRetrieveUpdateDestroyAPIView, AsyncTaskRetrieveAPIView,
+                                                 f'/tasks/{self.task.pk}/', pk=self.task.pk)
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        response = await self.assertSameResponse(TaskRetrieveUpdateDestroyAPIView, AsyncTaskRetrieveAPIView,
+                                                 f'/tasks/{self.task.pk}/', pk=self.task.pk, headers=headers)
+        self.assertEqual(response.status_code, 304)
+
+    async def test_statistics(self):
+        for params in [None, {'owner': self.user.pk}]:
+            expected = await sync_to_async(self.get)(task_statistics, '/tasks/statistics/', params)
+            response = await self.get(AsyncTaskStatisticsAPIView.as_view(), '/tasks/statistics/', params)
+            self.assertEqual(response.data, expected.data)
+
+
+class SeedTests(CounterAssertions, APITestCase):
+    options = ['--seed', '7', '--users', '6', '--tasks', '120', '--categories', '20', '--batch-size', '50',
+               '--max-subtasks', '5', '--password', 'seeded']
+
+    def seed(self):
+        call_command('seed', *self.options, stdout=StringIO())
+
+    def snapshot(self):
+        # Category ids aren't reused after a delete, compare names.
+        categories = dict(Category.all_objects.values_list('pk', 'name'))
+        links = {}
+        for task_id, category_id in Task.categories.through.objects.values_list('task_id', 'category_id'):
+            links.setdefault(task_id, []).append(categories[category_id])
+        tasks = [(*row, sorted(links.get(row[0], []))) for row in
+                 Task.objects.order_by('pk').values_list('pk', 'title', 'description', 'status', 'deadline',
+                                                         'owner__username')]
+        subtasks = list(SubTask.objects.order_by('pk').values_list('pk', 'title', 'task_id', 'status', 'deadline',
+                                                                   'owner_id'))
+        return tasks, subtasks, sorted(categories.values())
+
+    def test_deterministic_dataset(self):
+        self.seed()
+        self.assertEqual((User.objects.count(), Task.objects.count(), Category.objects.count()), (6, 120, 20))
+        self.assertTrue(Task.categories.through.objects.exists())
+        self.assertTrue(SubTask.objects.exists())
+        # Every task's subtasks belong to its owner, links fit the cap.
+        self.assertFalse(SubTask.objects.exclude(owner_id=F('task__owner_id')).exists())
+        self.assertLessEqual(max(SubTask.objects.values('task').annotate(n=Count('pk')).values_list('n', flat=True)), 5)
+        self.assertCountersRebuilt()
+        self.assertTrue(User.objects.order_by('?').first().check_password('seeded'))
+
+        first = self.snapshot()
+        Task.objects.all().delete()
+        Category.all_objects.all().delete()
+        User.objects.all().delete()
+        self.seed()
+        self.assertEqual(self.snapshot(), first)
+
+    def test_ids_continue_after_the_seed(self):
+        self.seed()
+        user = User.objects.get(username='seed-user-1')
+        self.client.force_authenticate(user)
+        category = Category.objects.first()
+        response = self.client.post('/tasks/', {'title': 'After the seed', 'description': 'New',
+                                                'deadline': (now().date() + timedelta(days=1)).isoformat(),
+                                                'categories': [category.pk]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(response.data['id'], 120)
@@ -1,8 +1,11 @@
 
 from rest_framework.routers import DefaultRouter
+from django.conf import settings
 from django.urls import path
 from task_manager.views import (
     task_statistics,
+    cache_statistics,
+    request_metrics,
     TaskRetrieveUpdateDestroyAPIView,
     TaskListCreateAPIView,
     SubTaskListCreateAPIView,
@@ -10,22 +13,60 @@ from task_manager.views import (
     CategoryViewSet,
     MyTasksAPIView,
     MySubTasksAPIView,
+    TaskBulkUpsertAPIView,
+    SubTaskBulkUpsertAPIView,
+    TaskExportAPIView,
+    SubTaskExportAPIView,
 )
 from rest_framework_simplejwt.views import (TokenObtainPairView, TokenRefreshView)
 
 
+task_list_view = TaskListCreateAPIView.as_view()
+task_detail_view = TaskRetrieveUpdateDestroyAPIView.as_view()
+task_statistics_view = task_statistics
+subtask_list_view = SubTaskListCreateAPIView.as_view()
+subtask_detail_view = SubTaskRetrieveUpdateDestroyAPIView.as_view()
+my_tasks_view = MyTasksAPIView.as_view()
+my_subtasks_view = MySubTasksAPIView.as_view()
+
+if settings.ASYNC_VIEWS:
+    from task_manager.async_views import (
+        split_by_method,
+        AsyncTaskListAPIView,
+        AsyncTaskRetrieveAPIView,
+        AsyncTaskStatisticsAPIView,
+        AsyncSubTaskListAPIView,
+        AsyncSubTaskRetrieveAPIView,
+        AsyncMyTasksAPIView,
+        AsyncMySubTasksAPIView,
+    )
+    task_list_view = split_by_method(task_list_view, AsyncTaskListAPIView.as_view())
+    task_detail_view = split_by_method(task_detail_view, AsyncTaskRetrieveAPIView.as_view())
+    task_statistics_view = split_by_method(task_statistics, AsyncTaskStatisticsAPIView.as_view())
+    subtask_list_view = split_by_method(subtask_list_view, AsyncSubTaskListAPIView.as_view())
+    subtask_detail_view = split_by_method(subtask_detail_view, AsyncSubTaskRetrieveAPIView.as_view())
+    my_tasks_view = split_by_method(my_tasks_view, AsyncMyTasksAPIView.as_view())
+    my_subtasks_view = split_by_method(my_subtasks_view, AsyncMySubTasksAPIView.as_view())
+
+
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, basename='category')
 
 urlpatterns = router.urls + [
-    path('tasks/', TaskListCreateAPIView.as_view(), name='task-list-create'),
+    path('tasks/', task_list_view, name='task-list-create'),
     #path('tasks/', TaskListView.as_view(), name='task-list'),
-    path('tasks/<int:pk>/', TaskRetrieveUpdateDestroyAPIView.as_view(), name='task-detail'),
-    path('tasks/statistics/', task_statistics, name='task-statistics'),
-    path('subtasks/', SubTaskListCreateAPIView.as_view(), name='subtask-list-create'),
-    path('subtasks/<int:pk>/', SubTaskRetrieveUpdateDestroyAPIView.as_view(), name='subtask-detail'),
+    path('tasks/<int:pk>/', task_detail_view, name='task-detail'),
+    path('tasks/statistics/', task_statistics_view, name='task-statistics'),
+    path('cache/statistics/', cache_statistics, name='cache-statistics'),
+    path('metrics/', request_metrics, name='request-metrics'),
+    path('tasks/bulk/', TaskBulkUpsertAPIView.as_view(), name='task-bulk-upsert'),
+    path('tasks/export/', TaskExportAPIView.as_view(), name='task-export'),
+    path('subtasks/', subtask_list_view, name='subtask-list-create'),
+    path('subtasks/<int:pk>/', subtask_detail_view, name='subtask-detail'),
+    path('subtasks/bulk/', SubTaskBulkUpsertAPIView.as_view(), name='subtask-bulk-upsert'),
+    path('subtasks/export/', SubTaskExportAPIView.as_view(), name='subtask-export'),
     path('api/token/', TokenObtainPairView.as_view(), name='api-token-auth'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='api-token-refresh'),
-    path('tasks/my/', MyTasksAPIView.as_view(), name='my-tasks'),
-    path('subtasks/my/', MySubTasksAPIView.as_view(), name='my-sub-tasks'),
+    path('tasks/my/', my_tasks_view, name='my-tasks'),
+    path('subtasks/my/', my_subtasks_view, name='my-sub-tasks'),
 ]
\ No newline at end of file
@@ -0,0 +1,60 @@
+from django.db.models import F
+from django.utils.timezone import now
+
+from .models import ResourceVersion
+
+
+def owner_key(scope, owner_id):
+    return f'{scope}:owner:{owner_id}'
+
+
+def bump(keys):
+    keys = set(keys)
+    if not keys:
+        return
+    timestamp = now()
+    versions = ResourceVersion.objects.filter(key__in=keys)
+    if versions.update(version=F('version') + 1, updated_at=timestamp) == len(keys):
+        return
+
+    missing = keys - set(versions.values_list('key', flat=True))
+    # Insert at 0 and bump again, so a concurrent insert of the same key
+    # still counts both writes.
+    ResourceVersion.objects.bulk_create(
+        [ResourceVersion(key=key, version=0, updated_at=timestamp) for key in missing],
+        ignore_conflicts=True,
+    )
+    ResourceVersion.objects.filter(key__in=missing).update(version=F('version') + 1, updated_at=timestamp)
+
+
+def owner_keys(scope, owner_ids):
+    return [scope, *(owner_key(scope, owner_id) for owner_id in owner_ids)]
+
+
+def bump_owners(scope, owner_ids):
+    '''
+    Bump a collection and the per-owner versions of ``owner_ids`` in it.
+    '''
+    bump(owner_keys(scope, owner_ids))
+
+
+def get_state(keys, for_update=False):
+    '''
+    Return (versions in the order of ``keys``, latest update time) for a set
+    of version keys. Keys that were never bumped have version 0.
+    '''
+    queryset = ResourceVersion.objects.filter(key__in=keys)
+    if for_update:
+        queryset = queryset.select_for_update()
+    return _state(keys, queryset.values_list('key', 'version', 'updated_at'))
+
+
+async def aget_state(keys):
+    rows = ResourceVersion.objects.filter(key__in=keys).values_list('key', 'version', 'updated_at')
+    return _state(keys, [row async for row in rows])
+
+
+def _state(keys, rows):
+    rows = {key: (version, updated_at) for key, version, updated_at in rows}
+    last_modified = max((updated_at for _, updated_at in rows.values()), default=None)
+    return tuple(rows.get(key, (0, None))[0] for key in keys), last_modified
@@ -1,11 +1,20 @@
-from django.db.models.functions import ExtractWeekDay
 from rest_framework.decorators import api_view, action, permission_classes
 from rest_framework.response import  Response
 from rest_framework import filters, status, permissions
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from .serializers import *
-from django.utils.timezone import now
-from rest_framework.generics import  ListCreateAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView
+from . import caching, counters, instrumentation
+from .search import FullTextSearchFilter
+from .exports import EXPORT_FORMATS
+from .conditional import ConditionalGetMixin
+from .expand import ExpandMixin, TASK_EXPANSIONS, SUBTASK_EXPANSIONS
+from .sparse import SparseFieldsMixin
+from .instrumentation import SerializerTimingMixin
+from .blacklist import FilteredRefreshToken
+from django.conf import settings
+from django.db.models import Count, Q
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework.generics import  ListCreateAPIView, RetrieveUpdateDestroyAPIView, CreateAPIView, GenericAPIView
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.exceptions import ValidationError
 from rest_framework.viewsets import ModelViewSet
@@ -13,26 +22,43 @@ from .permissions import ReadOnlyOrAuthenticated, IsOwnerOrAdminOrReadOnly
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, AllowAny
 from django.contrib.auth.models import User
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import TokenError
 
 
-class TaskListCreateAPIView(ListCreateAPIView):
+# Weekday names accepted by ?weekday=, numbered like ExtractWeekDay (Sunday = 1).
+WEEKDAYS = {
+    'Monday': 2, 'Понедельник': 2,
+    'Tuesday': 3, 'Вторник': 3,
+    'Wednesday': 4, 'Среда': 4,
+    'Thursday': 5, 'Четверг': 5,
+    'Friday': 6, 'Пятница': 6,
+    'Saturday': 7, 'Суббота': 7,
+    'Sunday': 1, 'Воскресенье': 1,
+}
+
+
+class TaskListCreateAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, ListCreateAPIView):
     """
     get:
     Return a list of tasks with optional filters:
     - ?status=<status_value>
     - ?deadline=<YYYY-MM-DD>
-    - ?search=<text> (matches title and description)
+    - ?search=<text> (full-text match on title and description, ranked by relevance)
     - ?ordering=created_at or -created_at
     - ?weekday=<Weekday name> (English or Russian, e.g. 'Monday' or 'Понедельник')
+    - ?expand=subtasks,categories,owner (nested objects instead of ids)
+    - ?fields=id,title,status (only these fields)
 
     post:
     Create a new task.
     """
+    version_scope = 'tasks'
+    related_version_keys = ('categories:deleted',)  # tasks list their live categories only
+    cache_list = True
+    expandable = TASK_EXPANSIONS
     permission_classes = (ReadOnlyOrAuthenticated,)
 
-    filter_backends = (DjangoFilterBackend,filters.SearchFilter, filters.OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter)
     filterset_fields = ['status', 'deadline']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at']
@@ -44,19 +70,10 @@ class TaskListCreateAPIView(ListCreateAPIView):
 
         if weekday_name:
             weekday_name = weekday_name.capitalize()
-            weekdays_dict = {
-                'Monday': 2, 'Понедельник': 2,
-                'Tuesday': 3, 'Вторник': 3,
-                'Wednesday': 4, 'Среда': 4,
-                'Thursday': 5, 'Четверг': 5,
-                'Friday': 6, 'Пятница': 6,
-                'Saturday': 7, 'Суббота': 7,
-                'Sunday': 1, 'Воскресенье': 1,
-            }
-            weekday_number = weekdays_dict.get(weekday_name)
+            weekday_number = WEEKDAYS.get(weekday_name)
             if weekday_number is None:
                 raise ValidationError({'weekday': f'Invalid weekday: {weekday_name}'})
-            queryset = queryset.annotate(weekday=ExtractWeekDay('deadline')).filter(weekday=weekday_number)
+            queryset = queryset.filter(deadline_weekday=weekday_number)
 
         return queryset
 
@@ -68,50 +85,142 @@ class TaskListCreateAPIView(ListCreateAPIView):
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
 
-class TaskRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class StreamingExportMixin:
+    """
+    Streams every row matched by the list view's filters as NDJSON
+    (default) or CSV (?output=csv). Rows are read as tuples through
+    iterator(chunk_size=...) and encoded in batches, so memory stays flat
+    whatever the size of the result.
+    """
+    export_fields = ()  # (column, model attname) pairs
+    expandable = {}
+    export_name = 'export'
+    chunk_size = 2000
+    http_method_names = ['get', 'head', 'options']
+
+    def get(self, request, *args, **kwargs):
+        output = request.query_params.get('output', 'ndjson')
+        if output not in EXPORT_FORMATS:
+            raise ValidationError({'output': f'Invalid output: {output}'})
+        content_type, extension, encode = EXPORT_FORMATS[output]
+
+        columns = [column for column, _ in self.export_fields]
+        queryset = self.filter_queryset(self.get_queryset())
+        rows = queryset.values_list(*(attname for _, attname in self.export_fields)).iterator(chunk_size=self.chunk_size)
+
+        response = StreamingHttpResponse(encode(columns, rows), content_type=content_type)
+        response['Content-Disposition'] = f'attachment; filename="{self.export_name}.{extension}"'
+        return response
+
+
+class TaskExportAPIView(StreamingExportMixin, TaskListCreateAPIView):
+    """
+    get:
+    Export tasks as NDJSON or CSV (?output=csv), with the same filters as
+    the task list (status, deadline, weekday, search, ordering).
+    """
+    export_name = 'tasks'
+    export_fields = (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('status', 'status'),
+        ('deadline', 'deadline'),
+        ('created_at', 'created_at'),
+        ('owner', 'owner_id'),
+    )
+
+
+class TaskRetrieveUpdateDestroyAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, RetrieveUpdateDestroyAPIView):
+    version_scope = 'tasks'
+    related_version_keys = ('categories:deleted',)
+    expandable = TASK_EXPANSIONS
     queryset = Task.objects.all()
     serializer_class = TaskCreateSerializer
 
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
 
+class BulkUpsertAPIView(GenericAPIView):
+    """
+    post:
+    Create or update up to 1000 items from a JSON array in one transaction.
+    Items matching an existing row on their upsert key are updated, invalid
+    items are reported per index without failing the rest of the batch.
+    """
+    permission_classes = (IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data, many=True)
+        serializer.is_valid(raise_exception=True)
+        serializer.save(owner=request.user)
+        data = serializer.get_response_data()
+        if data['failed'] and not (data['created'] or data['updated']):
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class TaskBulkUpsertAPIView(BulkUpsertAPIView):
+    serializer_class = TaskBulkSerializer
+
+
 @api_view(['GET'])
 @permission_classes([IsAdminUser])
 def task_statistics(request):
-    total_tasks = Task.objects.all().count()
+    """
+    Task counts by status and overdue tasks, read from the counter rollups
+    maintained in counters.py. Pass ?owner=<user id> to scope them to one owner.
+    """
+    return Response(counters.get_statistics(owner_id=get_statistics_owner(request)))
 
-    from collections import Counter
-    status_amount = Task.objects.values_list('status', flat=True)
-    status_count = Counter(status_amount)
 
-    status_labels = dict(Task._meta.get_field('status').choices)
-    status_labels_count = {status_labels.get(k, k): v for k, v in status_count.items()}
+def get_statistics_owner(request):
+    owner_id = request.query_params.get('owner')
+    if owner_id is not None and not owner_id.isdigit():
+        raise ValidationError({'owner': f'Invalid owner id: {owner_id}'})
+    return owner_id
 
-    overdue = Task.objects.filter(deadline__lt=now().date()).exclude(status='D').count()
 
-    return Response({
-        'total_tasks': total_tasks,
-        'by_status': status_labels_count,
-        'overdue': overdue
-    })
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_statistics(request):
+    """
+    Hits, misses and hit ratio of the list response cache per collection.
+    """
+    return Response(caching.get_statistics(('tasks', 'subtasks', 'categories')))
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def request_metrics(request):
+    """
+    Per-route histograms of request, database and serializer time, query
+    count and duplicate queries of this worker, in the Prometheus text format.
+    """
+    return HttpResponse(instrumentation.registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 
-class SubTaskListCreateAPIView(ListCreateAPIView):
+class SubTaskListCreateAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, ListCreateAPIView):
     """
     get:
     Return a list of subtasks with optional filters:
     - ?status=<status_value>
     - ?deadline=<YYYY-MM-DD>
-    - ?search=<text> (matches title and description)
+    - ?search=<text> (full-text match on title and description, ranked by relevance)
     - ?ordering=created_at or -created_at
     - ?task=<partial task title> (filters by related task title)
+    - ?expand=task,owner (nested objects instead of ids)
+    - ?fields=id,title,status (only these fields)
 
     post:
     Create a new subtask.
     """
+    version_scope = 'subtasks'
+    cache_list = True
+    expandable = SUBTASK_EXPANSIONS
     serializer_class = SubTaskCreateSerializer
     permission_classes = (ReadOnlyOrAuthenticated,)
 
-    filter_backends = (DjangoFilterBackend,filters.SearchFilter, filters.OrderingFilter)
+    filter_backends = (DjangoFilterBackend, filters.OrderingFilter, FullTextSearchFilter)
     filterset_fields = ['status', 'deadline']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at']
@@ -128,24 +237,83 @@ class SubTaskListCreateAPIView(ListCreateAPIView):
         serializer.save(owner=self.request.user)
 
 
-class SubTaskRetrieveUpdateDestroyAPIView(RetrieveUpdateDestroyAPIView):
+class SubTaskExportAPIView(StreamingExportMixin, SubTaskListCreateAPIView):
+    """
+    get:
+    Export subtasks as NDJSON or CSV (?output=csv), with the same filters
+    as the subtask list.
+    """
+    export_name = 'subtasks'
+    export_fields = (
+        ('id', 'id'),
+        ('title', 'title'),
+        ('description', 'description'),
+        ('task', 'task_id'),
+        ('status', 'status'),
+        ('deadline', 'deadline'),
+        ('created_at', 'created_at'),
+        ('owner', 'owner_id'),
+    )
+
+
+class SubTaskRetrieveUpdateDestroyAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, RetrieveUpdateDestroyAPIView):
+    version_scope = 'subtasks'
+    expandable = SUBTASK_EXPANSIONS
     queryset = SubTask.objects.all()
     serializer_class = SubTaskCreateSerializer
     permission_classes = (IsOwnerOrAdminOrReadOnly,)
 
 
-class CategoryViewSet(ModelViewSet):
+class CategoryViewSet(SerializerTimingMixin, ConditionalGetMixin, ModelViewSet):
+    """
+    list:
+    Return categories. Pass ?with_counts=1 to include task_count and
+    status_counts (tasks per status) for every category.
+    """
+    version_scope = 'categories'
+    cache_list = True
     queryset = Category.objects.all()
     serializer_class = CategoryCreateSerializer
+    permission_classes = (ReadOnlyOrAuthenticated,)
+
+    @property
+    def with_counts(self):
+        return self.request.method in permissions.SAFE_METHODS and self.request.query_params.get('with_counts') == '1'
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.with_counts or settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+            return queryset
+        # One GROUP BY over the through table for the whole page.
+        return queryset.annotate(
+            counted_tasks=Count('task'),
+            **{f'{key}_count': Count('task', filter=Q(task__status=key)) for key, _ in STATUS_CHOICES},
+        )
+
+    def get_serializer_class(self):
+        if self.with_counts:
+            return CategoryCountsSerializer
+        return super().get_serializer_class()
 
     @action(detail=True, methods=['get'])
     def count_tasks(self, request, pk=None):
         category = self.get_object()
-        task_count = category.task_set.count()
+        if settings.CATEGORY_TASK_COUNTS_DENORMALIZED:
+            task_count = category.task_count
+        else:
+            task_count = category.task_set.count()
         return Response({'category': category.name, 'task_count': task_count})
 
 
-class MyTasksAPIView(ListCreateAPIView):
+class SubTaskBulkUpsertAPIView(BulkUpsertAPIView):
+    serializer_class = SubTaskBulkSerializer
+
+
+class MyTasksAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, ListCreateAPIView):
+    version_scope = 'tasks'
+    related_version_keys = ('categories:deleted',)
+    expandable = TASK_EXPANSIONS
+    owner_scoped = True
     serializer_class = TaskCreateSerializer
     permission_classes = (IsAuthenticated,)
 
@@ -153,7 +321,10 @@ class MyTasksAPIView(ListCreateAPIView):
         return Task.objects.filter(owner=self.request.user)
 
 
-class MySubTasksAPIView(ListCreateAPIView):
+class MySubTasksAPIView(SerializerTimingMixin, ExpandMixin, ConditionalGetMixin, SparseFieldsMixin, ListCreateAPIView):
+    version_scope = 'subtasks'
+    expandable = SUBTASK_EXPANSIONS
+    owner_scoped = True
     serializer_class = SubTaskCreateSerializer
     permission_classes = (IsAuthenticated,)
 
@@ -173,7 +344,7 @@ class LogoutAPIView(APIView):
     def post(self, request, *args, **kwargs):
         try:
             refresh_token = request.data['refresh']
-            token = RefreshToken(refresh_token)
+            token = FilteredRefreshToken(refresh_token)
             token.blacklist()
             return Response({"detail": "Logout successful."}, status=status.HTTP_205_RESET_CONTENT)
         except KeyError: